@@ -20,23 +20,89 @@ class RobotConfig:
         "ads1115": int(os.getenv("ADS1115_ADDRESS", "0x48"), 16),
     }
 
+    # I2C Bus Manager Configuration
+    I2C_BUS_CONFIG = {
+        # Lower number = served first when several transactions are queued
+        "priorities": {
+            "imu": int(os.getenv("I2C_PRIORITY_IMU", "0")),
+            "battery": int(os.getenv("I2C_PRIORITY_BATTERY", "1")),
+            "environmental": int(os.getenv("I2C_PRIORITY_ENVIRONMENTAL", "2")),
+        },
+        "transaction_timeout": float(os.getenv("I2C_TRANSACTION_TIMEOUT", "1.0")),  # Seconds
+    }
+
+    # Sensor Polling Configuration (seconds between hardware reads)
+    SENSOR_POLL_CONFIG = {
+        "imu": float(os.getenv("IMU_POLL_INTERVAL", "0.02")),
+        "battery": float(os.getenv("BATTERY_POLL_INTERVAL", "1.0")),
+        "environmental": float(os.getenv("ENVIRONMENTAL_POLL_INTERVAL", "5.0")),
+    }
+
+    # Sensor Circuit Breaker Configuration
+    SENSOR_BREAKER_CONFIG = {
+        "failure_threshold": int(os.getenv("SENSOR_FAILURE_THRESHOLD", "3")),  # Consecutive failures before tripping
+        "initial_backoff": float(os.getenv("SENSOR_PROBE_INITIAL_BACKOFF", "1.0")),  # Seconds
+        "max_backoff": float(os.getenv("SENSOR_PROBE_MAX_BACKOFF", "60.0")),  # Seconds
+    }
+
     # MQTT Configuration
     MQTT_CONFIG = {
         "broker": os.getenv("MQTT_BROKER", "localhost"),
         "port": int(os.getenv("MQTT_PORT", "1883")),
+        "reconnect_min_delay": float(os.getenv("MQTT_RECONNECT_MIN_DELAY", "1")),  # Seconds
+        "reconnect_max_delay": float(os.getenv("MQTT_RECONNECT_MAX_DELAY", "30")),  # Seconds
+        "reconnect_jitter": float(os.getenv("MQTT_RECONNECT_JITTER", "0.5")),  # ± fraction of min delay
+        # 5 for MQTT v5 (topic aliases, message expiry, user properties), 3.1.1 otherwise;
+        # v5 falls back to 3.1.1 automatically if the broker rejects it
+        "protocol_version": os.getenv("MQTT_PROTOCOL_VERSION", "5"),
+        # High-frequency topic keys that are published with v5 topic aliases
+        "topic_aliases": ["sensor_data", "sensor_data_binary", "sensor_data_batch", "command_feedback"],
         "topics": {
             "status": os.getenv("MQTT_TOPIC_STATUS", "robot/status"),
             "sensor_data": os.getenv("MQTT_TOPIC_SENSOR_DATA", "robot/sensor_data"),
+            "sensor_data_binary": os.getenv(
+                "MQTT_TOPIC_SENSOR_DATA_BINARY", "robot/sensor_data/bin"
+            ),
+            "sensor_data_batch": os.getenv(
+                "MQTT_TOPIC_SENSOR_DATA_BATCH", "robot/sensor_data/batch"
+            ),
+            "sensor_data_aggregate": os.getenv(
+                "MQTT_TOPIC_SENSOR_DATA_AGGREGATE", "robot/sensor_data/aggregate"
+            ),
             "locomotion": os.getenv("MQTT_TOPIC_LOCOMOTION", "robot/locomotion"),
             "calibration": os.getenv("MQTT_TOPIC_CALIBRATION", "robot/calibration"),
             "calibration_feedback": os.getenv(
                 "MQTT_TOPIC_CALIBRATION_FEEDBACK", "robot/calibration/feedback"
             ),
             "network": os.getenv("MQTT_TOPIC_NETWORK", "robot/network"),
+            "backfill": os.getenv("MQTT_TOPIC_BACKFILL", "robot/backfill"),
             "camera_control": os.getenv("MQTT_TOPIC_CAMERA_CONTROL", "robot/camera/control"),
+            "command_feedback": os.getenv(
+                "MQTT_TOPIC_COMMAND_FEEDBACK", "robot/command/feedback"
+            ),
+            "probe": os.getenv("MQTT_TOPIC_PROBE", "robot/probe"),
+            "qos_events": os.getenv("MQTT_TOPIC_QOS_EVENTS", "robot/qos/events"),
+            "camera_metrics": os.getenv("MQTT_TOPIC_CAMERA_METRICS", "robot/camera/metrics"),
+            "motion_events": os.getenv("MQTT_TOPIC_MOTION_EVENTS", "robot/camera/motion"),
+            "camera_record": os.getenv("MQTT_TOPIC_CAMERA_RECORD", "robot/camera/record"),
         },
     }
 
+    # Broker Link Probe Configuration (loopback pings through the MQTT broker)
+    PROBE_CONFIG = {
+        "enabled": os.getenv("PROBE_ENABLED", "true").lower() == "true",
+        "interval": float(os.getenv("PROBE_INTERVAL", "10")),  # Seconds between rounds
+        "count": int(os.getenv("PROBE_COUNT", "10")),  # Pings per round
+        "spacing": float(os.getenv("PROBE_SPACING", "0.05")),  # Seconds between pings
+        "timeout": float(os.getenv("PROBE_TIMEOUT", "1.0")),  # Seconds before a ping is lost
+        # Optional bounded throughput burst through the same loop
+        "burst_enabled": os.getenv("PROBE_BURST_ENABLED", "false").lower() == "true",
+        "burst_interval": float(os.getenv("PROBE_BURST_INTERVAL", "300")),
+        "burst_bytes": int(os.getenv("PROBE_BURST_BYTES", "262144")),
+        "burst_message_bytes": int(os.getenv("PROBE_BURST_MESSAGE_BYTES", "8192")),
+        "burst_timeout": float(os.getenv("PROBE_BURST_TIMEOUT", "2.0")),
+    }
+
     # Publish Configuration
     PUBLISH_CONFIG = {
         "sensor_data_interval": int(os.getenv("SENSOR_DATA_INTERVAL", "5")),
@@ -44,6 +110,103 @@ class RobotConfig:
         "control_frequency": int(os.getenv("CONTROL_FREQUENCY", "20")),
     }
 
+    # MQTT Dispatch Configuration (per-topic executor queues)
+    DISPATCH_CONFIG = {
+        # Joystick-style topics: a newer message replaces a queued one with the same action
+        "locomotion": {
+            "max_queue": int(os.getenv("DISPATCH_LOCOMOTION_QUEUE", "8")),
+            "latest_wins": True,
+            # Seconds after receipt past which a command is discarded unexecuted
+            "expiry": float(os.getenv("DISPATCH_LOCOMOTION_EXPIRY", "1.0")),
+            # Also expire from the dashboard's "sent_at", allowing this much clock
+            # offset (seconds); unset = receipt time only (no NTP/RTC needed)
+            "sent_at_skew": float(os.environ["DISPATCH_SENT_AT_SKEW"])
+            if os.getenv("DISPATCH_SENT_AT_SKEW")
+            else None,
+        },
+        "camera_control": {
+            "max_queue": int(os.getenv("DISPATCH_CAMERA_QUEUE", "8")),
+            "latest_wins": True,
+            "expiry": float(os.getenv("DISPATCH_CAMERA_EXPIRY", "1.0")),
+            "sent_at_skew": float(os.environ["DISPATCH_SENT_AT_SKEW"])
+            if os.getenv("DISPATCH_SENT_AT_SKEW")
+            else None,
+        },
+        "calibration": {
+            "max_queue": int(os.getenv("DISPATCH_CALIBRATION_QUEUE", "2")),
+            "latest_wins": False,
+            "expiry": None,
+        },
+    }
+
+    # Telemetry Encoding Configuration
+    TELEMETRY_CONFIG = {
+        # Also publish the compact struct-packed payload on the binary topic
+        "binary_enabled": os.getenv("TELEMETRY_BINARY_ENABLED", "false").lower() == "true",
+
+        # Only publish fields that moved past their deadband, with periodic full keyframes
+        "deadband_enabled": os.getenv("TELEMETRY_DEADBAND_ENABLED", "true").lower() == "true",
+        "keyframe_interval": float(os.getenv("TELEMETRY_KEYFRAME_INTERVAL", "60")),  # Seconds
+        "deadbands": {
+            "imu.accel": {"abs": 0.05},
+            "imu.gyro": {"abs": 0.5},
+            "imu.tilt": {"abs": 0.5},
+            "environment.temperature": {"abs": 0.1},
+            "environment.pressure": {"abs": 0.1},
+            "environment.altitude": {"abs": 0.5},
+            "environment.MQ2.value": {"rel": 0.02},
+            "environment.MQ2.voltage": {"abs": 0.02},
+            "environment.MQ135.value": {"rel": 0.02},
+            "environment.MQ135.voltage": {"abs": 0.02},
+            "battery.battery_current.value": {"rel": 0.02},
+            "battery.battery_current.voltage": {"abs": 0.01},
+            "battery.battery_voltage.value": {"rel": 0.01},
+            "battery.battery_voltage.voltage": {"abs": 0.01},
+            "encoders.left_encoder.rpm": {"abs": 1.0},
+            "encoders.right_encoder.rpm": {"abs": 1.0},
+            "sensor_health": {"abs": 30},
+        },
+
+        # High-rate columnar batches of control-loop samples; off by default,
+        # since they stream ~1.2 KB/s even while the robot is idle
+        "batch_enabled": os.getenv("TELEMETRY_BATCH_ENABLED", "false").lower() == "true",
+        "batch_sample_rate": int(os.getenv("TELEMETRY_BATCH_SAMPLE_RATE", "50")),  # Hz
+        "batch_interval": float(os.getenv("TELEMETRY_BATCH_INTERVAL", "1.0")),  # Seconds
+        "batch_fields": [
+            "command",
+            "target_speed",
+            "left_rpm",
+            "right_rpm",
+            "left_output",
+            "right_output",
+            "correction",
+            "roll",
+            "pitch",
+            "gyro_z",
+        ],
+
+        # Streaming min/max/mean/last/count over tumbling windows for long-term trends
+        "aggregate_enabled": os.getenv("TELEMETRY_AGGREGATE_ENABLED", "true").lower() == "true",
+        "aggregate_windows": [1, 10, 60],  # Seconds; each a multiple of the previous
+        "aggregate_fields": [
+            "battery.battery_voltage.voltage",
+            "battery.battery_current.voltage",
+            "environment.MQ2.value",
+            "environment.MQ135.value",
+            "environment.temperature",
+            "environment.pressure",
+        ],
+
+        # Store-and-forward spool for telemetry produced while the broker is unreachable
+        "spool_enabled": os.getenv("TELEMETRY_SPOOL_ENABLED", "true").lower() == "true",
+        "spool_dir": os.getenv(
+            "TELEMETRY_SPOOL_DIR", os.path.expanduser("~/.surveillance_robot/spool")
+        ),
+        "spool_max_bytes": int(os.getenv("TELEMETRY_SPOOL_MAX_BYTES", "50000000")),
+        "spool_segment_bytes": int(os.getenv("TELEMETRY_SPOOL_SEGMENT_BYTES", "1000000")),
+        "backfill_rate": float(os.getenv("TELEMETRY_BACKFILL_RATE", "20")),  # Messages per second
+    }
+
     # Hardware Configuration
     PWM_FREQUENCY = int(os.getenv("PWM_FREQUENCY", "1000"))
 
@@ -73,6 +236,99 @@ class RobotConfig:
         "shutter_speed": int(os.getenv("SHUTTER_SPEED", "20000")),      # Optional: shutter speed in microseconds
         "analog_gain": float(os.getenv("ANALOG_GAIN", "2.0")),        # Optional: analog gain
         "brightness": float(os.getenv("BRIGHTNESS", "0.1")),          # Optional: brightness adjustment
+
+        # Persistent MJPEG pipeline (libcamera-vid --codec mjpeg -o -)
+        # Override the command to use a stand-in, e.g. "python tests/fake_libcamera_vid.py"
+        "pipeline_command": os.getenv("CAMERA_PIPELINE_COMMAND") or None,
+        "frame_ring_size": int(os.getenv("CAMERA_FRAME_RING_SIZE", "4")),  # Frames kept
+        "stall_timeout": float(os.getenv("CAMERA_STALL_TIMEOUT", "3.0")),  # Seconds without a frame
+        "idle_timeout": float(os.getenv("CAMERA_IDLE_TIMEOUT", "2.0")),  # Capture linger after last viewer
+        "metrics_interval": float(os.getenv("CAMERA_METRICS_INTERVAL", "5")),  # Seconds, 0 disables MQTT push
+
+        # Snapshots (/api/camera/capture): concurrent requests within the window share one capture
+        "still_command": os.getenv("CAMERA_STILL_COMMAND") or None,  # Replaces libcamera-jpeg
+        "snapshot_window": float(os.getenv("SNAPSHOT_WINDOW", "1.0")),  # Seconds
+        "snapshot_prewarm_interval": float(os.getenv("SNAPSHOT_PREWARM_INTERVAL", "0")),  # Seconds, 0 = off
+
+        # Camera server the robot pushes stream settings to (adaptive QoS)
+        "server_url": os.getenv("CAMERA_SERVER_URL", "http://127.0.0.1:5000"),
+    }
+
+    # Motion Detection Configuration (frame differencing on the camera stream)
+    MOTION_CONFIG = {
+        # Keeps the camera capturing while enabled
+        "enabled": os.getenv("MOTION_ENABLED", "false").lower() == "true",
+        "every_n": int(os.getenv("MOTION_EVERY_N", "3")),  # Analyse at most every Nth frame
+        "scale": int(os.getenv("MOTION_SCALE", "8")),  # JPEG draft downscale (1, 2, 4 or 8)
+        "cpu_budget": float(os.getenv("MOTION_CPU_BUDGET", "0.10")),  # Max share of one core
+        "nice": int(os.getenv("MOTION_NICE", "10")),  # Scheduling priority of the detector thread
+        "alpha": float(os.getenv("MOTION_ALPHA", "0.05")),  # Background running-average rate
+        "warmup_frames": int(os.getenv("MOTION_WARMUP_FRAMES", "10")),  # After a background reset
+        "pixel_threshold": float(os.getenv("MOTION_PIXEL_THRESHOLD", "25")),  # Gray levels
+        "score_threshold": float(os.getenv("MOTION_SCORE_THRESHOLD", "0.01")),  # Changed fraction
+        "global_threshold": float(os.getenv("MOTION_GLOBAL_THRESHOLD", "0.5")),  # Camera moved/lights
+        "cell_size": int(os.getenv("MOTION_CELL_SIZE", "8")),  # Pixels (at decoded size) per grid cell
+        "cell_fraction": float(os.getenv("MOTION_CELL_FRACTION", "0.2")),  # Changed share for an active cell
+        "min_cells": int(os.getenv("MOTION_MIN_CELLS", "2")),  # Smallest reported region
+        "max_boxes": int(os.getenv("MOTION_MAX_BOXES", "5")),
+        "event_interval": float(os.getenv("MOTION_EVENT_INTERVAL", "1.0")),  # Seconds between updates
+        "quiet_period": float(os.getenv("MOTION_QUIET_PERIOD", "3.0")),  # Seconds before motion_end
+        # Ignored regions as "x,y,w,h;..." fractions of the frame (e.g. the robot's own chassis)
+        "mask": os.getenv("MOTION_MASK", ""),
+    }
+
+    # Event Recording Configuration (pre-roll + triggered MJPEG segments on disk)
+    RECORDING_CONFIG = {
+        # Keeps the camera capturing while enabled
+        "enabled": os.getenv("RECORDING_ENABLED", "false").lower() == "true",
+        "directory": os.path.expanduser(os.getenv("RECORDING_DIR", "~/recordings")),
+        "preroll_seconds": float(os.getenv("RECORDING_PREROLL_SECONDS", "5")),
+        "preroll_bytes": int(os.getenv("RECORDING_PREROLL_BYTES", str(8 * 1024 * 1024))),
+        "post_seconds": float(os.getenv("RECORDING_POST_SECONDS", "10")),  # After the last trigger
+        "max_segment_seconds": float(os.getenv("RECORDING_MAX_SEGMENT_SECONDS", "120")),
+        "queue_bytes": int(os.getenv("RECORDING_QUEUE_BYTES", str(16 * 1024 * 1024))),  # Writer backlog
+        "fsync_interval": float(os.getenv("RECORDING_FSYNC_INTERVAL", "2.0")),  # Seconds
+        "fsync_bytes": int(os.getenv("RECORDING_FSYNC_BYTES", str(4 * 1024 * 1024))),
+        "retention_bytes": int(os.getenv("RECORDING_RETENTION_BYTES", str(2 * 1024**3))),  # Whole directory
+        "min_free_bytes": int(os.getenv("RECORDING_MIN_FREE_BYTES", str(512 * 1024**2))),  # Keep free on the SD card
+        # Triggers
+        "motion_trigger": os.getenv("RECORDING_MOTION_TRIGGER", "true").lower() == "true",
+        "shock_threshold": float(os.getenv("RECORDING_SHOCK_THRESHOLD", "15.0")),  # m/s^2 change between IMU samples, 0 = off
+        "shock_cooldown": float(os.getenv("RECORDING_SHOCK_COOLDOWN", "5.0")),  # Seconds between IMU triggers
+    }
+
+    # Adaptive QoS Configuration (link-quality driven stream/telemetry ladder)
+    QOS_CONFIG = {
+        "enabled": os.getenv("QOS_ENABLED", "true").lower() == "true",
+        "interval": float(os.getenv("QOS_INTERVAL", "2")),  # Seconds between decisions
+        # Hysteresis: consecutive bad/good checks before stepping, then a minimum dwell
+        "degrade_after": int(os.getenv("QOS_DEGRADE_AFTER", "2")),
+        "upgrade_after": int(os.getenv("QOS_UPGRADE_AFTER", "5")),
+        "min_dwell": float(os.getenv("QOS_MIN_DWELL", "10")),  # Seconds
+        # Degrade below/above these; upgrade only when comfortably inside the upgrade bounds
+        "rssi_degrade_dbm": int(os.getenv("QOS_RSSI_DEGRADE", "-72")),
+        "rssi_upgrade_dbm": int(os.getenv("QOS_RSSI_UPGRADE", "-65")),
+        "rtt_degrade_ms": float(os.getenv("QOS_RTT_DEGRADE", "150")),
+        "rtt_upgrade_ms": float(os.getenv("QOS_RTT_UPGRADE", "60")),
+        "loss_degrade_pct": float(os.getenv("QOS_LOSS_DEGRADE", "5")),
+        "loss_upgrade_pct": float(os.getenv("QOS_LOSS_UPGRADE", "0")),
+        "utilization_degrade": float(os.getenv("QOS_UTILIZATION_DEGRADE", "0.8")),
+        "utilization_upgrade": float(os.getenv("QOS_UTILIZATION_UPGRADE", "0.6")),
+        "link_efficiency": float(os.getenv("QOS_LINK_EFFICIENCY", "0.5")),  # Goodput / PHY rate
+        # Bandwidth always kept free for locomotion commands and their acks
+        "command_headroom_kbps": float(os.getenv("QOS_COMMAND_HEADROOM_KBPS", "256")),
+        "event_history": 50,
+        # Level 0 is the best quality; each further level is cheaper
+        "ladder": [
+            {"name": "high", "width": 1024, "height": 720, "fps": 15, "quality": 75,
+             "sensor_interval": 2, "network_interval": 10},
+            {"name": "medium", "width": 800, "height": 600, "fps": 10, "quality": 65,
+             "sensor_interval": 2, "network_interval": 10},
+            {"name": "low", "width": 640, "height": 480, "fps": 8, "quality": 50,
+             "sensor_interval": 4, "network_interval": 20},
+            {"name": "minimal", "width": 320, "height": 240, "fps": 5, "quality": 40,
+             "sensor_interval": 8, "network_interval": 30},
+        ],
     }
 
     # PID Configuration
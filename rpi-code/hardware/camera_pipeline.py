@@ -0,0 +1,362 @@
+import select
+import shlex
+import subprocess
+import threading
+import time
+from collections import namedtuple
+
+from network.command_tracer import LatencyHistogram
+
+SOI = b"\xff\xd8"  # JPEG start of image
+EOI = b"\xff\xd9"  # JPEG end of image
+
+# One captured JPEG; seq increases by one per frame for the life of the pipeline,
+# timestamp is the wall-clock time the frame was complete
+Frame = namedtuple("Frame", ["seq", "timestamp", "data"])
+
+
+def multipart_header(length, seq=None, timestamp=None):
+    """Boundary and part headers of one frame in a multipart/x-mixed-replace stream"""
+    header = b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: %d\r\n" % length
+    if seq is not None:
+        header += b"X-Frame-Seq: %d\r\n" % seq
+    if timestamp is not None:
+        # Capture time, so viewers can measure how stale a frame is on arrival
+        header += b"X-Timestamp: %.3f\r\n" % timestamp
+    return header + b"\r\n"
+
+
+class JPEGFrameParser:
+    """
+    Splits a byte stream of concatenated JPEGs into frames on SOI/EOI markers.
+
+    Bytes are read straight into one preallocated bytearray (readinto()), so
+    the pipe data is never appended or re-sliced while a frame accumulates.
+    Inside entropy-coded JPEG data every 0xFF byte is stuffed (followed by
+    0x00), so FF D9 only occurs as a real end-of-image marker; scanning
+    resumes where the previous read stopped. A completed frame is copied out
+    exactly once into an immutable bytes object that every viewer shares;
+    only the few bytes of the next frame that arrived in the same read are
+    moved back to the start of the buffer. `copied_bytes` counts both.
+    """
+
+    def __init__(self, max_frame_bytes=4 * 1024 * 1024):
+        self.max_frame_bytes = max_frame_bytes
+        self._buffer = bytearray(max_frame_bytes)
+        self._view = memoryview(self._buffer)
+        self._filled = 0
+        self._scan_from = 0
+        self.discarded_bytes = 0
+        self.copied_bytes = 0
+
+    def read_from(self, stream):
+        """readinto() from a raw stream; returns (bytes read, completed frames)"""
+        if self._filled >= self.max_frame_bytes:
+            self._resync()
+        count = stream.readinto(self._view[self._filled:])
+        if not count:
+            return 0, []
+        self._filled += count
+        return count, self._extract()
+
+    def feed(self, chunk):
+        """Add bytes from the stream; returns the list of completed frames"""
+        frames = []
+        chunk = memoryview(chunk)
+        while chunk:
+            if self._filled >= self.max_frame_bytes:
+                self._resync()
+            count = min(len(chunk), self.max_frame_bytes - self._filled)
+            self._view[self._filled : self._filled + count] = chunk[:count]
+            self._filled += count
+            chunk = chunk[count:]
+            frames += self._extract()
+        return frames
+
+    def _extract(self):
+        buffer = self._buffer
+        frames = []
+        start = 0
+        while True:
+            soi = buffer.find(SOI, start, self._filled)
+            if soi < 0:
+                # Keep a trailing 0xFF, it may be the first half of the next SOI
+                keep = 1 if self._filled > start and buffer[self._filled - 1] == 0xFF else 0
+                self.discarded_bytes += self._filled - start - keep
+                start = self._filled - keep
+                self._scan_from = 0
+                break
+            if soi != start:
+                self.discarded_bytes += soi - start
+                start = soi
+                self._scan_from = 0
+
+            eoi = buffer.find(EOI, max(start + 2, self._scan_from), self._filled)
+            if eoi < 0:
+                self._scan_from = max(start + 2, self._filled - 1)
+                break
+
+            frames.append(bytes(self._view[start : eoi + 2]))
+            self.copied_bytes += eoi + 2 - start
+            start = eoi + 2
+            self._scan_from = 0
+
+        if start:
+            # Move the partial next frame to the front
+            tail = self._filled - start
+            self._view[:tail] = self._view[start : self._filled]
+            self.copied_bytes += tail
+            self._scan_from = max(0, self._scan_from - start)
+            self._filled = tail
+        return frames
+
+    def _resync(self):
+        """Buffer full without an EOI: drop the broken frame, restart at the next SOI"""
+        soi = self._buffer.find(SOI, 2, self._filled)
+        start = soi if soi >= 0 else self._filled
+        self.discarded_bytes += start
+        tail = self._filled - start
+        self._view[:tail] = self._view[start : self._filled]
+        self._filled = tail
+        self._scan_from = 0
+
+    @property
+    def pending(self):
+        """Bytes of a partial frame held in the buffer"""
+        return self._filled
+
+    def reset(self):
+        self._filled = 0
+        self._scan_from = 0
+
+
+class MJPEGPipeline:
+    """
+    One long-lived `libcamera-vid --codec mjpeg -o -` process feeding a ring
+    of the most recent frames.
+
+    A supervisor thread starts the process, parses JPEGs from its stdout and
+    restarts it (with exponential backoff) when it exits or stops producing
+    frames for `stall_timeout` seconds. reconfigure() restarts it right away
+    with the current CAMERA_CONFIG settings. Per frame it records the capture
+    time (first byte of the JPEG to its EOI) and the interval since the
+    previous frame; process start-up is timed up to the first frame. `command` replaces the
+    libcamera-vid command line, e.g. with a stand-in process that writes
+    JPEGs to stdout for testing without a camera.
+    """
+
+    def __init__(self, config, command=None, ring_size=4, stall_timeout=3.0,
+                 min_backoff=0.5, max_backoff=10.0, max_frame_bytes=4 * 1024 * 1024):
+        self.config = config
+        self.command = command
+        self.ring_size = ring_size
+        self.stall_timeout = stall_timeout
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+
+        self._ring = [None] * ring_size
+        self._seq = 0
+        self._condition = threading.Condition()
+        self._parser = JPEGFrameParser(max_frame_bytes)
+
+        self._process = None
+        self._process_lock = threading.Lock()
+        self._running = False
+        self._restart_now = False
+        self._resumed = threading.Event()
+        self._resumed.set()
+        self._thread = None
+
+        self.stats = {
+            "frames": 0,
+            "bytes": 0,
+            "restarts": 0,
+            "failures": 0,
+            "discarded_bytes": 0,
+            "copied_bytes": 0,
+            "last_error": None,
+        }
+        self.histograms = {
+            "capture_ms": LatencyHistogram(),
+            "frame_interval_ms": LatencyHistogram(),
+            "startup_ms": LatencyHistogram(),
+        }
+        self._last_frame_at = None
+
+    # ---------- process ----------
+    def build_command(self):
+        if self.command:
+            command = shlex.split(self.command) if isinstance(self.command, str) else list(self.command)
+        else:
+            command = ["libcamera-vid", "--codec", "mjpeg", "-o", "-", "-t", "0", "--nopreview"]
+        command += [
+            "--width", str(self.config["stream_width"]),
+            "--height", str(self.config["stream_height"]),
+            "--framerate", str(self.config["target_fps"]),
+            "--quality", str(self.config["stream_quality"]),
+        ]
+        if self.config.get("shutter_speed"):
+            command += ["--shutter", str(self.config["shutter_speed"])]
+        if self.config.get("analog_gain"):
+            command += ["--gain", str(self.config["analog_gain"])]
+        if self.config.get("brightness"):
+            command += ["--brightness", str(self.config["brightness"])]
+        return command
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._supervise, name="camera-pipeline", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._terminate()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=3)
+        with self._condition:
+            self._condition.notify_all()
+
+    def reconfigure(self):
+        """Restart the process immediately to apply changed stream settings"""
+        self._restart_now = True
+        self._terminate()
+
+    def pause(self):
+        """Release the camera until resume(); viewers keep waiting for frames"""
+        self._resumed.clear()
+        self._restart_now = True
+        self._terminate()
+
+    def resume(self):
+        self._resumed.set()
+
+    def _terminate(self):
+        with self._process_lock:
+            process = self._process
+        if process and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def _supervise(self):
+        backoff = self.min_backoff
+        while self._running:
+            if not self._resumed.wait(0.5):
+                continue
+            command = self.build_command()
+            try:
+                process = subprocess.Popen(
+                    command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0
+                )
+            except OSError as e:
+                self._record_failure(f"start failed: {e}")
+            else:
+                with self._process_lock:
+                    self._process = process
+                if not self._resumed.is_set():
+                    self._terminate()  # pause() raced with the start
+                print(f"🎥 Camera pipeline started: {' '.join(command)}")
+                produced = self._read_frames(process)
+                self._terminate()
+                if produced:
+                    backoff = self.min_backoff
+
+            if not self._running:
+                break
+            self.stats["restarts"] += 1
+            if self._restart_now:
+                self._restart_now = False
+                continue
+            time.sleep(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def _read_frames(self, process):
+        """Read frames until the process dies or stalls; returns whether any arrived"""
+        self._parser.reset()
+        produced = False
+        stdout = process.stdout
+        started = last_frame = time.monotonic()
+        self._last_frame_at = None
+        frame_started = None
+        while self._running:
+            ready, _, _ = select.select([stdout], [], [], 0.5)
+            if not ready:
+                if time.monotonic() - last_frame > self.stall_timeout:
+                    self._record_failure("stalled")
+                    return produced
+                continue
+            read_at = time.monotonic()
+            if frame_started is None:
+                frame_started = read_at
+            count, frames = self._parser.read_from(stdout)
+            if not count:
+                if self._running and not self._restart_now:
+                    self._record_failure(f"exited with code {process.wait()}")
+                return produced
+            now = time.monotonic()
+            for data in frames:
+                if not produced:
+                    self.histograms["startup_ms"].add((now - started) * 1000)
+                self.histograms["capture_ms"].add((now - frame_started) * 1000)
+                # Any further frame in the same read started in this read
+                frame_started = read_at
+                self._publish(data, now)
+                produced = True
+                last_frame = now
+            if frames and not self._parser.pending:
+                frame_started = None
+            self.stats["discarded_bytes"] = self._parser.discarded_bytes
+            self.stats["copied_bytes"] = self._parser.copied_bytes
+        return produced
+
+    def _record_failure(self, reason):
+        self.stats["failures"] += 1
+        self.stats["last_error"] = reason
+        print(f"❌ Camera pipeline {reason}")
+
+    # ---------- frame ring ----------
+    def _publish(self, data, now):
+        if self._last_frame_at is not None:
+            self.histograms["frame_interval_ms"].add((now - self._last_frame_at) * 1000)
+        self._last_frame_at = now
+        with self._condition:
+            self._seq += 1
+            self._ring[self._seq % self.ring_size] = Frame(self._seq, time.time(), data)
+            self.stats["frames"] += 1
+            self.stats["bytes"] += len(data)
+            self._condition.notify_all()
+
+    def get_metrics(self):
+        return {
+            **self.stats,
+            **{name: histogram.to_dict() for name, histogram in self.histograms.items()},
+        }
+
+    def latest(self):
+        """Newest frame, or None before the first one"""
+        with self._condition:
+            return self._ring[self._seq % self.ring_size] if self._seq else None
+
+    def recent(self):
+        """Frames still held in the ring, oldest first"""
+        with self._condition:
+            frames = [frame for frame in self._ring if frame is not None]
+        return sorted(frames, key=lambda frame: frame.seq)
+
+    def wait_for_frame(self, after_seq=0, timeout=None):
+        """Block until a frame newer than `after_seq` exists; returns it or None"""
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._seq > after_seq or not self._running, timeout
+            )
+            if self._seq > after_seq:
+                return self._ring[self._seq % self.ring_size]
+            return None
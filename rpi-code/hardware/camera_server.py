@@ -3,12 +3,17 @@ import subprocess
 import os
 import sys
 import time
-import threading
 from flask_cors import CORS
 
 # Add the parent directory to Python path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config.robot_config import RobotConfig
+from hardware.camera_pipeline import MJPEGPipeline, multipart_header
+from hardware.event_recorder import EventRecorder
+from hardware.frame_broadcaster import FrameBroadcaster
+from hardware.motion_detector import MotionDetector
+from hardware.snapshot_service import SnapshotService
+from network.mqtt_publisher import MQTTPublisher
 
 app = Flask(__name__)
 CORS(app, origins=["http://localhost:5173"])
@@ -18,109 +23,95 @@ CORS(app, origins=["http://localhost:5173"])
 class CameraController:
     def __init__(self, config):
         self.config = config.CAMERA_CONFIG
-        self.streaming = False
-        self.frame_data = None
-        self.frame_lock = threading.Lock()
+        self.mqtt_config = config.MQTT_CONFIG
+        self.motion_config = config.MOTION_CONFIG
+        self.recording_config = config.RECORDING_CONFIG
+
+        # One long-lived libcamera-vid process instead of one process per frame
+        self.pipeline = MJPEGPipeline(
+            self.config,
+            command=self.config.get("pipeline_command"),
+            ring_size=self.config.get("frame_ring_size", 4),
+            stall_timeout=self.config.get("stall_timeout", 3.0),
+        )
+        # ...shared by every viewer; capture runs only while someone is watching
+        self.broadcaster = FrameBroadcaster(
+            self.pipeline, idle_timeout=self.config.get("idle_timeout", 2.0)
+        )
 
-    def capture_frame(self):
-        """Capture a single frame with current settings"""
-        timestamp = int(time.time() * 1000)
-        filename = f"/tmp/frame_{timestamp}.jpg"
+        self.stats = {
+            "frame_timeouts": 0,  # next_frame() waits that returned nothing
+            "streams_abandoned": 0,  # generators that gave up on the pipeline
+        }
+        self.publisher = None
+
+        # Single-flight snapshots, from the stream whenever it is running
+        self.snapshots = SnapshotService(
+            self.config,
+            self.pipeline,
+            command=self.config.get("still_command"),
+            window=self.config.get("snapshot_window", 1.0),
+            prewarm_interval=self.config.get("snapshot_prewarm_interval", 0),
+        )
+        self.motion = None
+        self.recorder = None
 
-        try:
-            # Build command based on settings
-            cmd = [
-                "libcamera-jpeg",
-                "-o",
-                filename,
-                "--width",
-                str(self.config["stream_width"]),
-                "--height",
-                str(self.config["stream_height"]),
-                "--quality",
-                str(self.config["stream_quality"]),
-                "--timeout",
-                str(self.config["capture_timeout"]),
-            ]
-
-            # Add optional settings
-            if self.config["shutter_speed"]:
-                cmd.extend(["--shutter", str(self.config["shutter_speed"])])
-            if self.config["analog_gain"]:
-                cmd.extend(["--gain", str(self.config["analog_gain"])])
-            if self.config["brightness"] != 0.0:
-                cmd.extend(["--brightness", str(self.config["brightness"])])
-
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=2)
-
-            if result.returncode == 0 and os.path.exists(filename):
-                with open(filename, "rb") as f:
-                    with self.frame_lock:
-                        self.frame_data = f.read()
-                os.remove(filename)
-                return True
-            return False
+    @property
+    def streaming(self):
+        return self.broadcaster.active
 
-        except Exception as e:
-            print(f"Frame capture error: {e}")
-            return False
-
-    def frame_generator(self):
-        """Generate MJPEG frames with configurable FPS"""
-        frame_interval = 1.0 / self.config["target_fps"]
-        frame_count = 0
-
-        print(f"🔄 Starting frame generator (streaming: {self.streaming})")
-        
-        while self.streaming:
-            start_time = time.time()
-            frame_count += 1
-
-            if self.capture_frame():
-                with self.frame_lock:
-                    if self.frame_data:
-                        yield (
-                            b"--frame\r\n"
-                            b"Content-Type: image/jpeg\r\n\r\n"
-                            + self.frame_data
-                            + b"\r\n"
-                        )
-            else:
-                print(f"❌ Frame {frame_count} capture failed")
-                # If capture fails multiple times, break to avoid infinite loop
-                if frame_count > 10:  # After 10 failed frames
-                    print("🛑 Too many failed frames, stopping stream")
-                    self.streaming = False
-                    break
-
-            # Control frame rate precisely
-            elapsed = time.time() - start_time
-            sleep_time = max(0, frame_interval - elapsed)
-            time.sleep(sleep_time)
-        
-        print(f"🛑 Frame generator stopped after {frame_count} frames")
+    def frame_generator(self, client):
+        """Generate MJPEG frames for one viewer as the pipeline produces them"""
+        failures = 0
+
+        print(f"🔄 Starting frame generator for {client.id}")
+
+        try:
+            while not client.closed:
+                # Paced by the pipeline: libcamera-vid runs at target_fps
+                frame = self.broadcaster.next_frame(client, timeout=2)
+                if frame is not None:
+                    failures = 0
+                    # Headers go out separately so the shared JPEG is never concatenated/copied
+                    yield multipart_header(len(frame.data), frame.seq, frame.timestamp)
+                    yield frame.data
+                    # Resumed only once the server has written the frame
+                    self.broadcaster.delivered(client, frame)
+                    yield b"\r\n"
+                elif not client.closed:
+                    failures += 1
+                    self.stats["frame_timeouts"] += 1
+                    print(f"❌ No frame from camera pipeline ({failures} in a row)")
+                    # The pipeline restarts itself; give up only if it stays down
+                    if failures > 10:
+                        self.stats["streams_abandoned"] += 1
+                        print("🛑 Too many failed frames, stopping stream")
+                        break
+        finally:
+            # Runs when the viewer disconnects too (the generator is closed)
+            self.broadcaster.unsubscribe(client)
+            print(f"🛑 Frame generator for {client.id} stopped after {client.frames} frames")
 
     def video_feed(self):
         """MJPEG video stream endpoint"""
-        # Reset and start fresh each time
-        print(f"🔍 DEBUG: video_feed called, streaming={self.streaming}")
-        self.streaming = True
-        print(f"🔍 DEBUG: streaming set to {self.streaming}")
+        # The dashboard's cache-busting ?t= doubles as the viewer id for /stream/stop
+        client = self.broadcaster.subscribe(request.args.get("t"))
         print(
-            f"🎥 Starting NEW stream: {self.config['stream_width']}x{self.config['stream_height']} at {self.config['target_fps']}FPS"
+            f"🎥 Viewer {client.id} joined: {self.config['stream_width']}x{self.config['stream_height']} "
+            f"at {self.config['target_fps']}FPS ({self.broadcaster.get_stats()['viewers']} watching)"
         )
 
         return Response(
-            self.frame_generator(), 
+            self.frame_generator(client),
             mimetype="multipart/x-mixed-replace; boundary=frame"
         )
 
     def stop_stream(self):
-        """Stop the camera stream"""
-        self.streaming = False
-        time.sleep(0.5)
-        print("✅ Stream stopped completely")
-        return jsonify({"status": "stopped", "message": "Stream stopped"})
+        """Stop one viewer's stream (?t=<id>), or every stream without an id"""
+        # The dashboard sends "?t=" when it has no stream id; treat it as none
+        closed = self.broadcaster.close(request.args.get("t") or None)
+        print(f"✅ Stopped {closed} stream(s)")
+        return jsonify({"status": "stopped", "message": f"Stopped {closed} stream(s)"})
 
     def camera_status(self):
         """Check camera status and current settings"""
@@ -138,6 +129,8 @@ class CameraController:
                         "status": "connected",
                         "message": "Camera is ready",
                         "streaming": self.streaming,
+                        "pipeline": self.pipeline.stats,
+                        "viewers": self.broadcaster.get_stats(),
                         "settings": {
                             "fps": self.config["target_fps"],
                             "resolution": f"{self.config['stream_width']}x{self.config['stream_height']}",
@@ -154,59 +147,87 @@ class CameraController:
 
 
     def capture_single_image(self):
-        """Capture a single high-quality image"""
-        
-        print(f"🔍 DEBUG: Available config keys: {list(self.config.keys())}")  # ← ADD THIS
-        print(f"🔍 DEBUG: Looking for capture_width: {'capture_width' in self.config}")  # ← ADD THIS
-        timestamp = int(time.time())
-        filename = f"/tmp/capture_{timestamp}.jpg"
-
+        """Snapshot: the newest stream frame, or a high-quality still (?full=1)"""
+        full_res = request.args.get("full", "").lower() in ("1", "true")
+        max_age = request.args.get("max_age", type=float)
         try:
-            print(f"📸 Attempting to capture image with command...")
-
-            # Use high quality settings for single capture
-            cmd = [
-                "libcamera-jpeg",
-                "-o",
-                filename,
-                "--width",
-                str(self.config["capture_width"]),
-                "--height",
-                str(self.config["capture_height"]),
-                "--quality",
-                str(self.config["capture_quality"]),
-                "--timeout",
-                str(self.config["capture_timeout_single"]),
-            ]
-
-            print(f"Running command: {' '.join(cmd)}")
-
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=15)
-
-            print(f"Command result: returncode={result.returncode}")
-            if result.stderr:
-                print(f"Command stderr: {result.stderr}")
-
-            if result.returncode == 0 and os.path.exists(filename):
-                file_size = os.path.getsize(filename)
-                print(f"✓ Image captured successfully: {filename} ({file_size} bytes)")
-                with open(filename, "rb") as f:
-                    image_data = f.read()
-                os.remove(filename)
-                return Response(image_data, mimetype="image/jpeg")
-            else:
-                print(
-                    f"✗ Capture failed: returncode={result.returncode}, file_exists={os.path.exists(filename)}"
-                )
-                return jsonify({"error": f"Capture failed: {result.stderr}"}), 500
-
-        except subprocess.TimeoutExpired:
-            print("❌ Capture timeout - camera may be busy or disconnected")
-            return jsonify({"error": "Capture timeout - check camera connection"}), 500
-        except Exception as e:
-            print(f"❌ Unexpected error: {e}")
+            snapshot = self.snapshots.get(full_res=full_res, max_age=max_age)
+        except RuntimeError as e:
             return jsonify({"error": str(e)}), 500
 
+        response = Response(snapshot.data, mimetype="image/jpeg")
+        response.set_etag(snapshot.etag)
+        response.headers["Cache-Control"] = "no-cache"
+        response.headers["X-Timestamp"] = f"{snapshot.timestamp:.3f}"
+        response.headers["X-Snapshot-Source"] = snapshot.source
+        # 304 for a client that already has this snapshot
+        return response.make_conditional(request)
+
+    def get_metrics(self):
+        """Capture, delivery and per-viewer metrics of the camera server"""
+        return {
+            "timestamp": time.time(),
+            "streaming": self.streaming,
+            "settings": {
+                "fps": self.config["target_fps"],
+                "resolution": f"{self.config['stream_width']}x{self.config['stream_height']}",
+                "quality": self.config["stream_quality"],
+            },
+            "pipeline": self.pipeline.get_metrics(),
+            "delivery": self.broadcaster.get_stats(),
+            "server": dict(self.stats),
+            "snapshots": self.snapshots.get_stats(),
+            "motion": self.motion.get_stats() if self.motion else None,
+            "recording": self.recorder.get_stats() if self.recorder else None,
+        }
+
+    def _on_motion_event(self, event):
+        self.publisher.publish_json(self.mqtt_config["topics"]["motion_events"], event, qos=1)
+        if self.recorder and self.recording_config["motion_trigger"] and event["type"] != "motion_end":
+            self.recorder.trigger("motion", {"score": event["score"], "boxes": event["boxes"]})
+
+    def _on_record_command(self, payload):
+        """{"reason": "...", "duration": seconds, ...} on the camera_record topic"""
+        self.recorder.trigger(payload.get("reason", "command"), payload, payload.get("duration"))
+
+    def start_recording(self):
+        """Trigger an event recording (pre-roll plus `duration` seconds)"""
+        if not self.recorder:
+            return jsonify({"error": "Recording is disabled (RECORDING_ENABLED)"}), 400
+        data = request.get_json(silent=True) or {}
+        self.recorder.trigger(data.get("reason", "http"), data, data.get("duration"))
+        return jsonify({"status": "recording", "recorder": self.recorder.get_stats()})
+
+    def list_recordings(self):
+        if not self.recorder:
+            return jsonify({"error": "Recording is disabled (RECORDING_ENABLED)"}), 400
+        return jsonify({"recordings": self.recorder.list_segments(), "recorder": self.recorder.get_stats()})
+
+    def camera_metrics(self):
+        return jsonify(self.get_metrics())
+
+    def start_background_services(self):
+        """MQTT metrics push, motion detection, event recording and snapshot pre-warming"""
+        interval = self.config.get("metrics_interval", 0)
+        if interval or self.motion_config["enabled"] or self.recording_config["enabled"]:
+            self.publisher = MQTTPublisher(
+                self.mqtt_config["broker"], self.mqtt_config["port"], client_id="RPi_Test_camera"
+            )
+            self.publisher.start()
+        if interval:
+            self.publisher.publish_periodically(
+                self.mqtt_config["topics"]["camera_metrics"], interval, self.get_metrics
+            )
+        if self.recording_config["enabled"]:
+            self.recorder = EventRecorder(self.broadcaster, self.recording_config)
+            self.recorder.start()
+            # Dashboard commands and IMU shocks from the robot controller
+            self.publisher.subscribe(self.mqtt_config["topics"]["camera_record"], self._on_record_command)
+        if self.motion_config["enabled"]:
+            self.motion = MotionDetector(self.broadcaster, self.motion_config, on_event=self._on_motion_event)
+            self.motion.start()
+        self.snapshots.start()
+
     def update_settings(self):
         """Update camera settings dynamically"""
         try:
@@ -223,6 +244,10 @@ class CameraController:
             if "quality" in data:
                 self.config["stream_quality"] = max(1, min(100, data["quality"]))
 
+            # libcamera-vid takes its settings on the command line
+            if self.pipeline.running:
+                self.pipeline.reconfigure()
+
             return jsonify(
                 {
                     "status": "updated",
@@ -251,6 +276,21 @@ def camera_status():
     return camera_controller.camera_status()
 
 
+@app.route("/api/camera/metrics")
+def camera_metrics():
+    return camera_controller.camera_metrics()
+
+
+@app.route("/api/camera/record", methods=["POST"])
+def start_recording():
+    return camera_controller.start_recording()
+
+
+@app.route("/api/camera/recordings")
+def list_recordings():
+    return camera_controller.list_recordings()
+
+
 @app.route("/api/camera/capture")
 def capture_single_image():
     return camera_controller.capture_single_image()
@@ -267,11 +307,18 @@ def stop_stream():
 
 if __name__ == "__main__":
     print("🚀 Starting Configurable MJPEG Camera Server...")
-    app.run(host="0.0.0.0", port=5000, debug=True, threaded=True)  # ← debug=True
+    debug = True
+    # The debug reloader re-runs this file in a child process; only that one serves
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        camera_controller.start_background_services()
+    app.run(host="0.0.0.0", port=5000, debug=debug, threaded=True)  # ← debug=True
     print("🌐 Endpoints:")
     print("   GET  /api/camera/stream - Start video stream")
     print("   GET  /api/camera/stop - Stop stream")
-    print("   GET  /api/camera/capture - Single high-quality image")
+    print("   GET  /api/camera/capture - Snapshot (?full=1 for a high-quality still)")
+    print("   GET  /api/camera/metrics - Capture/delivery metrics")
+    print("   POST /api/camera/record - Trigger an event recording")
+    print("   GET  /api/camera/recordings - List recorded segments")
     print("   GET  /api/camera/settings - View current settings")
     print("   POST /api/camera/settings/update - Update settings")
 
@@ -0,0 +1,360 @@
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from collections import deque
+
+SEGMENT_EXTENSION = ".mjpeg"
+INDEX_EXTENSION = ".idx"
+
+
+class EventRecorder:
+    """
+    Event-triggered recording of the camera stream with a pre-roll.
+
+    The recorder is one more consumer of the frame broadcaster (capture
+    keeps running while it is enabled) and holds the last `preroll_seconds`
+    of frames in memory, bounded by `preroll_bytes`. trigger() - from an
+    MQTT command, a motion event or an IMU shock - starts a segment: the
+    pre-roll plus the next `post_seconds` of frames are written to
+    <directory>/<time>_<reason>.mjpeg (concatenated JPEGs, playable as
+    MJPEG) with a JSON-lines .idx next to it (header, then seq, timestamp,
+    offset and size of every frame). A trigger during a recording extends
+    it, up to `max_segment_seconds`.
+
+    All disk I/O happens on a writer thread behind a queue bounded by
+    `queue_bytes`; when the SD card cannot keep up frames are dropped (and
+    counted) rather than stalling capture. The writer fsyncs in batches,
+    every `fsync_interval` seconds or `fsync_bytes` bytes and on close.
+    After each segment the oldest recordings are deleted until the
+    directory is under `retention_bytes` and at least `min_free_bytes` of
+    the filesystem are free.
+    """
+
+    def __init__(self, broadcaster, config):
+        self.broadcaster = broadcaster
+        self.config = config
+        self.directory = config["directory"]
+
+        self._preroll = deque()
+        self._preroll_bytes = 0
+        self._lock = threading.Lock()
+        self._pending = None
+        self._segment = None
+
+        self._queue = queue.Queue()
+        self._queued_bytes = 0
+        self._stop_event = threading.Event()
+        self._threads = []
+
+        self.recent_segments = deque(maxlen=10)
+        self.stats = {
+            "triggers": 0,
+            "segments": 0,
+            "frames_written": 0,
+            "bytes_written": 0,
+            "frames_dropped": 0,
+            "fsyncs": 0,
+            "deleted_segments": 0,
+            "write_errors": 0,
+            "last_error": None,
+        }
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.enforce_retention()
+        for target, name in ((self._capture_loop, "recorder-capture"), (self._writer_loop, "recorder-writer")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            self._threads.append(thread)
+            thread.start()
+        print(f"⏺️ Event recorder ready ({self.config['preroll_seconds']}s pre-roll, "
+              f"{self.config['post_seconds']}s post-roll) in {self.directory}")
+
+    def stop(self):
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+    # ---------- triggers ----------
+    def trigger(self, reason, details=None, duration=None):
+        """Record the pre-roll plus the next `duration` (default post_seconds) seconds"""
+        now = time.time()
+        until = now + (duration or self.config["post_seconds"])
+        entry = {"reason": reason, "timestamp": now, "details": details}
+        with self._lock:
+            self.stats["triggers"] += 1
+            if self._segment:
+                segment = self._segment
+                segment["until"] = min(max(segment["until"], until), segment["limit"])
+                segment["triggers"].append(entry)
+            elif self._pending:
+                self._pending["until"] = max(self._pending["until"], until)
+                self._pending["triggers"].append(entry)
+            else:
+                self._pending = {"reason": reason, "until": until, "triggers": [entry]}
+        print(f"⏺️ Recording triggered by {reason}")
+
+    @property
+    def recording(self):
+        return self._segment is not None
+
+    # ---------- capture side ----------
+    def _capture_loop(self):
+        client = self.broadcaster.subscribe("recorder")
+        try:
+            while not self._stop_event.is_set():
+                if client.closed:
+                    # Closed by /stream/stop without an id; keep recording
+                    self.broadcaster.unsubscribe(client)
+                    client = self.broadcaster.subscribe("recorder")
+                frame = self.broadcaster.next_frame(client, timeout=1.0)
+                if frame is not None:
+                    self.broadcaster.delivered(client, frame)
+                self._handle_frame(frame)
+            with self._lock:
+                if self._segment:
+                    self._close_segment()
+        finally:
+            self.broadcaster.unsubscribe(client)
+            self._queue.put(None)
+
+    def _handle_frame(self, frame):
+        with self._lock:
+            if self._pending and not self._segment:
+                self._open_segment(self._pending)
+                self._pending = None
+            segment = self._segment
+
+            if segment is None:
+                if frame is not None:
+                    self._add_preroll(frame)
+                return
+            if frame is not None:
+                self._enqueue_frame(frame)
+            if (frame.timestamp if frame else time.time()) >= segment["until"]:
+                self._close_segment()
+
+    def _add_preroll(self, frame):
+        self._preroll.append(frame)
+        self._preroll_bytes += len(frame.data)
+        oldest = frame.timestamp - self.config["preroll_seconds"]
+        while self._preroll and (
+            self._preroll_bytes > self.config["preroll_bytes"] or self._preroll[0].timestamp < oldest
+        ):
+            self._preroll_bytes -= len(self._preroll.popleft().data)
+
+    def _open_segment(self, pending):
+        started = pending["triggers"][0]["timestamp"]
+        reason = "".join(c if c.isalnum() or c in "-_" else "_" for c in pending["reason"])
+        name = time.strftime("%Y%m%d-%H%M%S", time.localtime(started)) + f"_{reason}"
+        self._segment = {
+            "name": name,
+            "reason": pending["reason"],
+            "started": started,
+            "until": min(pending["until"], started + self.config["max_segment_seconds"]),
+            "limit": started + self.config["max_segment_seconds"],
+            "triggers": pending["triggers"],
+            "preroll_frames": len(self._preroll),
+            "frames": 0,
+            "dropped": 0,
+        }
+        self._queue.put(("open", dict(self._segment)))
+        for frame in self._preroll:
+            self._enqueue_frame(frame)
+        self._preroll.clear()
+        self._preroll_bytes = 0
+
+    def _enqueue_frame(self, frame):
+        if self._queued_bytes + len(frame.data) > self.config["queue_bytes"]:
+            # The writer is behind; never block capture on the SD card
+            self._segment["dropped"] += 1
+            self.stats["frames_dropped"] += 1
+            return
+        self._queued_bytes += len(frame.data)
+        self._segment["frames"] += 1
+        self._queue.put(("frame", frame))
+
+    def _close_segment(self):
+        segment, self._segment = self._segment, None
+        self._queue.put(("close", {"triggers": segment["triggers"], "dropped": segment["dropped"]}))
+
+    # ---------- writer side ----------
+    def _writer_loop(self):
+        writer = None
+        while True:
+            try:
+                item = self._queue.get(timeout=self.config["fsync_interval"])
+            except queue.Empty:
+                if writer:
+                    writer.sync()
+                continue
+            if item is None:
+                break
+            kind, payload = item
+            if kind == "frame":
+                with self._lock:
+                    self._queued_bytes -= len(payload.data)
+            try:
+                if kind == "open":
+                    writer = _SegmentWriter(self.directory, payload, self.config, self.stats)
+                elif kind == "frame" and writer:
+                    writer.write(payload)
+                elif kind == "close" and writer:
+                    self.recent_segments.append(writer.close(payload))
+                    self.stats["segments"] += 1
+                    writer = None
+                    self.enforce_retention()
+            except OSError as e:
+                self.stats["write_errors"] += 1
+                self.stats["last_error"] = str(e)
+                print(f"❌ Recording write failed: {e}")
+                if writer:
+                    writer.abort()
+                    writer = None
+        if writer:
+            writer.close({"triggers": [], "dropped": 0})
+
+    # ---------- retention ----------
+    def list_segments(self):
+        segments = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(SEGMENT_EXTENSION):
+                base = entry.path[: -len(SEGMENT_EXTENSION)]
+                stat = entry.stat()
+                index_size = os.path.getsize(base + INDEX_EXTENSION) if os.path.exists(base + INDEX_EXTENSION) else 0
+                segments.append(
+                    {
+                        "name": entry.name[: -len(SEGMENT_EXTENSION)],
+                        "bytes": stat.st_size + index_size,
+                        "modified": stat.st_mtime,
+                    }
+                )
+        return sorted(segments, key=lambda segment: segment["modified"])
+
+    def enforce_retention(self):
+        """Delete the oldest segments until within retention_bytes and min_free_bytes"""
+        try:
+            segments = self.list_segments()
+            total = sum(segment["bytes"] for segment in segments)
+            free = shutil.disk_usage(self.directory).free
+        except OSError as e:
+            print(f"✗ Could not check recording retention: {e}")
+            return
+        for segment in segments:
+            if total <= self.config["retention_bytes"] and free >= self.config["min_free_bytes"]:
+                break
+            base = os.path.join(self.directory, segment["name"])
+            for path in (base + SEGMENT_EXTENSION, base + INDEX_EXTENSION):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            total -= segment["bytes"]
+            free += segment["bytes"]
+            self.stats["deleted_segments"] += 1
+            print(f"🗑️ Deleted old recording {segment['name']}")
+
+    def get_stats(self):
+        with self._lock:
+            preroll = {"frames": len(self._preroll), "bytes": self._preroll_bytes}
+            queued = self._queued_bytes
+            segment = self._segment
+        return {
+            **self.stats,
+            "recording": segment["name"] if segment else None,
+            "preroll": preroll,
+            "queued_bytes": queued,
+            "recent_segments": list(self.recent_segments),
+        }
+
+
+class _SegmentWriter:
+    """One segment's .mjpeg and .idx files, fsynced in batches"""
+
+    def __init__(self, directory, segment, config, stats):
+        self.config = config
+        self.stats = stats
+        self.segment = segment
+        base = os.path.join(directory, segment["name"])
+        self.paths = (base + SEGMENT_EXTENSION, base + INDEX_EXTENSION)
+        self.data_file = open(self.paths[0], "wb")
+        self.index_file = open(self.paths[1], "w")
+        self.offset = 0
+        self.frames = 0
+        self.first_timestamp = None
+        self.last_timestamp = None
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+        self._write_index(
+            {
+                "segment": segment["name"],
+                "reason": segment["reason"],
+                "started": segment["started"],
+                "preroll_frames": segment["preroll_frames"],
+                "format": "mjpeg",
+            }
+        )
+        print(f"⏺️ Recording {self.paths[0]}")
+
+    def _write_index(self, record):
+        self.index_file.write(json.dumps(record) + "\n")
+
+    def write(self, frame):
+        self.data_file.write(frame.data)
+        self._write_index({"seq": frame.seq, "t": round(frame.timestamp, 3), "offset": self.offset, "size": len(frame.data)})
+        self.offset += len(frame.data)
+        self.frames += 1
+        self.first_timestamp = self.first_timestamp or frame.timestamp
+        self.last_timestamp = frame.timestamp
+        self.unsynced += len(frame.data)
+        self.stats["frames_written"] += 1
+        self.stats["bytes_written"] += len(frame.data)
+        if (
+            self.unsynced >= self.config["fsync_bytes"]
+            or time.monotonic() - self.last_sync >= self.config["fsync_interval"]
+        ):
+            self.sync()
+
+    def sync(self):
+        if not self.unsynced:
+            return
+        for f in (self.data_file, self.index_file):
+            f.flush()
+            os.fsync(f.fileno())
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+        self.stats["fsyncs"] += 1
+
+    def close(self, summary):
+        duration = (self.last_timestamp - self.first_timestamp) if self.frames else 0
+        self._write_index(
+            {
+                "end": True,
+                "frames": self.frames,
+                "bytes": self.offset,
+                "duration_s": round(duration, 2),
+                "dropped": summary["dropped"],
+                "triggers": summary["triggers"],
+            }
+        )
+        self.unsynced = max(self.unsynced, 1)
+        self.sync()
+        self.data_file.close()
+        self.index_file.close()
+        print(f"✓ Recorded {self.segment['name']}: {self.frames} frames, {self.offset} bytes, {duration:.1f}s")
+        return {
+            "name": self.segment["name"],
+            "reason": self.segment["reason"],
+            "frames": self.frames,
+            "bytes": self.offset,
+            "duration_s": round(duration, 2),
+        }
+
+    def abort(self):
+        for f in (self.data_file, self.index_file):
+            try:
+                f.close()
+            except OSError:
+                pass
@@ -0,0 +1,173 @@
+import itertools
+import threading
+import time
+
+from network.command_tracer import LatencyHistogram
+
+# Weight of the newest delivery in the per-viewer rate averages
+RATE_ALPHA = 0.2
+
+
+class StreamClient:
+    """
+    One MJPEG viewer: its cursor into the frame sequence and its counters.
+
+    FPS and bytes/s are exponential moving averages over deliveries (a frame
+    counts as delivered once the server has written it to the socket), and
+    decay while nothing is delivered.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, client_id=None):
+        self.id = str(client_id) if client_id else f"client-{next(self._ids)}"
+        self.cursor = 0
+        self.connected_at = time.time()
+        self.frames = 0
+        self.dropped = 0
+        self.bytes = 0
+        self.closed = False
+        self.last_delivery = None
+        self.last_age_ms = None
+        self._interval = None
+        self._frame_bytes = 0.0
+
+    def record_delivery(self, size, now, age_ms):
+        if self.last_delivery is not None:
+            interval = now - self.last_delivery
+            if self._interval is None:
+                self._interval = interval
+            else:
+                self._interval += RATE_ALPHA * (interval - self._interval)
+            self._frame_bytes += RATE_ALPHA * (size - self._frame_bytes)
+        else:
+            self._frame_bytes = size
+        self.last_delivery = now
+        self.last_age_ms = age_ms
+        self.frames += 1
+        self.bytes += size
+
+    def to_dict(self):
+        now = time.time()
+        fps = bytes_per_s = 0.0
+        if self._interval:
+            # A stalled viewer's rate falls off instead of freezing at its last value
+            interval = max(self._interval, now - self.last_delivery)
+            fps = 1 / interval
+            bytes_per_s = self._frame_bytes / interval
+        return {
+            "id": self.id,
+            "connected_s": round(now - self.connected_at, 1),
+            "frames": self.frames,
+            "dropped": self.dropped,
+            "bytes": self.bytes,
+            "fps": round(fps, 2),
+            "bytes_per_s": round(bytes_per_s),
+            "last_frame_age_ms": round(self.last_age_ms, 1) if self.last_age_ms is not None else None,
+        }
+
+
+class FrameBroadcaster:
+    """
+    Fans the output of one capture pipeline out to any number of viewers.
+
+    There is exactly one producer (the pipeline); each viewer only keeps a
+    cursor (the last frame sequence number it sent) and sleeps on the
+    pipeline's condition variable until a newer frame exists. A viewer that
+    falls behind is handed the newest frame and the frames it missed are
+    counted as dropped, so slow clients never queue stale video. Capture is
+    started by the first subscriber and stopped `idle_timeout` seconds after
+    the last one leaves (the grace period covers page reloads).
+    """
+
+    def __init__(self, source, idle_timeout=2.0):
+        self.source = source
+        self.idle_timeout = idle_timeout
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._idle_timer = None
+        # Age of frames (capture to written to the viewer's socket)
+        self.delivery_histogram = LatencyHistogram()
+        self.totals = {"viewers": 0, "frames": 0, "dropped": 0, "bytes": 0}
+
+    @property
+    def active(self):
+        return bool(self._clients)
+
+    def subscribe(self, client_id=None):
+        client = StreamClient(client_id)
+        with self._lock:
+            if self._idle_timer:
+                self._idle_timer.cancel()
+                self._idle_timer = None
+            self._clients[client.id] = client
+            self.totals["viewers"] += 1
+            if not self.source.running:
+                print("🎥 Viewer connected, starting capture")
+                self.source.start()
+        # Start from the next frame, not whatever is left in the ring
+        latest = self.source.latest()
+        client.cursor = latest.seq if latest else 0
+        return client
+
+    def unsubscribe(self, client):
+        with self._lock:
+            if self._clients.get(client.id) is client:
+                del self._clients[client.id]
+            if self._clients or self._idle_timer:
+                return
+            self._idle_timer = threading.Timer(self.idle_timeout, self._stop_if_idle)
+            self._idle_timer.daemon = True
+            self._idle_timer.start()
+
+    def _stop_if_idle(self):
+        with self._lock:
+            self._idle_timer = None
+            if self._clients:
+                return
+            print("🛑 Last viewer left, stopping capture")
+            self.source.stop()
+
+    def next_frame(self, client, timeout=1.0):
+        """Newest frame after the client's cursor, or None on timeout/close"""
+        if client.closed:
+            return None
+        frame = self.source.wait_for_frame(client.cursor, timeout)
+        if frame is None or client.closed:
+            return None
+        if client.cursor:
+            dropped = frame.seq - client.cursor - 1
+            client.dropped += dropped
+            self.totals["dropped"] += dropped
+        client.cursor = frame.seq
+        return frame
+
+    def delivered(self, client, frame):
+        """Record that `frame` has been written to the client"""
+        now = time.time()
+        age_ms = (now - frame.timestamp) * 1000
+        client.record_delivery(len(frame.data), now, age_ms)
+        self.delivery_histogram.add(age_ms)
+        self.totals["frames"] += 1
+        self.totals["bytes"] += len(frame.data)
+
+    def close(self, client_id=None):
+        """End one viewer's stream (or all of them); returns how many were closed"""
+        with self._lock:
+            if client_id is None:
+                clients = list(self._clients.values())
+            else:
+                clients = [self._clients[client_id]] if client_id in self._clients else []
+        for client in clients:
+            client.closed = True
+        return len(clients)
+
+    def get_stats(self):
+        with self._lock:
+            clients = [client.to_dict() for client in self._clients.values()]
+        return {
+            "viewers": len(clients),
+            "clients": clients,
+            "totals": dict(self.totals),
+            "delivery_age_ms": self.delivery_histogram.to_dict(),
+        }
@@ -0,0 +1,285 @@
+import io
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+from PIL import Image
+
+from network.command_tracer import LatencyHistogram
+
+
+def parse_mask(spec):
+    """Parse "x,y,w,h;x,y,w,h" (fractions of the frame) into ignore rectangles"""
+    rects = []
+    for part in (spec or "").split(";"):
+        if part.strip():
+            x, y, w, h = (float(value) for value in part.split(","))
+            rects.append((x, y, w, h))
+    return rects
+
+
+class MotionDetector:
+    """
+    Frame-differencing motion detection on the camera stream.
+
+    The detector is one more consumer of the frame broadcaster, so capture
+    keeps running while it is enabled. It analyses at most every `every_n`th
+    frame: the JPEG is decoded in Pillow's draft mode, which has libjpeg
+    scale the DCT down by up to 8x and output grayscale directly, so a
+    1024x720 frame becomes a ~128x90 array for a fraction of a full decode.
+    A running-average background is kept per pixel; pixels differing from
+    it by more than `pixel_threshold` (outside the ignore mask) are counted
+    per grid cell, active cells are grouped into bounding boxes, and the
+    changed fraction is the frame's score. A change over `global_threshold`
+    of the frame (the robot driving, lights switching) resets the background
+    instead of raising an event.
+
+    Events go to `on_event`: "motion_start", then "motion" at most every
+    `event_interval` seconds while it lasts, and "motion_end" after
+    `quiet_period` seconds without motion.
+
+    CPU budget: the thread CPU time of every analysis is measured and the
+    next one is not started before cost / cpu_budget seconds have passed,
+    so the stage never uses more than `cpu_budget` of one core. The thread
+    also runs at a lower scheduling priority than streaming and control.
+    """
+
+    def __init__(self, broadcaster, config, on_event):
+        self.broadcaster = broadcaster
+        self.config = config
+        self.on_event = on_event
+
+        self.every_n = max(1, config["every_n"])
+        self.scale = config["scale"]
+        self.alpha = config["alpha"]
+        self.cell = config["cell_size"]
+        self.mask_rects = parse_mask(config["mask"])
+
+        self._background = None
+        self._samples = 0
+        self._valid = None
+        self._warmup = 0
+        self._active = False
+        self._last_motion = 0.0
+        self._last_event = 0.0
+        self._event_boxes = []
+        self._peak_score = 0.0
+
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.histogram = LatencyHistogram()
+        self.events = deque(maxlen=20)
+        self.stats = {
+            "analysed": 0,
+            "skipped_budget": 0,
+            "decode_errors": 0,
+            "background_resets": 0,
+            "events": 0,
+            "cpu_share": 0.0,
+            "last_score": 0.0,
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="motion-detector", daemon=True)
+        self._thread.start()
+        print(f"👁️ Motion detection enabled (every {self.every_n} frames, "
+              f"{self.config['cpu_budget'] * 100:.0f}% CPU budget)")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=3)
+
+    def _run(self):
+        try:
+            # Linux applies the nice value to this thread only
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self.config["nice"])
+        except (AttributeError, OSError) as e:
+            print(f"✗ Could not lower motion detector priority: {e}")
+
+        client = self.broadcaster.subscribe("motion-detector")
+        next_allowed = 0.0
+        last_seq = 0
+        last_started = last_cost = None
+        try:
+            while not self._stop_event.is_set():
+                if client.closed:
+                    # Closed by /stream/stop without an id; keep watching
+                    self.broadcaster.unsubscribe(client)
+                    client = self.broadcaster.subscribe("motion-detector")
+                frame = self.broadcaster.next_frame(client, timeout=1.0)
+                if frame is None:
+                    self._check_quiet()
+                    continue
+                if frame.seq - last_seq < self.every_n:
+                    continue
+                if time.monotonic() < next_allowed:
+                    self.stats["skipped_budget"] += 1
+                    continue
+                last_seq = frame.seq
+
+                started = time.monotonic()
+                if last_started is not None:
+                    share = last_cost / (started - last_started)
+                    weight = 0.1 if self.stats["analysed"] > 2 else 1.0
+                    self.stats["cpu_share"] += weight * (share - self.stats["cpu_share"])
+                cpu_started = time.thread_time()
+                self._analyse(frame)
+                cost = time.thread_time() - cpu_started
+                self.histogram.add(cost * 1000)
+                self.broadcaster.delivered(client, frame)
+                # Idle long enough that cost / (cost + idle) <= cpu_budget
+                next_allowed = started + cost / self.config["cpu_budget"]
+                last_started, last_cost = started, cost
+        finally:
+            self.broadcaster.unsubscribe(client)
+
+    # ---------- analysis ----------
+    def _decode(self, data):
+        image = Image.open(io.BytesIO(data))
+        width, height = image.size
+        image.draft("L", (width // self.scale, height // self.scale))
+        return np.asarray(image.convert("L"), dtype=np.float32)
+
+    def _build_valid_mask(self, shape):
+        height, width = shape
+        valid = np.ones(shape, dtype=bool)
+        for x, y, w, h in self.mask_rects:
+            valid[int(y * height) : int((y + h) * height), int(x * width) : int((x + w) * width)] = False
+        return valid
+
+    def _analyse(self, frame):
+        try:
+            gray = self._decode(frame.data)
+        except Exception as e:
+            self.stats["decode_errors"] += 1
+            print(f"✗ Motion detector could not decode frame {frame.seq}: {e}")
+            return
+
+        self.stats["analysed"] += 1
+        if self._background is None or self._background.shape != gray.shape:
+            self._reset_background(gray)
+            self._valid = self._build_valid_mask(gray.shape)
+            return
+
+        changed = (np.abs(gray - self._background) > self.config["pixel_threshold"]) & self._valid
+        score = float(changed.sum()) / max(1, int(self._valid.sum()))
+        self.stats["last_score"] = round(score, 4)
+
+        if score > self.config["global_threshold"]:
+            self._reset_background(gray)
+            return
+
+        # Running average, in place; a plain mean of the frames since a reset
+        # until that is slower than alpha, so the first frame leaves no ghosts
+        self._samples += 1
+        self._background += max(self.alpha, 1.0 / self._samples) * (gray - self._background)
+
+        if self._warmup:
+            self._warmup -= 1
+            return
+
+        boxes = self._boxes(changed) if score >= self.config["score_threshold"] else []
+        self._update_state(frame, score, boxes)
+
+    def _reset_background(self, gray):
+        self._background = gray.copy()
+        self._samples = 1
+        self._warmup = self.config["warmup_frames"]
+        self.stats["background_resets"] += 1
+
+    def _boxes(self, changed):
+        """Bounding boxes (fractions of the frame) of connected active grid cells"""
+        height, width = changed.shape
+        rows, cols = height // self.cell, width // self.cell
+        if not rows or not cols:
+            return []
+        cells = changed[: rows * self.cell, : cols * self.cell].reshape(rows, self.cell, cols, self.cell)
+        fraction = cells.mean(axis=(1, 3))
+        active = fraction >= self.config["cell_fraction"]
+
+        boxes = []
+        seen = np.zeros_like(active)
+        for row, col in zip(*np.nonzero(active)):
+            if seen[row, col]:
+                continue
+            # Flood fill over the (small) cell grid
+            stack = [(row, col)]
+            seen[row, col] = True
+            members = []
+            while stack:
+                r, c = stack.pop()
+                members.append((r, c))
+                for nr, nc in ((r - 1, c), (r + 1, c), (r, c - 1), (r, c + 1)):
+                    if 0 <= nr < rows and 0 <= nc < cols and active[nr, nc] and not seen[nr, nc]:
+                        seen[nr, nc] = True
+                        stack.append((nr, nc))
+            if len(members) < self.config["min_cells"]:
+                continue
+            member_rows = [int(r) for r, _ in members]
+            member_cols = [int(c) for _, c in members]
+            top, left = min(member_rows), min(member_cols)
+            bottom, right = max(member_rows) + 1, max(member_cols) + 1
+            boxes.append(
+                {
+                    "x": round(left / cols, 3),
+                    "y": round(top / rows, 3),
+                    "w": round((right - left) / cols, 3),
+                    "h": round((bottom - top) / rows, 3),
+                    "score": round(float(np.mean([fraction[r, c] for r, c in members])), 3),
+                }
+            )
+        boxes.sort(key=lambda box: box["w"] * box["h"], reverse=True)
+        return boxes[: self.config["max_boxes"]]
+
+    # ---------- events ----------
+    def _update_state(self, frame, score, boxes):
+        now = time.time()
+        if not boxes:
+            self._check_quiet()
+            return
+
+        self._last_motion = now
+        self._peak_score = max(self._peak_score, score)
+        self._event_boxes = boxes
+        if not self._active:
+            self._active = True
+            self._emit("motion_start", frame, score, boxes)
+        elif now - self._last_event >= self.config["event_interval"]:
+            self._emit("motion", frame, score, boxes)
+
+    def _check_quiet(self):
+        if self._active and time.time() - self._last_motion >= self.config["quiet_period"]:
+            self._active = False
+            self._emit("motion_end", None, self._peak_score, self._event_boxes)
+            self._peak_score = 0.0
+
+    def _emit(self, kind, frame, score, boxes):
+        now = time.time()
+        self._last_event = now
+        event = {
+            "type": kind,
+            "timestamp": now,
+            "frame_seq": frame.seq if frame else None,
+            "frame_timestamp": frame.timestamp if frame else None,
+            "score": round(score, 4),
+            "boxes": boxes,
+        }
+        self.events.append(event)
+        self.stats["events"] += 1
+        print(f"👁️ {kind}: score {score:.3f}, {len(boxes)} region(s)")
+        try:
+            self.on_event(event)
+        except Exception as e:
+            print(f"✗ Failed to publish motion event: {e}")
+
+    def get_stats(self):
+        return {
+            **self.stats,
+            "cpu_share": round(self.stats["cpu_share"], 3),
+            "active": self._active,
+            "analysis_ms": self.histogram.to_dict(),
+            "recent_events": list(self.events)[-5:],
+        }
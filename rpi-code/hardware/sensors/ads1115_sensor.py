@@ -1,25 +1,77 @@
+import time
 import board
 import busio
 from adafruit_ads1x15.ads1115 import ADS1115
 from adafruit_ads1x15.analog_in import AnalogIn
 from adafruit_ads1x15.ads1x15 import Mode
+from .circuit_breaker import CircuitBreaker
 
 class ADS1115Sensor:
-    def __init__(self, i2c_bus=None, address=0x48, gain=1):
-        self.i2c_bus = i2c_bus or busio.I2C(board.SCL, board.SDA)
+    def __init__(self, i2c_bus=None, address=0x48, gain=1, bus_manager=None, breaker=None):
+        self.bus_manager = bus_manager
+        self.breaker = breaker or CircuitBreaker("ads1115")
+        self.i2c_bus = i2c_bus or (
+            bus_manager.i2c_bus if bus_manager else busio.I2C(board.SCL, board.SDA)
+        )
         self.address = address
         self.gain = gain
         self.ads = None
         self.channels = {}
+        self.last_readings = {}  # Last good channel readings, served while the breaker is open
+        self.last_read_at = {}  # Monotonic time of each channel's last good reading
 
-        self._initialize()
+        self.breaker.attach(self._initialize)
+        if not self._initialize():
+            self.breaker.trip("not found at startup")
+
+    def _bus_transaction(self, func, priority="environmental"):
+        """Run a bus access through the shared bus manager when available"""
+        if self.bus_manager:
+            return self.bus_manager.execute("ads1115", func, priority=priority)
+        return func()
+
+    def _read_channels(self, names):
+        """Read value and voltage of the named channels in one bus transaction"""
+        return {
+            name: {
+                "value": round(self.channels[name].value, 2),
+                "voltage": round(self.channels[name].voltage, 2),
+            }
+            for name in names
+        }
+
+    def _read_guarded(self, names, priority):
+        """Read channels through the circuit breaker
+
+        Returns None when the device is unavailable and no earlier reading exists.
+        Earlier readings are marked stale, with read_at set to the oldest of them.
+        """
+        if not self.ads or not self.breaker.allow():
+            if all(name in self.last_readings for name in names):
+                readings = {name: dict(self.last_readings[name]) for name in names}
+                readings["stale"] = True
+                readings["read_at"] = min(self.last_read_at[name] for name in names)
+                return readings
+            return None
+
+        try:
+            readings = self._bus_transaction(lambda: self._read_channels(names), priority)
+        except Exception as e:
+            self.breaker.record_failure(e)
+            raise
+        self.breaker.record_success()
+        self.last_readings.update(readings)
+        read_at = time.monotonic()
+        self.last_read_at.update((name, read_at) for name in names)
+        return readings
 
     def _initialize(self):
         """Initialize ADS1115 sensor and channels"""
         try:
-            self.ads = ADS1115(self.i2c_bus, address=self.address)
-            self.ads.gain = self.gain
-            self.ads.mode = Mode.CONTINUOUS  # Continuous conversion mode
+            self.ads = self._bus_transaction(
+                lambda: ADS1115(self.i2c_bus, address=self.address)
+            )
+            self._bus_transaction(self._configure)
 
             # Initialize analog input channels - FIXED CONSTANTS
             self.channels = {
@@ -41,25 +93,25 @@ class ADS1115Sensor:
             self.channels = {}
             return False
 
+    def _configure(self):
+        """Apply gain and conversion mode"""
+        self.ads.gain = self.gain
+        self.ads.mode = Mode.CONTINUOUS  # Continuous conversion mode
+
     def read_gas_sensors(self):
         """Read MQ2 and MQ135 gas sensor data"""
         try:
-            if not self.ads:
+            readings = self._read_guarded(["mq2", "mq135"], "environmental")
+            if readings is None:
                 return {
                     "MQ2": {"value": "Sensor Not Found", "voltage": "Sensor Not Found"},
                     "MQ135": {"value": "Sensor Not Found", "voltage": "Sensor Not Found"},
                 }
 
-            return {
-                "MQ2": {
-                    "value": round(self.channels["mq2"].value, 2),
-                    "voltage": round(self.channels["mq2"].voltage, 2),
-                },
-                "MQ135": {
-                    "value": round(self.channels["mq135"].value, 2),
-                    "voltage": round(self.channels["mq135"].voltage, 2),
-                },
-            }
+            gas = {"MQ2": readings["mq2"], "MQ135": readings["mq135"]}
+            if readings.get("stale"):
+                gas.update(stale=True, read_at=readings["read_at"])
+            return gas
         except Exception as e:
             print(f"[ADS1115 Gas Sensors Read Error] {e}")
             return {
@@ -70,22 +122,14 @@ class ADS1115Sensor:
     def read_battery(self):
         """Read Current and Voltage of the battery"""
         try:
-            if not self.ads:
+            readings = self._read_guarded(["battery_current", "battery_voltage"], "battery")
+            if readings is None:
                 return {
                     "battery_current": {"value": "Sensor Not Found", "voltage": "Sensor Not Found"},
                     "battery_voltage": {"value": "Sensor Not Found", "voltage": "Sensor Not Found"},
                 }
 
-            return {
-                "battery_current": {
-                    "value": round(self.channels["battery_current"].value, 2),
-                    "voltage": round(self.channels["battery_current"].voltage, 2),
-                },
-                "battery_voltage": {
-                    "value": round(self.channels["battery_voltage"].value, 2),
-                    "voltage": round(self.channels["battery_voltage"].voltage, 2),
-                },
-            }
+            return readings
         except Exception as e:
             print(f"[ADS1115 Battery Read Error] {e}")
             return {
@@ -97,12 +141,14 @@ class ADS1115Sensor:
         """Read specific channel by name"""
         if channel_name in self.channels:
             channel = self.channels[channel_name]
-            return {"value": channel.value, "voltage": channel.voltage}
+            return self._bus_transaction(
+                lambda: {"value": channel.value, "voltage": channel.voltage}
+            )
         return {"value": "Channel Not Found", "voltage": "Channel Not Found"}
 
     def is_connected(self):
         """Check if sensor is connected and working"""
-        return self.ads is not None
+        return self.ads is not None and self.breaker.allow()
 
     def print_debug_info(self):
         """Print debug information about all channels"""
@@ -1,30 +1,35 @@
+import time
 import board
 import busio
 import adafruit_bmp280
+from .circuit_breaker import CircuitBreaker
 
 class BMP280Sensor:
-    def __init__(self, i2c_bus=None, address=0x76):
-        self.i2c_bus = i2c_bus or busio.I2C(board.SCL, board.SDA)
+    def __init__(self, i2c_bus=None, address=0x76, bus_manager=None, breaker=None):
+        self.bus_manager = bus_manager
+        self.breaker = breaker or CircuitBreaker("bmp280")
+        self.i2c_bus = i2c_bus or (
+            bus_manager.i2c_bus if bus_manager else busio.I2C(board.SCL, board.SDA)
+        )
         self.address = address
         self.bmp280 = None
-        
-        self._initialize()
+        self.last_data = None  # Last good reading, served while the breaker is open
+        self.last_read_at = None  # Monotonic time of last_data
+
+        self.breaker.attach(self._initialize)
+        if not self._initialize():
+            self.breaker.trip("not found at startup")
+
+    def _bus_transaction(self, func):
+        """Run a bus access through the shared bus manager when available"""
+        if self.bus_manager:
+            return self.bus_manager.execute("bmp280", func, priority="environmental")
+        return func()
 
     def _initialize(self):
         """Initialize BMP280 sensor"""
         try:
-            self.bmp280 = adafruit_bmp280.Adafruit_BMP280_I2C(
-                self.i2c_bus, address=self.address
-            )
-            
-            # Configure sensor settings
-            self.bmp280.sea_level_pressure = 1013.25
-            self.bmp280.mode = adafruit_bmp280.MODE_NORMAL
-            self.bmp280.standby_period = adafruit_bmp280.STANDBY_TC_500
-            self.bmp280.iir_filter = adafruit_bmp280.IIR_FILTER_X16
-            self.bmp280.overscan_pressure = adafruit_bmp280.OVERSCAN_X16
-            self.bmp280.overscan_temperature = adafruit_bmp280.OVERSCAN_X2
-            
+            self.bmp280 = self._bus_transaction(self._create_device)
             print("✓ BMP280 initialized successfully")
             return True
             
@@ -33,9 +38,26 @@ class BMP280Sensor:
             self.bmp280 = None
             return False
 
+    def _create_device(self):
+        """Create and configure the BMP280 device"""
+        bmp280 = adafruit_bmp280.Adafruit_BMP280_I2C(self.i2c_bus, address=self.address)
+
+        # Configure sensor settings
+        bmp280.sea_level_pressure = 1013.25
+        bmp280.mode = adafruit_bmp280.MODE_NORMAL
+        bmp280.standby_period = adafruit_bmp280.STANDBY_TC_500
+        bmp280.iir_filter = adafruit_bmp280.IIR_FILTER_X16
+        bmp280.overscan_pressure = adafruit_bmp280.OVERSCAN_X16
+        bmp280.overscan_temperature = adafruit_bmp280.OVERSCAN_X2
+        return bmp280
+
     def read_data(self):
         """Read environmental sensor data"""
-        if not self.bmp280:
+        # Fast-fail while the breaker is open: serve the last good reading,
+        # marked stale and stamped with the time it was actually taken
+        if not self.bmp280 or not self.breaker.allow():
+            if self.last_data:
+                return {**self.last_data, "stale": True, "read_at": self.last_read_at}
             return {
                 "temperature": "Sensor Not Found",
                 "pressure": "Sensor Not Found", 
@@ -43,13 +65,20 @@ class BMP280Sensor:
             }
 
         try:
-            return {
-                "temperature": round(self.bmp280.temperature, 2),
-                "pressure": round(self.bmp280.pressure, 2),
-                "altitude": round(self.bmp280.altitude, 2)
-            }
+            data = self._bus_transaction(
+                lambda: {
+                    "temperature": round(self.bmp280.temperature, 2),
+                    "pressure": round(self.bmp280.pressure, 2),
+                    "altitude": round(self.bmp280.altitude, 2),
+                }
+            )
+            self.breaker.record_success()
+            self.last_data = data
+            self.last_read_at = time.monotonic()
+            return dict(data)
         except Exception as e:
             print(f"[BMP280 Read Error] {e}")
+            self.breaker.record_failure(e)
             return {
                 "temperature": "Read Error",
                 "pressure": "Read Error",
@@ -63,4 +92,4 @@ class BMP280Sensor:
 
     def is_connected(self):
         """Check if sensor is connected and working"""
-        return self.bmp280 is not None
\ No newline at end of file
+        return self.bmp280 is not None and self.breaker.allow()
\ No newline at end of file
@@ -0,0 +1,128 @@
+import threading
+import time
+
+
+class CircuitBreaker:
+    """
+    Per-device circuit breaker for I2C sensors.
+
+    After `failure_threshold` consecutive failures the breaker opens: reads are
+    refused immediately (no bus access, no settle delays) and a background
+    probe retries the device's initialization with exponential backoff until
+    it succeeds and the breaker closes again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+
+    def __init__(self, name, failure_threshold=3, initial_backoff=1.0, max_backoff=60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.recoveries = 0
+        self.probe_attempts = 0
+        self.last_error = None
+        self.opened_at = None
+        self.next_probe_at = None
+
+        self._probe = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._probe_thread = None
+
+    def attach(self, probe):
+        """Set the callable used to re-initialize the device; returns True on success"""
+        self._probe = probe
+
+    def allow(self):
+        """Return True if the device may be accessed"""
+        return self.state == self.CLOSED
+
+    def record_success(self):
+        if self.consecutive_failures:
+            with self._lock:
+                self.consecutive_failures = 0
+
+    def record_failure(self, error):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.last_error = str(error)
+            should_trip = (
+                self.state == self.CLOSED
+                and self.consecutive_failures >= self.failure_threshold
+            )
+        if should_trip:
+            self.trip(error)
+
+    def trip(self, error=None):
+        """Open the breaker and start probing the device in the background"""
+        with self._lock:
+            if self.state == self.OPEN:
+                return
+            self.state = self.OPEN
+            self.trips += 1
+            self.opened_at = time.monotonic()
+            if error is not None:
+                self.last_error = str(error)
+
+        print(f"⚡ {self.name} circuit breaker OPEN ({self.last_error})")
+
+        if self._probe and not self._stop_event.is_set():
+            self._probe_thread = threading.Thread(
+                target=self._probe_loop, name=f"probe-{self.name}", daemon=True
+            )
+            self._probe_thread.start()
+
+    def _probe_loop(self):
+        backoff = self.initial_backoff
+        while not self._stop_event.is_set():
+            self.next_probe_at = time.monotonic() + backoff
+            if self._stop_event.wait(backoff):
+                return
+
+            self.probe_attempts += 1
+            try:
+                recovered = self._probe()
+            except Exception as e:
+                self.last_error = str(e)
+                recovered = False
+
+            if recovered:
+                with self._lock:
+                    self.state = self.CLOSED
+                    self.consecutive_failures = 0
+                    self.recoveries += 1
+                    self.next_probe_at = None
+                print(f"✓ {self.name} circuit breaker closed, device recovered")
+                return
+
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def get_health(self):
+        """Return breaker state and trip statistics"""
+        now = time.monotonic()
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "trips": self.trips,
+            "recoveries": self.recoveries,
+            "probe_attempts": self.probe_attempts,
+            "last_error": self.last_error,
+            "open_for_s": round(now - self.opened_at, 1)
+            if self.state == self.OPEN and self.opened_at
+            else 0,
+            "next_probe_in_s": round(max(0.0, self.next_probe_at - now), 1)
+            if self.state == self.OPEN and self.next_probe_at
+            else None,
+        }
+
+    def stop(self):
+        """Stop any running probe"""
+        self._stop_event.set()
+        if self._probe_thread:
+            self._probe_thread.join(timeout=1)
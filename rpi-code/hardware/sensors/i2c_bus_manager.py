@@ -0,0 +1,231 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import board
+import busio
+
+
+class _Transaction:
+    """A queued unit of bus work, ordered by priority then arrival"""
+
+    def __init__(self, device, priority, func=None, address=None, register=None, length=0):
+        self.device = device
+        self.priority = priority
+        self.func = func
+        self.address = address
+        self.register = register
+        self.length = length
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+    def is_register_read(self):
+        return self.func is None
+
+
+class I2CBusManager:
+    """
+    Owns the shared I2C bus and serializes every transaction on it.
+
+    Requests are queued by priority (IMU first, environmental last) and run
+    one at a time on a single worker thread, so a slow ADC conversion can never
+    hold the bus while the control loop waits for the IMU. A transaction
+    whose caller has already timed out is cancelled and skipped instead of
+    taking the bus late.
+    """
+
+    def __init__(self, i2c_bus=None, config=None):
+        self.i2c_bus = i2c_bus or busio.I2C(board.SCL, board.SDA)
+
+        bus_config = config.I2C_BUS_CONFIG if config else {}
+        self.priorities = bus_config.get(
+            "priorities", {"imu": 0, "battery": 1, "environmental": 2}
+        )
+        self.default_priority = max(self.priorities.values()) + 1
+        self.transaction_timeout = bus_config.get("transaction_timeout", 1.0)
+
+        self._queue = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._running = True
+        self._worker_thread = None
+
+        self.stats = {}
+        self._stats_lock = threading.Lock()
+
+        self._worker_thread = threading.Thread(
+            target=self._worker, name="i2c-bus-manager", daemon=True
+        )
+        self._worker_thread.start()
+
+        print("✓ I2C bus manager started")
+
+    # ---------- public API ----------
+
+    def execute(self, device, func, priority=None, timeout=None):
+        """Run func() with exclusive use of the bus and return its result"""
+        transaction = _Transaction(device, self._resolve_priority(priority), func=func)
+        return self._submit(transaction, timeout)
+
+    def read_registers(self, device, address, register, length, priority=None, timeout=None):
+        """Read `length` bytes starting at `register` from the device at `address`"""
+        transaction = _Transaction(
+            device,
+            self._resolve_priority(priority),
+            address=address,
+            register=register,
+            length=length,
+        )
+        return self._submit(transaction, timeout)
+
+    def get_stats(self):
+        """Return per-device transaction counts, latency and error rates"""
+        with self._stats_lock:
+            report = {}
+            for device, stats in self.stats.items():
+                count = stats["transactions"]
+                report[device] = {
+                    "transactions": count,
+                    "errors": stats["errors"],
+                    "expired": stats["expired"],
+                    "error_rate": round(stats["errors"] / count, 4) if count else 0,
+                    "avg_latency_ms": round(stats["latency_total"] / count * 1000, 3)
+                    if count
+                    else 0,
+                    "max_latency_ms": round(stats["latency_max"] * 1000, 3),
+                    "avg_queue_wait_ms": round(stats["wait_total"] / count * 1000, 3)
+                    if count
+                    else 0,
+                }
+            return report
+
+    def stop(self):
+        """Stop the worker thread, failing any transactions still queued"""
+        with self._condition:
+            self._running = False
+            pending = [entry[2] for entry in self._queue]
+            self._queue = []
+            self._condition.notify_all()
+
+        for transaction in pending:
+            if transaction.future.set_running_or_notify_cancel():
+                transaction.future.set_exception(RuntimeError("I2C bus manager stopped"))
+
+        if self._worker_thread:
+            self._worker_thread.join(timeout=1)
+
+    # ---------- internals ----------
+
+    def _resolve_priority(self, priority):
+        if priority is None:
+            return self.default_priority
+        if isinstance(priority, str):
+            return self.priorities.get(priority, self.default_priority)
+        return priority
+
+    def _submit(self, transaction, timeout):
+        # Calls made from the worker itself (e.g. nested driver access) run inline
+        if threading.current_thread() is self._worker_thread:
+            self._run(transaction)
+        else:
+            with self._condition:
+                if not self._running:
+                    raise RuntimeError("I2C bus manager stopped")
+                heapq.heappush(
+                    self._queue,
+                    (transaction.priority, next(self._sequence), transaction),
+                )
+                self._condition.notify()
+
+        try:
+            return transaction.future.result(
+                timeout=timeout if timeout is not None else self.transaction_timeout
+            )
+        except FutureTimeoutError:
+            # Nobody is waiting for the result any more; if the worker has not
+            # started it yet, it will be skipped
+            transaction.future.cancel()
+            raise
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                while self._running and not self._queue:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                transaction = heapq.heappop(self._queue)[2]
+
+            self._run(transaction)
+
+    def _run(self, transaction):
+        # Marks the transaction running; a cancelled (timed out) one is skipped
+        if not transaction.future.set_running_or_notify_cancel():
+            with self._stats_lock:
+                self._device_stats(transaction.device)["expired"] += 1
+            return
+
+        started = time.monotonic()
+        try:
+            if transaction.is_register_read():
+                result = bytes(
+                    self._read_block(transaction.address, transaction.register, transaction.length)
+                )
+            else:
+                result = transaction.func()
+            error = None
+        except Exception as e:
+            result = None
+            error = e
+
+        self._record(transaction, started, time.monotonic(), error)
+
+        if error is not None:
+            transaction.future.set_exception(error)
+        else:
+            transaction.future.set_result(result)
+
+    def _read_block(self, address, register, length):
+        buffer = bytearray(length)
+        # Another bus user (e.g. a driver outside the manager) holds the lock;
+        # back off instead of spinning a core
+        delay = 0.0001
+        deadline = time.monotonic() + self.transaction_timeout
+        while not self.i2c_bus.try_lock():
+            if time.monotonic() >= deadline:
+                raise TimeoutError("Timed out waiting for the I2C bus lock")
+            time.sleep(delay)
+            delay = min(delay * 2, 0.005)
+        try:
+            self.i2c_bus.writeto_then_readfrom(address, bytes([register]), buffer)
+        finally:
+            self.i2c_bus.unlock()
+        return buffer
+
+    def _device_stats(self, device):
+        """Stats entry for a device; call with _stats_lock held"""
+        return self.stats.setdefault(
+            device,
+            {
+                "transactions": 0,
+                "errors": 0,
+                "expired": 0,
+                "latency_total": 0.0,
+                "latency_max": 0.0,
+                "wait_total": 0.0,
+            },
+        )
+
+    def _record(self, transaction, started, finished, error):
+        with self._stats_lock:
+            stats = self._device_stats(transaction.device)
+            latency = finished - transaction.enqueued_at
+            stats["transactions"] += 1
+            stats["latency_total"] += latency
+            stats["latency_max"] = max(stats["latency_max"], latency)
+            stats["wait_total"] += max(0.0, started - transaction.enqueued_at)
+            if error is not None:
+                stats["errors"] += 1
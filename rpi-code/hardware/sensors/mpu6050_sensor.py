@@ -1,24 +1,56 @@
 import math
+import struct
 import time
 import board
 import busio
 import adafruit_mpu6050
+from .circuit_breaker import CircuitBreaker
+
+# Burst read of ACCEL_XOUT_H..GYRO_ZOUT_L (accel, temperature, gyro)
+MPU6050_DATA_REGISTER = 0x3B
+MPU6050_DATA_LENGTH = 14
+
+# LSB per unit for each full-scale range setting (index = range register value)
+ACCEL_SCALES = [16384, 8192, 4096, 2048]  # LSB/g
+GYRO_SCALES = [131, 65.5, 32.8, 16.4]  # LSB/(deg/s)
+STANDARD_GRAVITY = 9.80665
+
 
 class MPU6050Sensor:
-    def __init__(self, i2c_bus=None, address=0x68):
-        self.i2c_bus = i2c_bus or busio.I2C(board.SCL, board.SDA)
+    def __init__(self, i2c_bus=None, address=0x68, bus_manager=None, breaker=None):
+        self.bus_manager = bus_manager
+        self.breaker = breaker or CircuitBreaker("mpu6050")
+        self.i2c_bus = i2c_bus or (
+            bus_manager.i2c_bus if bus_manager else busio.I2C(board.SCL, board.SDA)
+        )
         self.address = address
         self.mpu = None
+        self.accel_scale = ACCEL_SCALES[0]
+        self.gyro_scale = GYRO_SCALES[0]
         self.gyro_bias = {"x": 0, "y": 0, "z": 0}
         self.accel_bias = {"x": 0, "y": 0, "z": 0}
-        
-        self._initialize()
-        self._calibrate()
+        self.last_read_at = None  # Monotonic time of the last good reading
+
+        # Re-initialization keeps the existing biases; recalibrating while the
+        # robot may be moving would do more harm than good
+        self.breaker.attach(self._initialize)
+        if self._initialize():
+            self._calibrate()
+        else:
+            self.breaker.trip("not found at startup")
 
     def _initialize(self):
         """Initialize MPU6050 sensor"""
         try:
-            self.mpu = adafruit_mpu6050.MPU6050(self.i2c_bus, address=self.address)
+            self.mpu = self._bus_transaction(
+                lambda: adafruit_mpu6050.MPU6050(self.i2c_bus, address=self.address)
+            )
+            # The range getters are register reads too; keep them on the manager
+            accel_range, gyro_range = self._bus_transaction(
+                lambda: (self.mpu.accelerometer_range, self.mpu.gyro_range)
+            )
+            self.accel_scale = ACCEL_SCALES[int(accel_range)]
+            self.gyro_scale = GYRO_SCALES[int(gyro_range)]
             print("✓ MPU6050 initialized successfully")
             return True
         except Exception as e:
@@ -26,6 +58,30 @@ class MPU6050Sensor:
             self.mpu = None
             return False
 
+    def _bus_transaction(self, func):
+        """Run a bus access through the shared bus manager when available"""
+        if self.bus_manager:
+            return self.bus_manager.execute("mpu6050", func, priority="imu")
+        return func()
+
+    def _read_motion(self):
+        """Read acceleration (m/s^2) and gyro (rad/s) tuples"""
+        if not self.bus_manager:
+            return self.mpu.acceleration, self.mpu.gyro
+
+        # One 14-byte burst instead of separate accel and gyro transactions
+        block = self.bus_manager.read_registers(
+            "mpu6050",
+            self.address,
+            MPU6050_DATA_REGISTER,
+            MPU6050_DATA_LENGTH,
+            priority="imu",
+        )
+        ax, ay, az, _temp, gx, gy, gz = struct.unpack(">7h", block)
+        accel = tuple(v / self.accel_scale * STANDARD_GRAVITY for v in (ax, ay, az))
+        gyro = tuple(math.radians(v / self.gyro_scale) for v in (gx, gy, gz))
+        return accel, gyro
+
     def _calibrate(self, samples=1000):
         """Calibrate IMU sensors with error handling"""
         if not self.mpu:
@@ -81,8 +137,7 @@ class MPU6050Sensor:
 
         try:
             time.sleep(0.005)  # 5ms delay
-            accel = self.mpu.acceleration
-            gyro = self.mpu.gyro
+            accel, gyro = self._read_motion()
 
             # Check for valid data
             if any(math.isnan(val) for val in accel + gyro):
@@ -107,14 +162,24 @@ class MPU6050Sensor:
         pitch = math.atan2(-ax, math.sqrt(ay**2 + az**2)) * (180 / math.pi)
         return {"roll": roll, "pitch": pitch}
 
+    def _zero_data(self):
+        """Neutral IMU values, used while the device is unavailable
+
+        Marked stale so consumers do not mistake them for a measurement.
+        """
+        return {
+            "accel": {"x": 0, "y": 0, "z": 0},
+            "gyro": {"x": 0, "y": 0, "z": 0},
+            "tilt": {"roll": 0, "pitch": 0},
+            "stale": True,
+            "read_at": self.last_read_at,
+        }
+
     def read_data(self):
         """Read calibrated IMU data with proper error handling"""
-        if not self.mpu:
-            return {
-                "accel": {"x": 0, "y": 0, "z": 0},
-                "gyro": {"x": 0, "y": 0, "z": 0},
-                "tilt": {"roll": 0, "pitch": 0},
-            }
+        # Fast-fail while the breaker is open: no bus access, no settle delay
+        if not self.mpu or not self.breaker.allow():
+            return self._zero_data()
 
         try:
             raw_data = self._read_raw()
@@ -141,6 +206,8 @@ class MPU6050Sensor:
                 calibrated_accel["z"]
             )
 
+            self.breaker.record_success()
+            self.last_read_at = time.monotonic()
             return {
                 "accel": calibrated_accel,
                 "gyro": calibrated_gyro,
@@ -149,12 +216,9 @@ class MPU6050Sensor:
 
         except Exception as e:
             print(f"[MPU6050 Read Error] {e}")
-            return {
-                "accel": {"x": 0, "y": 0, "z": 0},
-                "gyro": {"x": 0, "y": 0, "z": 0},
-                "tilt": {"roll": 0, "pitch": 0},
-            }
+            self.breaker.record_failure(e)
+            return self._zero_data()
 
     def is_connected(self):
         """Check if sensor is connected and working"""
-        return self.mpu is not None
\ No newline at end of file
+        return self.mpu is not None and self.breaker.allow()
\ No newline at end of file
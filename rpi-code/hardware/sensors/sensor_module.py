@@ -1,33 +1,137 @@
 import board
 import busio
+import threading
 import time
 from config.robot_config import RobotConfig
 from .mpu6050_sensor import MPU6050Sensor
 from .bmp280_sensor import BMP280Sensor
 from .ads1115_sensor import ADS1115Sensor
+from .i2c_bus_manager import I2CBusManager
+from .circuit_breaker import CircuitBreaker
+
+class SensorReading:
+    """A cached sensor sample stamped with the monotonic time it was taken"""
+
+    def __init__(self, data, timestamp):
+        self.data = data
+        self.timestamp = timestamp
+
+    @property
+    def age(self):
+        return time.monotonic() - self.timestamp
+
+    def as_dict(self):
+        """Copy of the sample with its monotonic read time and current age
+
+        A stale sample (served while a circuit breaker is open) carries the
+        time of the last good read, so its age keeps growing.
+        """
+        read_at = self.data.get("read_at") or self.timestamp
+        return {**self.data, "read_at": read_at, "age": round(time.monotonic() - read_at, 3)}
+
 
 class SensorModule:
     def __init__(self, pi):
         self.i2c_bus = busio.I2C(board.SCL, board.SDA)
 
+        # All sensor traffic is serialized through one prioritized bus owner
+        self.bus_manager = I2CBusManager(self.i2c_bus, RobotConfig)
+
         # Initialize individual sensors
         self.mpu6050 = MPU6050Sensor(
-            i2c_bus=self.i2c_bus, address=RobotConfig.I2C_ADDRESSES["mpu6050"]
+            address=RobotConfig.I2C_ADDRESSES["mpu6050"],
+            bus_manager=self.bus_manager,
+            breaker=CircuitBreaker("mpu6050", **RobotConfig.SENSOR_BREAKER_CONFIG),
         )
 
         self.bmp280 = BMP280Sensor(
-            i2c_bus=self.i2c_bus, address=RobotConfig.I2C_ADDRESSES["bmp280"]
+            address=RobotConfig.I2C_ADDRESSES["bmp280"],
+            bus_manager=self.bus_manager,
+            breaker=CircuitBreaker("bmp280", **RobotConfig.SENSOR_BREAKER_CONFIG),
         )
 
         self.ads1115 = ADS1115Sensor(
-            i2c_bus=self.i2c_bus, address=RobotConfig.I2C_ADDRESSES["ads1115"]
+            address=RobotConfig.I2C_ADDRESSES["ads1115"],
+            bus_manager=self.bus_manager,
+            breaker=CircuitBreaker("ads1115", **RobotConfig.SENSOR_BREAKER_CONFIG),
         )
 
+        # Each sensor is polled at its own rate into a cache; readers never
+        # touch the bus unless they explicitly ask for a fresh sample
+        self.poll_intervals = RobotConfig.SENSOR_POLL_CONFIG
+        self._readers = {
+            "imu": self._read_imu_hardware,
+            "environmental": self._read_environmental_hardware,
+            "battery": self._read_battery_hardware,
+        }
+        self._cache = {name: None for name in self._readers}
+        self._listeners = {name: [] for name in self._readers}
+        self._read_locks = {name: threading.Lock() for name in self._readers}
+        self._stop_event = threading.Event()
+        self._poll_threads = []
+        self._start_polling()
+
         print("✓ Sensor Module initialized")
 
-    # ADD THESE MISSING METHODS:
-    def read_imu(self):
-        """Read IMU data specifically"""
+    def _start_polling(self):
+        """Start one background poller per sensor at its configured rate"""
+        for name in self._readers:
+            thread = threading.Thread(
+                target=self._poll_loop, args=(name,), name=f"poll-{name}", daemon=True
+            )
+            thread.start()
+            self._poll_threads.append(thread)
+
+    def _poll_loop(self, name):
+        interval = self.poll_intervals[name]
+        next_poll = time.monotonic()
+        while not self._stop_event.is_set():
+            self._refresh(name)
+            next_poll += interval
+            delay = next_poll - time.monotonic()
+            if delay < 0:
+                # Fell behind (slow read); skip missed slots instead of bursting
+                next_poll = time.monotonic()
+                delay = 0
+            self._stop_event.wait(delay)
+
+    def _refresh(self, name):
+        """Read a sensor from hardware and store the sample in the cache"""
+        with self._read_locks[name]:
+            reading = SensorReading(self._readers[name](), time.monotonic())
+            self._cache[name] = reading
+        for callback in self._listeners[name]:
+            try:
+                callback(reading.data)
+            except Exception as e:
+                print(f"[Sensor Listener Error] {name}: {e}")
+        return reading
+
+    def add_listener(self, name, callback):
+        """Call callback(data) with every new sample of a sensor"""
+        self._listeners[name].append(callback)
+
+    def get_reading(self, name, fresh=False):
+        """Get the cached SensorReading for a sensor, reading hardware if asked"""
+        reading = self._cache[name]
+        if fresh or reading is None:
+            reading = self._refresh(name)
+        return reading
+
+    def read_imu(self, fresh=False):
+        """Read IMU data specifically (cached unless fresh=True)"""
+        return self.get_reading("imu", fresh).as_dict()
+
+    def read_environmental(self, fresh=False):
+        """Read environmental data specifically (cached unless fresh=True)"""
+        return self.get_reading("environmental", fresh).as_dict()
+
+    def read_battery(self, fresh=False):
+        """Read battery data specifically (cached unless fresh=True)"""
+        return self.get_reading("battery", fresh).as_dict()
+
+    def _read_imu_hardware(self):
+        """Read IMU data from the sensor"""
         try:
             return self.mpu6050.read_data()
         except Exception as e:
@@ -38,12 +142,18 @@ class SensorModule:
                 "tilt": {"roll": 0, "pitch": 0},
             }
 
-    def read_environmental(self):
-        """Read environmental data specifically"""
+    def _read_environmental_hardware(self):
+        """Read environmental data from the sensors"""
         try:
             env_data = self.bmp280.read_data()
             gas_data = self.ads1115.read_gas_sensors()
-            return {**env_data, **gas_data}
+            data = {**env_data, **gas_data}
+            stale = [part for part in (env_data, gas_data) if part.get("stale")]
+            if stale:
+                read_ats = [part["read_at"] for part in stale if part["read_at"] is not None]
+                data["stale"] = True
+                data["read_at"] = min(read_ats) if read_ats else None
+            return data
         except Exception as e:
             print(f"[Environmental Read Error] {e}")
             return {
@@ -54,8 +164,8 @@ class SensorModule:
                 "MQ135": {"value": "Sensor Error", "voltage": "Sensor Error"},
             }
 
-    def read_battery(self):
-        """Read battery data specifically"""
+    def _read_battery_hardware(self):
+        """Read battery data from the sensor"""
         try:
             return self.ads1115.read_battery()
         except Exception as e:
@@ -73,18 +183,13 @@ class SensorModule:
         return status
 
     # YOUR EXISTING METHODS:
-    def read_all_sensors(self):
-        """Read data from all sensors"""
+    def read_all_sensors(self, fresh=False):
+        """Read data from all sensors (cached unless fresh=True)"""
         try:
-            imu_data = self.mpu6050.read_data()
-            environmental_data = self.bmp280.read_data()
-            gas_data = self.ads1115.read_gas_sensors()
-            battery_data = self.ads1115.read_battery()
-
             return {
-                "imu": imu_data,
-                "environment": {**environmental_data, **gas_data},
-                "battery": battery_data,
+                "imu": self.read_imu(fresh),
+                "environment": self.read_environmental(fresh),
+                "battery": self.read_battery(fresh),
                 "timestamp": time.time(),
             }
 
@@ -114,6 +219,27 @@ class SensorModule:
             "timestamp": time.time(),
         }
 
+    def get_bus_stats(self):
+        """Get per-device I2C transaction statistics"""
+        return self.bus_manager.get_stats()
+
+    def get_sensor_health(self):
+        """Get circuit breaker state and trip counts for each device"""
+        return {
+            "mpu6050": self.mpu6050.breaker.get_health(),
+            "bmp280": self.bmp280.breaker.get_health(),
+            "ads1115": self.ads1115.breaker.get_health(),
+        }
+
+    def stop(self):
+        """Stop background sensor services"""
+        self._stop_event.set()
+        for thread in self._poll_threads:
+            thread.join(timeout=1)
+        for sensor in (self.mpu6050, self.bmp280, self.ads1115):
+            sensor.breaker.stop()
+        self.bus_manager.stop()
+
     def get_sensor_status(self):
         """Get status of all sensors"""
         return {
@@ -0,0 +1,198 @@
+import shlex
+import subprocess
+import threading
+import time
+from collections import namedtuple
+
+from network.command_tracer import LatencyHistogram
+
+# One snapshot; source is "stream" (a pipeline frame) or "still" (libcamera-jpeg)
+Snapshot = namedtuple("Snapshot", ["data", "timestamp", "etag", "source", "full_res"])
+
+
+class _Flight:
+    """One capture in progress and everybody waiting for it"""
+
+    def __init__(self, full_res):
+        self.full_res = full_res
+        self.done = threading.Event()
+        self.snapshot = None
+        self.error = None
+
+
+class SnapshotService:
+    """
+    Single-flight snapshots with a cached last result.
+
+    Requests arriving while a capture is in flight wait for that capture
+    instead of starting their own, and a snapshot younger than `window`
+    seconds is served straight from the cache. While the MJPEG pipeline is
+    running a snapshot is simply its newest frame (milliseconds, no second
+    process fighting the stream for the camera). Otherwise, or when full
+    resolution is asked for, libcamera-jpeg writes a still to stdout; a
+    running stream is paused for the still and resumed afterwards (viewers
+    just see a gap). libcamera-vid cannot emit a second full-resolution
+    stream alongside the MJPEG one, so there is no dual-stream mode.
+
+    With `prewarm_interval` set, a background thread refreshes the cached
+    still that often while nobody is streaming, so even the first request
+    is answered from the cache. `command` replaces libcamera-jpeg, like the
+    pipeline's.
+    """
+
+    def __init__(self, config, pipeline, command=None, window=1.0, prewarm_interval=0, timeout=15.0):
+        self.config = config
+        self.pipeline = pipeline
+        self.command = command
+        self.window = window
+        self.prewarm_interval = prewarm_interval
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._flight = None
+        self._cache = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.histograms = {"stream_ms": LatencyHistogram(), "still_ms": LatencyHistogram()}
+        self.stats = {
+            "requests": 0,
+            "cache_hits": 0,
+            "coalesced": 0,
+            "captures": 0,
+            "failures": 0,
+            "last_error": None,
+        }
+
+    def start(self):
+        if self.prewarm_interval:
+            self._thread = threading.Thread(target=self._prewarm_loop, name="snapshot-prewarm", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=self.timeout)
+
+    def _prewarm_loop(self):
+        while not self._stop_event.wait(self.prewarm_interval):
+            if self.pipeline.running:
+                continue  # Snapshots come from the stream
+            try:
+                self.get(full_res=True, max_age=self.prewarm_interval / 2)
+            except RuntimeError as e:
+                print(f"✗ Snapshot pre-warm failed: {e}")
+
+    # ---------- requests ----------
+    def get(self, full_res=False, max_age=None):
+        """Return a Snapshot no older than max_age (default: the window); raises RuntimeError"""
+        max_age = self.window if max_age is None else max_age
+        with self._lock:
+            self.stats["requests"] += 1
+            cached = self._cache
+            if (
+                cached
+                and time.time() - cached.timestamp <= max_age
+                and (cached.full_res or not full_res)
+            ):
+                self.stats["cache_hits"] += 1
+                return cached
+
+            flight = self._flight
+            leader = flight is None or (full_res and not flight.full_res)
+            if leader:
+                flight = self._flight = _Flight(full_res)
+            else:
+                self.stats["coalesced"] += 1
+
+        if leader:
+            self._run(flight)
+        elif not flight.done.wait(self.timeout):
+            raise RuntimeError("Timed out waiting for a snapshot")
+        if flight.error:
+            raise RuntimeError(flight.error)
+        return flight.snapshot
+
+    def _run(self, flight):
+        started = time.monotonic()
+        try:
+            if self.pipeline.running and not flight.full_res:
+                snapshot = self._from_stream()
+                self.histograms["stream_ms"].add((time.monotonic() - started) * 1000)
+            else:
+                snapshot = self._capture_still()
+                self.histograms["still_ms"].add((time.monotonic() - started) * 1000)
+            flight.snapshot = snapshot
+            with self._lock:
+                self._cache = snapshot
+                self.stats["captures"] += 1
+        except Exception as e:
+            flight.error = str(e)
+            self.stats["failures"] += 1
+            self.stats["last_error"] = flight.error
+            print(f"❌ Snapshot failed: {e}")
+        finally:
+            with self._lock:
+                if self._flight is flight:
+                    self._flight = None
+            flight.done.set()
+
+    def _from_stream(self):
+        frame = self.pipeline.latest()
+        if frame is None or time.time() - frame.timestamp > self.window:
+            frame = self.pipeline.wait_for_frame(frame.seq if frame else 0, self.timeout)
+        if frame is None:
+            raise RuntimeError("No frame from camera pipeline")
+        return Snapshot(frame.data, frame.timestamp, _etag(frame.timestamp, frame.data), "stream", False)
+
+    def _capture_still(self):
+        # The camera is exclusive: pause a running stream for the still
+        paused = self.pipeline.running
+        if paused:
+            print("⏸️ Pausing stream for full-resolution snapshot")
+            self.pipeline.pause()
+        try:
+            if self.command:
+                cmd = shlex.split(self.command) if isinstance(self.command, str) else list(self.command)
+            else:
+                cmd = ["libcamera-jpeg", "-o", "-", "--nopreview"]
+            cmd += [
+                "--width", str(self.config["capture_width"]),
+                "--height", str(self.config["capture_height"]),
+                "--quality", str(self.config["capture_quality"]),
+                "--timeout", str(self.config["capture_timeout_single"]),
+            ]
+            try:
+                result = subprocess.run(cmd, capture_output=True, timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                raise RuntimeError("Capture timeout - check camera connection")
+            if result.returncode != 0 or not result.stdout.startswith(b"\xff\xd8"):
+                stderr = result.stderr.decode(errors="replace").strip()
+                raise RuntimeError(f"Capture failed (returncode={result.returncode}): {stderr}")
+        finally:
+            if paused:
+                self.pipeline.resume()
+        timestamp = time.time()
+        data = result.stdout
+        print(f"✓ Snapshot captured ({len(data)} bytes)")
+        return Snapshot(data, timestamp, _etag(timestamp, data), "still", True)
+
+    def get_stats(self):
+        with self._lock:
+            cached = self._cache
+        return {
+            **self.stats,
+            "cached": {
+                "age_s": round(time.time() - cached.timestamp, 2),
+                "bytes": len(cached.data),
+                "source": cached.source,
+            }
+            if cached
+            else None,
+            **{name: histogram.to_dict() for name, histogram in self.histograms.items()},
+        }
+
+
+def _etag(timestamp, data):
+    # Capture time plus size identifies a snapshot without hashing the JPEG
+    return f"{int(timestamp * 1000):x}-{len(data):x}"
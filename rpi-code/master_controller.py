@@ -2,11 +2,17 @@ from config.robot_config import RobotConfig
 from hardware.motors import MotorController
 from hardware.sensors.sensor_module import SensorModule
 from hardware.servos import ServoController
+from network.broker_probe import BrokerProbe
 from network.mqtt_client import MQTTClient
 from network.network_monitor import NetworkMonitor
+from network.qos_controller import QoSController, post_camera_settings
+from network.telemetry_aggregator import TelemetryAggregator
+from network.telemetry_batcher import TelemetryBatcher
+from network.telemetry_codec import MOVEMENT_CODES, UNKNOWN_MOVEMENT
 from utils.helpers import RobotUtils
 from utils.pid_controller import StraightLinePIDController
-from hardware.camera_server import CameraController
+from utils.command_mailbox import CommandMailbox
+import math
 import signal
 import time
 import pigpio
@@ -17,6 +23,10 @@ class SurveillanceRobot:
         # Initialize hardware interfaces
         print("🚀 Initializing Surveillance Robot...")
 
+        # Robot state: direction and speed are published together by the MQTT
+        # handlers and wake the control loop as soon as they change
+        self.mailbox = CommandMailbox()
+
         # Initialize components
         self.pi = pigpio.pi()
         self.config = RobotConfig()
@@ -25,22 +35,78 @@ class SurveillanceRobot:
         self.servos = ServoController(self.pi, self.config)
         # Pass the robot instance (self) to the MQTT client
         self.mqtt = MQTTClient(self.pi, self.config, self)
-        self.network_monitor = NetworkMonitor()
+        probe_config = dict(self.config.PROBE_CONFIG)
+        self.network_monitor = NetworkMonitor(
+            probe=BrokerProbe(
+                self.config.MQTT_CONFIG["broker"],
+                self.config.MQTT_CONFIG["port"],
+                self.config.MQTT_CONFIG["topics"]["probe"],
+                **probe_config,
+            )
+            if probe_config.pop("enabled")
+            else None
+        )
+        # Attribute link usage to the MQTT connection vs. everything else (video)
+        self.network_monitor.throughput.add_socket("mqtt", lambda: self.mqtt.mqtt_client.socket())
         self.utils = RobotUtils()
-        self.camera = CameraController(self.config)
+
+        # High-rate columnar telemetry of the control loop
+        telemetry_config = self.config.TELEMETRY_CONFIG
+        self.telemetry_batcher = (
+            TelemetryBatcher(
+                telemetry_config["batch_fields"],
+                self.mqtt.publish_sensor_batch,
+                sample_rate=telemetry_config["batch_sample_rate"],
+                interval=telemetry_config["batch_interval"],
+            )
+            if telemetry_config["batch_enabled"]
+            else None
+        )
+        # Long-term trends: windowed aggregates fed by every fresh battery/environment sample
+        self.telemetry_aggregator = (
+            TelemetryAggregator(
+                telemetry_config["aggregate_fields"],
+                self.mqtt.publish_sensor_aggregate,
+                windows=telemetry_config["aggregate_windows"],
+            )
+            if telemetry_config["aggregate_enabled"]
+            else None
+        )
+
+        # Telemetry publish intervals; stepped up/down by the QoS controller
+        self.publish_interval = 2  # seconds
+        self.network_publish_interval = 10  # seconds - publish network data every 10 seconds
+
+        # Adaptive QoS: camera stream and telemetry rates follow link quality
+        qos_config = self.config.QOS_CONFIG
+        self.qos = (
+            QoSController(
+                qos_config,
+                self.network_monitor.get_complete_metrics,
+                post_camera_settings(self.config.CAMERA_CONFIG["server_url"]),
+                self._apply_telemetry_rates,
+                on_event=self.mqtt.publish_qos_event,
+            )
+            if qos_config["enabled"]
+            else None
+        )
 
         # PID controller for straight line movement
         # Combines encoder RPM differences and MPU6050 x-axis angle deviation
         self.pid_controller = StraightLinePIDController(self.config)
 
-        # Robot state
-        self.command = "stop"
-        self.target_speed = 0
-
         # Setup signal handlers for graceful shutdown
         signal.signal(signal.SIGINT, self.shutdown)
         signal.signal(signal.SIGTERM, self.shutdown)
 
+    @property
+    def command(self):
+        return self.mailbox.current.direction
+
+    @property
+    def target_speed(self):
+        return self.mailbox.current.speed
+
     def connect_services(self):
         """Connect to all external services"""
         print("🔗 Connecting to services...")
@@ -48,6 +114,25 @@ class SurveillanceRobot:
         # Initialize all components
         self._init_gpio()
         self._init_sensors()
+        if self.telemetry_batcher:
+            self.telemetry_batcher.start()
+        if self.telemetry_aggregator:
+            aggregator = self.telemetry_aggregator
+            self.sensors.add_listener(
+                "battery", lambda data: aggregator.record("battery", data)
+            )
+            self.sensors.add_listener(
+                "environmental", lambda data: aggregator.record("environment", data)
+            )
+            aggregator.start()
+        if self.qos:
+            self.qos.start()
+        # Collisions and knocks start an event recording on the camera server
+        recording_config = self.config.RECORDING_CONFIG
+        if recording_config["enabled"] and recording_config["shock_threshold"]:
+            self._last_shock = 0.0
+            self._last_accel = None
+            self.sensors.add_listener("imu", self._check_imu_shock)
 
         # Robot state
         self.base_pwm = self.config.base_pwm
@@ -98,8 +183,14 @@ class SurveillanceRobot:
                 },
             }
 
+            health_data = (
+                self.sensors.get_sensor_health()
+                if hasattr(self.sensors, "get_sensor_health")
+                else None
+            )
+
             self.mqtt._publish_sensor_data(
-                imu_data, env_data, battery_data, encoder_data
+                imu_data, env_data, battery_data, encoder_data, health_data
             )
 
         except Exception as e:
@@ -108,18 +199,67 @@ class SurveillanceRobot:
     def _publish_network_data(self):
         """Read and publish network metrics"""
         try:
-            # Get network metrics from network monitor
-            # Use get_wifi_metrics for frequent updates (no speed test)
-            from network.network_monitor import get_wifi_metrics
-            network_data = get_wifi_metrics()
+            # Cached WiFi metrics and broker probe results; never blocks the loop
+            network_data = self.network_monitor.get_complete_metrics()
+            network_data["mqtt_connection"] = self.mqtt.get_connection_metrics()
+            if self.qos:
+                network_data["qos"] = self.qos.get_state()
             
             # Publish network data via MQTT
             self.mqtt.publish_network_metrics(network_data)
+            self.mqtt.publish_command_latency()
             print(f"✓ Published network data")
 
         except Exception as e:
             print(f"❌ Error publishing network data: {e}")
 
+    def _apply_telemetry_rates(self, step):
+        """QoS callback: switch the sensor/network publish intervals"""
+        self.publish_interval = step["sensor_interval"]
+        self.network_publish_interval = step["network_interval"]
+
+    def _check_imu_shock(self, imu_data):
+        """IMU listener: trigger a recording on a sudden change in acceleration"""
+        if imu_data.get("stale"):
+            # Placeholder zeros from an unavailable IMU are not a jolt
+            self._last_accel = None
+            return
+        accel = imu_data.get("accel") or {}
+        sample = tuple(accel.get(axis, 0) for axis in ("x", "y", "z"))
+        previous, self._last_accel = self._last_accel, sample
+        if previous is None:
+            return
+        # Calibration strips (most of) gravity, so compare consecutive samples
+        # instead of the magnitude against 1 g; this also ignores slow tilting
+        jolt = math.sqrt(sum((now - before) ** 2 for now, before in zip(sample, previous)))
+        config = self.config.RECORDING_CONFIG
+        now = time.time()
+        if jolt < config["shock_threshold"] or now - self._last_shock < config["shock_cooldown"]:
+            return
+        self._last_shock = now
+        print(f"💥 IMU shock: acceleration changed by {jolt:.1f} m/s²")
+        self.mqtt.publish_recording_trigger(
+            {"reason": "imu_shock", "jolt": round(jolt, 2), "accel": accel, "timestamp": now}
+        )
+
+    def _record_telemetry_sample(self, left_output, right_output, correction):
+        """Record one control-loop sample for the batched telemetry stream"""
+        imu_data = self.sensors.read_imu()
+        self.telemetry_batcher.record(
+            {
+                "command": MOVEMENT_CODES.get(self.command, UNKNOWN_MOVEMENT),
+                "target_speed": self.target_speed,
+                "left_rpm": self.motors.rpm.get("left", 0),
+                "right_rpm": self.motors.rpm.get("right", 0),
+                "left_output": left_output,
+                "right_output": right_output,
+                "correction": correction,
+                "roll": imu_data.get("tilt", {}).get("roll", 0),
+                "pitch": imu_data.get("tilt", {}).get("pitch", 0),
+                "gyro_z": imu_data.get("gyro", {}).get("z", 0),
+            }
+        )
+
     def _update_rpm(self):
         """Update RPM calculations using motor controller"""
         self.motors.update_rpm()
@@ -135,19 +275,25 @@ class SurveillanceRobot:
         self.connect_services()
 
         last_publish_time = 0
-        publish_interval = 2  # seconds
         last_network_publish_time = 0
-        network_publish_interval = 10  # seconds - publish network data every 10 seconds
+        tick_interval = 1.0 / self.config.PUBLISH_CONFIG["control_frequency"]
 
         try:
             while True:
                 current_time = time.time()
+                tick_start = time.monotonic()
+
+                # One consistent snapshot of direction + speed for this tick
+                command = self.mailbox.current
 
                 # Update RPM and other periodic calculations
                 self._update_rpm()
 
+                # Motor outputs applied this tick, for batched telemetry
+                left_speed = right_speed = correction = 0
+
                 # Handle movement commands with integrated PID control
-                if self.command == "forward":
+                if command.direction == "forward":
                     # Get IMU data for x-axis angle (roll) - indicates tilt left/right
                     imu_data = self.sensors.read_imu()
                     x_angle = imu_data.get("tilt", {}).get("roll", 0) if imu_data else 0
@@ -165,8 +311,8 @@ class SurveillanceRobot:
                     # Apply correction to keep robot moving straight
                     # Motor convention: forward = left: -speed, right: +speed
                     # Positive correction: reduce left magnitude, increase right magnitude
-                    left_speed = -self.target_speed + correction  # More negative = slower left
-                    right_speed = self.target_speed + correction   # More positive = faster right
+                    left_speed = -command.speed + correction  # More negative = slower left
+                    right_speed = command.speed + correction   # More positive = faster right
 
                     # Ensure speeds stay within limits
                     left_speed = max(-100, min(100, left_speed))
@@ -174,7 +320,7 @@ class SurveillanceRobot:
 
                     self.motors._set_motors(left_speed, right_speed)
 
-                elif self.command == "backward":
+                elif command.direction == "backward":
                     # Get IMU data for x-axis angle (roll) - indicates tilt left/right
                     imu_data = self.sensors.read_imu()
                     x_angle = imu_data.get("tilt", {}).get("roll", 0) if imu_data else 0
@@ -192,8 +338,8 @@ class SurveillanceRobot:
                     # Apply correction for backward movement
                     # Motor convention: backward = left: +speed, right: -speed
                     # Positive correction: reduce left magnitude, increase right magnitude
-                    left_speed = self.target_speed - correction    # Less positive = slower left
-                    right_speed = -self.target_speed - correction  # More negative = faster right
+                    left_speed = command.speed - correction    # Less positive = slower left
+                    right_speed = -command.speed - correction  # More negative = faster right
 
                     # Ensure speeds stay within limits
                     left_speed = max(-100, min(100, left_speed))
@@ -201,13 +347,15 @@ class SurveillanceRobot:
 
                     self.motors._set_motors(left_speed, right_speed)
 
-                elif self.command == "left":
-                    self.motors.rotate_left(self.target_speed)
+                elif command.direction == "left":
+                    self.motors.rotate_left(command.speed)
+                    left_speed = right_speed = command.speed
 
-                elif self.command == "right":
-                    self.motors.rotate_right(self.target_speed)
+                elif command.direction == "right":
+                    self.motors.rotate_right(command.speed)
+                    left_speed = right_speed = -command.speed
 
-                elif self.command == "stop":
+                elif command.direction == "stop":
                     self.motors.stop()
                     self.pid_controller.reset()
                     if hasattr(self.motors, "encoder_left"):
@@ -215,18 +363,26 @@ class SurveillanceRobot:
                     if hasattr(self.motors, "encoder_right"):
                         self.motors.encoder_right.reset()
 
+                # Close the latency trace of the command just applied to the motors
+                self.mqtt.tracer.mark_actuated(command.version)
+
+                if self.telemetry_batcher:
+                    self._record_telemetry_sample(left_speed, right_speed, correction)
+
                 # Publish sensor data at regular intervals
-                if current_time - last_publish_time >= publish_interval:
+                if current_time - last_publish_time >= self.publish_interval:
                     self._publish_sensor_data()
                     last_publish_time = current_time
 
                 # Publish network data at regular intervals
-                if current_time - last_network_publish_time >= network_publish_interval:
+                if current_time - last_network_publish_time >= self.network_publish_interval:
                     self._publish_network_data()
                     last_network_publish_time = current_time
 
-                # Control loop frequency (20Hz)
-                time.sleep(0.05)
+                # Control loop frequency (20Hz), woken early by new commands
+                remaining = tick_interval - (time.monotonic() - tick_start)
+                if remaining > 0:
+                    self.mailbox.wait(command.version, remaining)
 
         except KeyboardInterrupt:
             self.cleanup()
@@ -238,6 +394,16 @@ class SurveillanceRobot:
             self.motors.stop()
         if hasattr(self, "servos"):
             self.servos.cleanup()
+        if getattr(self, "telemetry_batcher", None):
+            self.telemetry_batcher.stop()
+        if getattr(self, "qos", None):
+            self.qos.stop()
+        if getattr(self, "telemetry_aggregator", None):
+            self.telemetry_aggregator.stop()
+        if hasattr(self, "sensors"):
+            self.sensors.stop()
+        if hasattr(self, "network_monitor"):
+            self.network_monitor.stop()
         if hasattr(self, "mqtt"):
             self.mqtt.disconnect()
         if hasattr(self, "pi"):
@@ -0,0 +1,238 @@
+import math
+import struct
+import threading
+import time
+
+import paho.mqtt.client as mqtt
+
+from network.command_tracer import LatencyHistogram
+
+# Ping payload: kind, sequence number, send time (perf_counter seconds)
+PING_HEADER = struct.Struct("<BId")
+KIND_PING = 0
+KIND_BURST = 1
+
+
+class BrokerProbe:
+    """
+    Active round-trip probe of the path to the MQTT broker.
+
+    A dedicated paho client subscribes to its own loopback topic and, every
+    `interval` seconds, publishes `count` small timestamped pings to it. Each
+    echo gives one broker round trip; pings not back within `timeout` count
+    as lost. An optional throughput burst sends a bounded number of bytes
+    through the same loop and times their return, without ever loading the
+    link for longer than `burst_timeout`. Everything runs on background
+    threads; get_results() only returns the last completed round.
+    """
+
+    def __init__(
+        self,
+        broker,
+        port,
+        topic,
+        interval=10.0,
+        count=10,
+        spacing=0.05,
+        timeout=1.0,
+        burst_enabled=False,
+        burst_interval=300.0,
+        burst_bytes=262144,
+        burst_message_bytes=8192,
+        burst_timeout=2.0,
+    ):
+        self.broker = broker
+        self.port = port
+        self.topic = topic
+        self.interval = interval
+        self.count = count
+        self.spacing = spacing
+        self.timeout = timeout
+        self.burst_enabled = burst_enabled
+        self.burst_interval = burst_interval
+        self.burst_bytes = burst_bytes
+        self.burst_message_bytes = max(burst_message_bytes, PING_HEADER.size)
+        self.burst_timeout = burst_timeout
+
+        self.histogram = LatencyHistogram()
+        self.totals = {"sent": 0, "received": 0, "lost": 0}
+        self._results = {"method": "broker_probe", "status": "pending"}
+        self._burst_results = None
+        self._last_burst = None
+
+        self._lock = threading.Lock()
+        self._round = {}
+        self._burst = None
+        self._sequence = 0
+        self._connected = threading.Event()
+        self._stop_event = threading.Event()
+
+        self.client = mqtt.Client(
+            mqtt.CallbackAPIVersion.VERSION2, client_id="RPi_Test_probe"
+        )
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
+        self.client.on_message = self._on_message
+        self._thread = threading.Thread(target=self._probe_loop, name="broker-probe", daemon=True)
+
+    def start(self):
+        try:
+            self.client.connect_async(self.broker, self.port, 60)
+            self.client.loop_start()
+        except Exception as e:
+            print(f"Broker probe connection setup failed: {e}")
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join(timeout=self.timeout + self.burst_timeout + 1)
+        self.client.loop_stop()
+        self.client.disconnect()
+
+    def _on_connect(self, client, userdata, flags, reason_code, properties):
+        if reason_code == 0:
+            client.subscribe(self.topic)
+            self._connected.set()
+
+    def _on_disconnect(self, client, userdata, disconnect_flags, reason_code, properties):
+        self._connected.clear()
+
+    def _on_message(self, client, userdata, message):
+        received = time.perf_counter()
+        try:
+            kind, sequence, sent = PING_HEADER.unpack_from(message.payload)
+        except struct.error:
+            return
+        with self._lock:
+            if kind == KIND_PING and sequence in self._round:
+                if self._round[sequence] is None:
+                    self._round[sequence] = (received - sent) * 1000
+            elif kind == KIND_BURST and self._burst is not None:
+                self._burst["received_bytes"] += len(message.payload)
+                self._burst["last_received"] = received
+
+    def _probe_loop(self):
+        while not self._stop_event.is_set():
+            if not self._connected.wait(self.interval):
+                with self._lock:
+                    self._results = {
+                        "method": "broker_probe",
+                        "status": "disconnected",
+                        "timestamp": time.time(),
+                    }
+                continue
+            try:
+                self._run_round()
+                if self.burst_enabled and (
+                    self._last_burst is None
+                    or time.monotonic() - self._last_burst >= self.burst_interval
+                ):
+                    self._last_burst = time.monotonic()
+                    self._run_burst()
+            except Exception as e:
+                print(f"Broker probe failed: {e}")
+            self._stop_event.wait(self.interval)
+
+    def _run_round(self):
+        with self._lock:
+            self._round = {}
+        for _ in range(self.count):
+            self._sequence += 1
+            with self._lock:
+                self._round[self._sequence] = None
+            payload = PING_HEADER.pack(KIND_PING, self._sequence, time.perf_counter())
+            self.client.publish(self.topic, payload)
+            if self._stop_event.wait(self.spacing):
+                return
+
+        # Give the last pings their full timeout before counting losses
+        self._stop_event.wait(self.timeout)
+        with self._lock:
+            rtts = sorted(rtt for rtt in self._round.values() if rtt is not None)
+            self._round = {}
+
+        for rtt in rtts:
+            self.histogram.add(rtt)
+        lost = self.count - len(rtts)
+        self.totals["sent"] += self.count
+        self.totals["received"] += len(rtts)
+        self.totals["lost"] += lost
+
+        results = {
+            "method": "broker_probe",
+            "status": "ok" if rtts else "no_replies",
+            "timestamp": time.time(),
+            "broker": f"{self.broker}:{self.port}",
+            "sent": self.count,
+            "received": len(rtts),
+            "loss_pct": round(100.0 * lost / self.count, 1),
+            "rtt_ms": self._distribution(rtts),
+            "histogram": self.histogram.to_dict(),
+            "totals": dict(self.totals),
+        }
+        if self._burst_results:
+            results["burst"] = self._burst_results
+        with self._lock:
+            self._results = results
+
+    @staticmethod
+    def _distribution(rtts):
+        if not rtts:
+            return None
+        mean = sum(rtts) / len(rtts)
+
+        def pick(fraction):
+            return round(rtts[min(len(rtts) - 1, int(fraction * len(rtts)))], 2)
+
+        return {
+            "min": round(rtts[0], 2),
+            "p50": pick(0.50),
+            "p90": pick(0.90),
+            "p99": pick(0.99),
+            "max": round(rtts[-1], 2),
+            "mean": round(mean, 2),
+            "jitter": round(math.sqrt(sum((rtt - mean) ** 2 for rtt in rtts) / len(rtts)), 2),
+        }
+
+    def _run_burst(self):
+        """Send burst_bytes through the loopback topic and time their return"""
+        padding = bytes(self.burst_message_bytes - PING_HEADER.size)
+        messages = max(1, self.burst_bytes // self.burst_message_bytes)
+        started = time.perf_counter()
+        with self._lock:
+            self._burst = {"received_bytes": 0, "last_received": None}
+
+        deadline = started + self.burst_timeout
+        sent_bytes = 0
+        for sequence in range(messages):
+            if time.perf_counter() > deadline:
+                break  # Never hold the link longer than the budget
+            payload = PING_HEADER.pack(KIND_BURST, sequence, time.perf_counter()) + padding
+            self.client.publish(self.topic, payload)
+            sent_bytes += len(payload)
+
+        while time.perf_counter() < deadline:
+            with self._lock:
+                if self._burst["received_bytes"] >= sent_bytes:
+                    break
+            if self._stop_event.wait(0.05):
+                break
+
+        with self._lock:
+            burst, self._burst = self._burst, None
+        elapsed = (burst["last_received"] or time.perf_counter()) - started
+        self._burst_results = {
+            "timestamp": time.time(),
+            "sent_bytes": sent_bytes,
+            "received_bytes": burst["received_bytes"],
+            "duration_s": round(elapsed, 3),
+            # Every byte crosses the link twice (to the broker and back)
+            "loopback_mbps": round(burst["received_bytes"] * 8 / elapsed / 1_000_000, 2)
+            if elapsed > 0
+            else 0,
+        }
+
+    def get_results(self):
+        """Last completed probe round (never blocks on the network)"""
+        with self._lock:
+            return dict(self._results)
@@ -0,0 +1,148 @@
+import threading
+import time
+
+# Histogram bucket upper bounds in milliseconds (last bucket is open-ended)
+LATENCY_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+# Stage intervals tracked per command: name -> (from stage, to stage)
+INTERVALS = {
+    "transit": ("sent", "received"),
+    "parse": ("received", "parsed"),
+    "queue": ("parsed", "dequeued"),
+    "apply": ("parsed", "applied"),
+    "actuate": ("applied", "actuated"),
+    "robot_total": ("received", "actuated"),
+    "end_to_end": ("sent", "actuated"),
+}
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram in milliseconds"""
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, value_ms):
+        index = len(LATENCY_BUCKETS_MS)
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if value_ms <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def to_dict(self):
+        labels = [f"le_{bound}" for bound in LATENCY_BUCKETS_MS] + ["inf"]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 2) if self.count else 0,
+            "max_ms": round(self.max_ms, 2),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class CommandTracer:
+    """
+    Per-stage timing of incoming commands.
+
+    A trace is started when a message arrives and stamped as it is parsed,
+    applied to robot state and finally actuated. Commands may carry an
+    optional "seq" and "sent_at" (Unix seconds) from the dashboard; with
+    "sent_at" the network transit and end-to-end latency are measured as well
+    (this relies on the dashboard and robot clocks being NTP-synced).
+    Locomotion moves/stops are actuated by the control loop, which calls
+    mark_actuated() with the mailbox version it drove the motors with;
+    everything else is actuated inside its handler.
+    """
+
+    def __init__(self, ack=None):
+        self.ack = ack
+        self.histograms = {
+            topic: {name: LatencyHistogram() for name in INTERVALS}
+            for topic in ("locomotion", "camera_control")
+        }
+        self.superseded = 0
+        self._pending = None
+        self._lock = threading.Lock()
+
+    def begin(self, topic_name, payload, timing):
+        """Start a trace from the dispatcher's received/parsed/dequeued times"""
+        stages = dict(timing)
+        sent_at = payload.get("sent_at")
+        if isinstance(sent_at, (int, float)):
+            stages["sent"] = sent_at
+        return {
+            "topic": topic_name,
+            "seq": payload.get("seq"),
+            "action": payload.get("action"),
+            "stages": stages,
+        }
+
+    def mark(self, trace, stage):
+        trace["stages"][stage] = time.time()
+
+    def await_actuation(self, trace, version):
+        """Hand the trace to the control loop; it completes once `version` is actuated"""
+        trace["version"] = version
+        with self._lock:
+            if self._pending is not None:
+                self.superseded += 1
+            self._pending = trace
+
+    def mark_actuated(self, version):
+        """Called by the control loop after driving the motors with mailbox `version`
+
+        A command posted during the tick has a newer version and stays
+        pending until the tick that actually applies it.
+        """
+        if self._pending is None:
+            return
+        with self._lock:
+            trace = self._pending
+            if trace is None or trace["version"] > version:
+                return
+            self._pending = None
+        self.complete(trace)
+
+    def complete(self, trace):
+        stages = trace["stages"]
+        stages.setdefault("actuated", time.time())
+
+        latency = {}
+        histograms = self.histograms.get(trace["topic"])
+        for name, (start, end) in INTERVALS.items():
+            if start in stages and end in stages:
+                value_ms = (stages[end] - stages[start]) * 1000
+                latency[name] = round(value_ms, 2)
+                if histograms is not None:
+                    histograms[name].add(value_ms)
+
+        if self.ack and trace.get("seq") is not None:
+            try:
+                self.ack(
+                    {
+                        "seq": trace["seq"],
+                        "topic": trace["topic"],
+                        "action": trace.get("action"),
+                        "stages": stages,
+                        "latency_ms": latency,
+                    }
+                )
+            except Exception as e:
+                print(f"✗ Failed to send command ack: {e}")
+
+    def get_histograms(self):
+        return {
+            "type": "latency_histograms",
+            "timestamp": time.time(),
+            "superseded": self.superseded,
+            "topics": {
+                topic: {name: hist.to_dict() for name, hist in intervals.items()}
+                for topic, intervals in self.histograms.items()
+            },
+        }
@@ -0,0 +1,119 @@
+import random
+import threading
+import time
+
+
+class ConnectionSupervisor:
+    """
+    Non-blocking connection management for a paho MQTT client.
+
+    Connecting is started with connect_async() and every retry is left to
+    paho's own network thread (loop_start), so no caller or callback ever
+    sleeps. Each outage gets a randomly jittered minimum reconnect delay to
+    avoid reconnect storms, and paho doubles it up to `max_delay` while the
+    outage lasts. Connection state is tracked with an Event, and connect and
+    reconnect durations are recorded for export.
+    """
+
+    def __init__(self, client, broker, port, keepalive=60, min_delay=1, max_delay=30, jitter=0.5):
+        self.client = client
+        self.broker = broker
+        self.port = port
+        self.keepalive = keepalive
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+        self.connected = threading.Event()
+        self._lock = threading.Lock()
+        self._started_at = None
+        self._disconnected_at = None
+
+        self.metrics = {
+            "connects": 0,
+            "disconnects": 0,
+            "failed_attempts": 0,
+            "initial_connect_s": None,
+            "last_reconnect_s": None,
+            "max_reconnect_s": 0.0,
+            "total_downtime_s": 0.0,
+        }
+
+        self.client.on_connect_fail = self._on_connect_fail
+
+    def attach(self, client):
+        """Supervise a replacement client (e.g. after a protocol fallback)"""
+        self.client = client
+        self.client.on_connect_fail = self._on_connect_fail
+
+    def start(self):
+        """Begin connecting in the background and return immediately"""
+        self._apply_jittered_delay()
+        self._started_at = time.monotonic()
+        try:
+            self.client.connect_async(self.broker, self.port, self.keepalive)
+            self.client.loop_start()
+            print(f"Connecting to MQTT broker {self.broker}:{self.port} in background...")
+        except Exception as e:
+            print(f"MQTT connection setup failed: {e}")
+
+    def stop(self):
+        self.client.loop_stop()
+        self.connected.clear()
+
+    def wait_connected(self, timeout=None):
+        """Block until connected (for callers that really need it); returns bool"""
+        return self.connected.wait(timeout)
+
+    def on_connected(self):
+        """Call from the client's on_connect callback after a successful connect"""
+        now = time.monotonic()
+        with self._lock:
+            self.metrics["connects"] += 1
+            if self.metrics["initial_connect_s"] is None:
+                self.metrics["initial_connect_s"] = round(now - self._started_at, 3)
+                print(f"MQTT connected in {self.metrics['initial_connect_s']}s")
+            elif self._disconnected_at is not None:
+                outage = now - self._disconnected_at
+                self.metrics["last_reconnect_s"] = round(outage, 3)
+                self.metrics["max_reconnect_s"] = round(
+                    max(self.metrics["max_reconnect_s"], outage), 3
+                )
+                self.metrics["total_downtime_s"] = round(
+                    self.metrics["total_downtime_s"] + outage, 3
+                )
+                print(f"MQTT reconnected after {outage:.2f}s")
+            self._disconnected_at = None
+        self.connected.set()
+
+    def on_disconnected(self, reason_code):
+        """Call from the client's on_disconnect callback; never blocks"""
+        self.connected.clear()
+        with self._lock:
+            if self._disconnected_at is None:
+                self._disconnected_at = time.monotonic()
+                self.metrics["disconnects"] += 1
+        if reason_code != 0:
+            # paho's loop thread reconnects on its own; just re-jitter its backoff
+            self._apply_jittered_delay()
+
+    def _on_connect_fail(self, client, userdata):
+        with self._lock:
+            self.metrics["failed_attempts"] += 1
+
+    def _apply_jittered_delay(self):
+        low = max(0.1, self.min_delay * (1 - self.jitter))
+        high = self.min_delay * (1 + self.jitter)
+        self.client.reconnect_delay_set(
+            min_delay=round(random.uniform(low, high), 2), max_delay=self.max_delay
+        )
+
+    def get_metrics(self):
+        with self._lock:
+            metrics = dict(self.metrics)
+            outage_started = self._disconnected_at
+        metrics["state"] = "connected" if self.connected.is_set() else "disconnected"
+        metrics["current_outage_s"] = (
+            round(time.monotonic() - outage_started, 3) if outage_started else 0.0
+        )
+        return metrics
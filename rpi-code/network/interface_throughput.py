@@ -0,0 +1,166 @@
+import socket
+import struct
+import threading
+import time
+
+PROC_NET_DEV = "/proc/net/dev"
+
+# struct tcp_info offsets (linux/tcp.h, kernel >= 4.2): tcpi_bytes_acked, tcpi_bytes_received
+TCP_INFO = getattr(socket, "TCP_INFO", 11)
+TCP_INFO_LENGTH = 136
+TCP_INFO_BYTES_ACKED = 120
+TCP_INFO_BYTES_RECEIVED = 128
+
+# /proc/net/dev columns used (after the "iface:" prefix)
+RX_BYTES, RX_PACKETS, TX_BYTES, TX_PACKETS = 0, 1, 8, 9
+
+
+def read_interface_counters():
+    """{iface: (rx_bytes, rx_packets, tx_bytes, tx_packets)} from /proc/net/dev"""
+    counters = {}
+    with open(PROC_NET_DEV) as f:
+        for line in f.readlines()[2:]:
+            name, _, fields = line.partition(":")
+            values = fields.split()
+            counters[name.strip()] = (
+                int(values[RX_BYTES]),
+                int(values[RX_PACKETS]),
+                int(values[TX_BYTES]),
+                int(values[TX_PACKETS]),
+            )
+    return counters
+
+
+def read_socket_counters(sock):
+    """(rx_bytes, tx_bytes) of a connected TCP socket via TCP_INFO, or None"""
+    try:
+        info = sock.getsockopt(socket.IPPROTO_TCP, TCP_INFO, TCP_INFO_LENGTH)
+    except (OSError, AttributeError):
+        return None
+    if len(info) < TCP_INFO_LENGTH:
+        return None  # Kernel too old to report byte counters
+    tx_bytes = struct.unpack_from("Q", info, TCP_INFO_BYTES_ACKED)[0]
+    rx_bytes = struct.unpack_from("Q", info, TCP_INFO_BYTES_RECEIVED)[0]
+    return rx_bytes, tx_bytes
+
+
+class _Rates:
+    """EWMA-smoothed per-second rates of a set of monotonically increasing counters"""
+
+    def __init__(self, names, alpha):
+        self.names = names
+        self.alpha = alpha
+        self.previous = None
+        self.previous_time = None
+        self.rates = None
+
+    def update(self, values, now):
+        if self.previous is not None and now > self.previous_time:
+            elapsed = now - self.previous_time
+            deltas = [current - last for current, last in zip(values, self.previous)]
+            if min(deltas) >= 0:  # A reset/reconnect just rebaselines
+                instant = [delta / elapsed for delta in deltas]
+                if self.rates is None:
+                    self.rates = instant
+                else:
+                    self.rates = [
+                        self.alpha * value + (1 - self.alpha) * rate
+                        for value, rate in zip(instant, self.rates)
+                    ]
+        self.previous = values
+        self.previous_time = now
+
+    def to_dict(self):
+        if self.rates is None:
+            return None
+        return {name: round(rate, 1) for name, rate in zip(self.names, self.rates)}
+
+
+class InterfaceThroughput:
+    """
+    Background sampler of per-interface traffic from /proc/net/dev.
+
+    Every `interval` seconds the byte and packet counters of each interface
+    are diffed against the previous sample and folded into EWMA-smoothed
+    rates (weight `alpha` for the newest sample). Sockets registered with
+    add_socket() (e.g. the MQTT connection) are sampled the same way via
+    TCP_INFO where the kernel supports it, so a saturated link can be
+    attributed to telemetry or to everything else (the MJPEG stream).
+    """
+
+    INTERFACE_FIELDS = (
+        "rx_bytes_per_s",
+        "rx_packets_per_s",
+        "tx_bytes_per_s",
+        "tx_packets_per_s",
+    )
+    SOCKET_FIELDS = ("rx_bytes_per_s", "tx_bytes_per_s")
+
+    def __init__(self, interval=1.0, alpha=0.3, include_loopback=False):
+        self.interval = interval
+        self.alpha = alpha
+        self.include_loopback = include_loopback
+
+        self._interfaces = {}
+        self._sockets = {}
+        self._socket_rates = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def add_socket(self, name, get_socket):
+        """Track a TCP socket; get_socket() returns the current socket or None"""
+        with self._lock:
+            self._sockets[name] = get_socket
+            self._socket_rates[name] = _Rates(self.SOCKET_FIELDS, self.alpha)
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._sample_loop, name="interface-throughput", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def _sample_loop(self):
+        while not self._stop_event.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"Error sampling interface throughput: {e}")
+            self._stop_event.wait(self.interval)
+
+    def sample(self):
+        """Take one sample of every interface and registered socket"""
+        now = time.monotonic()
+        counters = read_interface_counters()
+        with self._lock:
+            for name, values in counters.items():
+                if name == "lo" and not self.include_loopback:
+                    continue
+                rates = self._interfaces.get(name)
+                if rates is None:
+                    rates = self._interfaces[name] = _Rates(self.INTERFACE_FIELDS, self.alpha)
+                rates.update(values, now)
+
+            for name, get_socket in self._sockets.items():
+                sock = get_socket()
+                values = read_socket_counters(sock) if sock is not None else None
+                if values is not None:
+                    self._socket_rates[name].update(values, now)
+
+    def get_rates(self):
+        """{"interfaces": {iface: rates}, "sockets": {name: rates}} (None until two samples)"""
+        with self._lock:
+            return {
+                "sample_interval_s": self.interval,
+                "interfaces": {
+                    name: rates.to_dict() for name, rates in self._interfaces.items()
+                },
+                "sockets": {
+                    name: rates.to_dict() for name, rates in self._socket_rates.items()
+                },
+            }
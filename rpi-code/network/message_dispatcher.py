@@ -0,0 +1,182 @@
+import json
+import threading
+import time
+from collections import deque
+
+
+class TopicExecutor:
+    """
+    Runs one topic's handler on its own worker thread with a bounded queue.
+
+    When the queue is full the oldest message is dropped. With latest_wins,
+    a new message replaces any queued message with the same "action", so
+    joystick-style streams only ever execute the newest position instead of
+    replaying stale ones. Messages whose expiry deadline (timing["expires_at"])
+    has passed by the time they are dequeued are discarded unexecuted.
+
+    Handler calls are serialized by a per-executor lock, and the stop
+    barrier is checked again inside it, so a message the worker had already
+    dequeued can never run after (and override) a priority message.
+    """
+
+    def __init__(self, name, handler, max_queue=8, latest_wins=False, expiry=None, sent_at_skew=None):
+        self.name = name
+        self.handler = handler
+        self.max_queue = max_queue
+        self.latest_wins = latest_wins
+        self.expiry = expiry
+        self.sent_at_skew = sent_at_skew
+
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._running = True
+        self._barrier = 0.0  # Messages received before this time are stale
+        self._handler_lock = threading.Lock()
+        self.stats = {"handled": 0, "dropped": 0, "replaced": 0, "expired": 0, "errors": 0}
+
+        self._thread = threading.Thread(
+            target=self._worker, name=f"mqtt-{name}", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, payload, timing):
+        with self._condition:
+            if self.latest_wins:
+                key = payload.get("action")
+                for index, (queued, _) in enumerate(self._queue):
+                    if queued.get("action") == key:
+                        self._queue[index] = (payload, timing)
+                        self.stats["replaced"] += 1
+                        return
+            if len(self._queue) >= self.max_queue:
+                self._queue.popleft()
+                self.stats["dropped"] += 1
+            self._queue.append((payload, timing))
+            self._condition.notify()
+
+    def clear(self, before=None):
+        """Discard everything still queued (and anything received before `before`)"""
+        with self._condition:
+            self.stats["dropped"] += len(self._queue)
+            self._queue.clear()
+            if before is not None:
+                self._barrier = before
+
+    def run_priority(self, payload, timing):
+        """Run a message now, after discarding everything received before it"""
+        self.clear(before=timing["received"])
+        with self._handler_lock:
+            timing["dequeued"] = time.time()
+            self._run(payload, timing)
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        self._thread.join(timeout=1)
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                while self._running and not self._queue:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                payload, timing = self._queue.popleft()
+
+            with self._handler_lock:
+                # A priority message may have run since the dequeue
+                if timing["received"] < self._barrier:
+                    self.stats["dropped"] += 1
+                    continue
+                timing["dequeued"] = time.time()
+                if timing.pop("expires_at", timing["dequeued"]) < timing["dequeued"]:
+                    self.stats["expired"] += 1
+                    continue
+                self._run(payload, timing)
+
+    def _run(self, payload, timing):
+        try:
+            self.handler(payload, timing)
+            self.stats["handled"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"Error handling {self.name} message: {e}")
+
+
+class MessageDispatcher:
+    """
+    Topic -> executor dispatch table for incoming MQTT messages.
+
+    The paho network thread only decodes JSON and hands the payload to the
+    topic's executor, so a slow handler (e.g. calibration) never delays other
+    topics. Messages matching a topic's priority predicate (locomotion stop)
+    bypass the queues and run immediately on the network thread, after
+    discarding anything still queued for that topic.
+
+    Topics registered with an expiry (seconds) drop commands that are older
+    than that when they arrive or when they reach the front of the queue. Age
+    is measured from local receipt, capped by the MQTT v5 message expiry
+    interval left when the broker forwarded it. The dashboard's wall-clock
+    "sent_at" is only used when the topic sets `sent_at_skew` (the clock
+    offset tolerated between dashboard and robot); without an RTC or NTP
+    the Pi's clock can be off by far more than the expiry, which would
+    expire every command.
+    """
+
+    def __init__(self):
+        self.executors = {}
+        self.priority = {}
+
+    def register(
+        self, topic, name, handler, max_queue=8, latest_wins=False, priority=None, expiry=None,
+        sent_at_skew=None,
+    ):
+        self.executors[topic] = TopicExecutor(
+            name, handler, max_queue, latest_wins, expiry, sent_at_skew
+        )
+        if priority:
+            self.priority[topic] = priority
+
+    def dispatch(self, message):
+        """Route a paho message; returns False if the topic is unknown"""
+        received_at = time.time()
+        executor = self.executors.get(message.topic)
+        if executor is None:
+            return False
+
+        payload = json.loads(message.payload.decode())
+        timing = {"received": received_at, "parsed": time.time()}
+
+        is_priority = self.priority.get(message.topic)
+        if is_priority and is_priority(payload):
+            executor.run_priority(payload, timing)
+            return True
+
+        if executor.expiry is not None:
+            timing["expires_at"] = self._deadline(message, payload, received_at, executor)
+            if timing["expires_at"] < timing["parsed"]:
+                executor.stats["expired"] += 1
+                return True
+
+        executor.submit(payload, timing)
+        return True
+
+    @staticmethod
+    def _deadline(message, payload, received_at, executor):
+        deadline = received_at + executor.expiry
+        sent_at = payload.get("sent_at")
+        if executor.sent_at_skew is not None and isinstance(sent_at, (int, float)):
+            deadline = min(deadline, sent_at + executor.expiry + executor.sent_at_skew)
+        # MQTT v5: the broker forwards the expiry interval that was left
+        remaining = getattr(getattr(message, "properties", None), "MessageExpiryInterval", None)
+        if remaining is not None:
+            deadline = min(deadline, received_at + remaining)
+        return deadline
+
+    def get_stats(self):
+        return {executor.name: dict(executor.stats) for executor in self.executors.values()}
+
+    def stop(self):
+        for executor in self.executors.values():
+            executor.stop()
@@ -1,6 +1,13 @@
 import paho.mqtt.client as mqtt
 import time
 import json
+from network.connection_supervisor import ConnectionSupervisor
+from network.command_tracer import CommandTracer
+from network.message_dispatcher import MessageDispatcher
+from network.mqtt_v5 import PublishProperties, UNSUPPORTED_PROTOCOL_VERSION
+from network.telemetry_codec import SCHEMA_VERSION, encode_sensor_payload
+from network.telemetry_deadband import DeadbandFilter
+from network.telemetry_spool import TelemetrySpool
 
 
 class MQTTClient:
@@ -10,54 +17,113 @@ class MQTTClient:
         self.robot = robot
         self.gpio_config = config.GPIO_CONFIG
         self.mqtt_config = config.MQTT_CONFIG
+        self.telemetry_config = config.TELEMETRY_CONFIG
+        self.deadband = (
+            DeadbandFilter(
+                self.telemetry_config["deadbands"],
+                self.telemetry_config["keyframe_interval"],
+            )
+            if self.telemetry_config["deadband_enabled"]
+            else None
+        )
+        self.spool = (
+            TelemetrySpool(
+                self.telemetry_config["spool_dir"],
+                max_bytes=self.telemetry_config["spool_max_bytes"],
+                segment_bytes=self.telemetry_config["spool_segment_bytes"],
+                backfill_rate=self.telemetry_config["backfill_rate"],
+            )
+            if self.telemetry_config["spool_enabled"]
+            else None
+        )
         self.base_pwm = config.base_pwm
-        self.mqtt_client = mqtt.Client(
-            mqtt.CallbackAPIVersion.VERSION2, client_id="RPi_Test"
+        self.tracer = CommandTracer(ack=self._publish_command_ack)
+
+        # Each topic's handler runs on its own executor; see _on_mqtt_message
+        topics = self.mqtt_config["topics"]
+        dispatch_config = config.DISPATCH_CONFIG
+        self.dispatcher = MessageDispatcher()
+        self.dispatcher.register(
+            topics["locomotion"],
+            "locomotion",
+            self._run_locomotion_command,
+            priority=lambda payload: payload.get("action") == "stop",
+            **dispatch_config["locomotion"],
+        )
+        self.dispatcher.register(
+            topics["calibration"],
+            "calibration",
+            self._run_calibration_command,
+            **dispatch_config["calibration"],
+        )
+        self.dispatcher.register(
+            topics["camera_control"],
+            "camera_control",
+            self._run_camera_control_command,
+            **dispatch_config["camera_control"],
         )
-        self.mqtt_client.username_pw_set("", "")
-        self.mqtt_client.on_connect = self._on_mqtt_connect
-        self.mqtt_client.on_disconnect = self._on_mqtt_disconnect
-        self.mqtt_client.on_message = self._on_mqtt_message
-
-        # Add reconnection settings
-        self.mqtt_client.reconnect_delay_set(min_delay=1, max_delay=30)
-
-        self._mqtt_reconnect()
-
-    def _mqtt_reconnect(self, max_retries=5, retry_delay=3):
-        """Attempt MQTT reconnection"""
-        retry_count = 0
-        while retry_count < max_retries:
-            try:
-                print("Connecting to MQTT broker...")
-                self.mqtt_client.connect(
-                    self.mqtt_config["broker"], self.mqtt_config["port"], 60
-                )
-                self.mqtt_client.loop_start()
-
-                # Wait a bit for connection to establish
-                time.sleep(2)
-
-                if self.mqtt_client.is_connected():
-                    print("MQTT Connected!")
-                    self.is_online = True
-                    return True
-                else:
-                    print("MQTT connection attempt failed")
-
-            except Exception as e:
-                print(f"MQTT connection failed: {e}")
 
-            retry_count += 1
-            delay = min(retry_delay * (2**retry_count), 30)
-            print(
-                f"Retrying in {delay} seconds... (Attempt {retry_count}/{max_retries})"
-            )
-            time.sleep(delay)
+        # MQTT v5: content type / schema version on every publish, aliases for hot topics
+        self.protocol_v5 = str(self.mqtt_config["protocol_version"]) == "5"
+        self.publish_properties = PublishProperties(
+            content_types={topics["sensor_data_binary"]: "application/octet-stream"},
+            schema_versions={
+                topics["sensor_data"]: 1,
+                topics["sensor_data_binary"]: SCHEMA_VERSION,
+                topics["sensor_data_batch"]: 1,
+                topics["sensor_data_aggregate"]: 1,
+            },
+            alias_topics=[topics[key] for key in self.mqtt_config["topic_aliases"]],
+        )
+        self.mqtt_client = self._create_mqtt_client()
 
-        print("Failed to connect to MQTT broker after maximum retries")
+        # Connection and reconnection run on paho's network thread; nothing here blocks
         self.is_online = False
-        return False
+        self.supervisor = ConnectionSupervisor(
+            self.mqtt_client,
+            self.mqtt_config["broker"],
+            self.mqtt_config["port"],
+            keepalive=60,
+            min_delay=self.mqtt_config["reconnect_min_delay"],
+            max_delay=self.mqtt_config["reconnect_max_delay"],
+            jitter=self.mqtt_config["reconnect_jitter"],
+        )
+        self.supervisor.start()
+
+    def _create_mqtt_client(self):
+        client = mqtt.Client(
+            mqtt.CallbackAPIVersion.VERSION2,
+            client_id="RPi_Test",
+            protocol=mqtt.MQTTv5 if self.protocol_v5 else mqtt.MQTTv311,
+        )
+        client.username_pw_set("", "")
+        client.on_connect = self._on_mqtt_connect
+        client.on_disconnect = self._on_mqtt_disconnect
+        client.on_message = self._on_mqtt_message
+        return client
+
+    def _fallback_to_mqtt311(self):
+        """Broker rejected v5: rebuild the client for 3.1.1 and reconnect"""
+        print("MQTT broker does not support v5, falling back to 3.1.1")
+        self.protocol_v5 = False
+        self.supervisor.stop()
+        self.mqtt_client = self._create_mqtt_client()
+        self.supervisor.attach(self.mqtt_client)
+        self.supervisor.start()
+
+    def _publish(self, topic, payload, qos=0, retain=False):
+        """Publish with v5 properties/topic aliases when connected over MQTT v5"""
+        if self.protocol_v5:
+            return self.publish_properties.publish(self.mqtt_client, topic, payload, qos, retain)
+        return self.mqtt_client.publish(topic, payload, qos=qos, retain=retain)
+
+    def get_connection_metrics(self):
+        """Connection state plus connect/reconnect durations"""
+        metrics = self.supervisor.get_metrics()
+        metrics["protocol"] = "5" if self.protocol_v5 else "3.1.1"
+        if self.protocol_v5:
+            metrics["publish_properties"] = self.publish_properties.get_stats()
+        return metrics
 
     def test_mqtt_publishing(self):
         """Test if MQTT publishing is working"""
@@ -67,7 +133,7 @@ class MQTTClient:
             "message": "Test from robot",
         }
         try:
-            result = self.mqtt_client.publish(
+            result = self._publish(
                 self.mqtt_config["topics"]["sensor_data"], json.dumps(test_payload)
             )
             # Wait for publish to complete
@@ -84,12 +150,28 @@ class MQTTClient:
             print(
                 f"Successfully connected to MQTT broker with reason code {reason_code}"
             )
+            if self.protocol_v5:
+                # Topic aliases only live as long as the connection
+                self.publish_properties.reset(properties)
             client.subscribe(self.mqtt_config["topics"]["locomotion"])
             client.subscribe(self.mqtt_config["topics"]["calibration"])
             client.subscribe(self.mqtt_config["topics"]["camera_control"])
-            client.publish(self.mqtt_config["topics"]["status"], "online", retain=True)
+            self._publish(self.mqtt_config["topics"]["status"], "online", retain=True)
+            if self.deadband:
+                # Consumers may have missed deltas while we were away
+                self.deadband.request_keyframe()
+            if self.spool:
+                self.spool.start_backfill(
+                    self._publish,
+                    self.mqtt_config["topics"]["backfill"],
+                    self.mqtt_client.is_connected,
+                )
             self.is_online = True
+            self.supervisor.on_connected()
             print("MQTT subscriptions set up and status published")
+        elif self.protocol_v5 and reason_code == UNSUPPORTED_PROTOCOL_VERSION:
+            self.is_online = False
+            self._fallback_to_mqtt311()
         else:
             print(f"Failed to connect to MQTT broker with reason code {reason_code}")
             self.is_online = False
@@ -102,38 +184,71 @@ class MQTTClient:
             f"MQTT disconnected with reason code {reason_code}, flags: {disconnect_flags}"
         )
         self.is_online = False
+        if self.protocol_v5:
+            # Messages paho queues while offline must not use the old aliases
+            self.publish_properties.reset()
+        self.supervisor.on_disconnected(reason_code)
 
         if reason_code != 0:
-            print("Unexpected disconnection, attempting to reconnect...")
-            time.sleep(5)
-            self._mqtt_reconnect()
+            print("Unexpected disconnection, paho will reconnect in the background")
 
     def _on_mqtt_message(self, client, userdata, message):
-        """Handle incoming MQTT messages"""
+        """Handle incoming MQTT messages (runs on paho's network thread)"""
         try:
-            payload = json.loads(message.payload.decode())
-            print(f"Received MQTT message on {message.topic}: {payload}")
-
-            if message.topic == self.mqtt_config["topics"]["locomotion"]:
-                self._handle_locomotion_command(payload)
-
-            elif message.topic == self.mqtt_config["topics"]["calibration"]:
-                self._handle_calibration_command(payload)
-
-            elif message.topic == self.mqtt_config["topics"]["camera_control"]:
-                self._handle_camera_control_command(payload)
+            if not self.dispatcher.dispatch(message):
+                print(f"Received MQTT message on unhandled topic {message.topic}")
 
         except Exception as e:
             print(f"Error processing MQTT message: {e}")
 
+    def _run_locomotion_command(self, payload, timing):
+        """Locomotion executor: apply the command and trace it"""
+        print(f"Received locomotion command: {payload}")
+        trace = self.tracer.begin("locomotion", payload, timing)
+        self._handle_locomotion_command(payload)
+        self.tracer.mark(trace, "applied")
+        if payload.get("action") in ("move", "stop"):
+            # Motors are driven by the control loop on its next tick; handlers
+            # on this topic are serialized, so the mailbox holds our command
+            self.tracer.await_actuation(trace, self.robot.mailbox.current.version)
+        else:
+            self.tracer.complete(trace)
+
+    def _run_calibration_command(self, payload, timing):
+        """Calibration executor; may take seconds without blocking other topics"""
+        print(f"Received calibration command: {payload}")
+        self._handle_calibration_command(payload)
+
+    def _run_camera_control_command(self, payload, timing):
+        """Camera control executor: apply the command and trace it"""
+        print(f"Received camera control command: {payload}")
+        trace = self.tracer.begin("camera_control", payload, timing)
+        self._handle_camera_control_command(payload)
+        self.tracer.mark(trace, "applied")
+        self.tracer.complete(trace)
+
+    def _spool(self, topic, payload, timestamp=None):
+        """Keep a message for backfill while the broker is unreachable"""
+        if not self.spool:
+            return False
+        try:
+            self.spool.append(topic, json.dumps(payload), timestamp)
+            return True
+        except Exception as e:
+            print(f"✗ Failed to spool telemetry: {e}")
+            return False
+
     def publish_network_metrics(self, network_data):
         """Publish network metrics to MQTT"""
         if not self.mqtt_client.is_connected():
-            print("MQTT not connected, skipping network publish")
+            if self._spool(self.mqtt_config["topics"]["network"], network_data):
+                print("MQTT not connected, spooled network metrics")
+            else:
+                print("MQTT not connected, skipping network publish")
             return
         
         try:
-            result = self.mqtt_client.publish(
+            result = self._publish(
                 self.mqtt_config["topics"]["network"], 
                 json.dumps(network_data)
             )
@@ -142,30 +257,89 @@ class MQTTClient:
         except Exception as e:
             print(f"✗ Failed to publish network metrics: {e}")
 
+    def _publish_command_ack(self, ack):
+        """Acknowledge a traced command with its per-stage timestamps"""
+        if self.mqtt_client.is_connected():
+            self._publish(
+                self.mqtt_config["topics"]["command_feedback"], json.dumps(ack)
+            )
+
+    def publish_command_latency(self):
+        """Publish command latency histograms on the feedback topic"""
+        if not self.mqtt_client.is_connected():
+            return
+        self._publish(
+            self.mqtt_config["topics"]["command_feedback"],
+            json.dumps(self.tracer.get_histograms()),
+        )
+
+    def publish_sensor_batch(self, batch):
+        """Publish a columnar batch of control-rate samples"""
+        if not self.mqtt_client.is_connected():
+            self._spool(
+                self.mqtt_config["topics"]["sensor_data_batch"],
+                batch,
+                batch["base_timestamp"],
+            )
+            return
+
+        self._publish(
+            self.mqtt_config["topics"]["sensor_data_batch"], json.dumps(batch)
+        )
+
+    def publish_sensor_aggregate(self, aggregate):
+        """Publish one closed min/max/mean/last/count window"""
+        if not self.mqtt_client.is_connected():
+            self._spool(
+                self.mqtt_config["topics"]["sensor_data_aggregate"],
+                aggregate,
+                aggregate["end"],
+            )
+            return
+
+        self._publish(
+            self.mqtt_config["topics"]["sensor_data_aggregate"], json.dumps(aggregate)
+        )
+
+    def publish_qos_event(self, event):
+        """Publish an adaptive QoS decision"""
+        if not self.mqtt_client.is_connected():
+            self._spool(self.mqtt_config["topics"]["qos_events"], event, event["timestamp"])
+            return
+        self._publish(self.mqtt_config["topics"]["qos_events"], json.dumps(event))
+
+    def publish_recording_trigger(self, trigger):
+        """Ask the camera server to record an event (not spooled: a late trigger is useless)"""
+        if not self.mqtt_client.is_connected():
+            print(f"MQTT not connected, recording trigger ({trigger.get('reason')}) dropped")
+            return
+        self._publish(self.mqtt_config["topics"]["camera_record"], json.dumps(trigger), qos=1)
+
     def _handle_locomotion_command(self, command):
         """Process locomotion commands by updating robot state."""
         action = command.get("action", "")
         speed = command.get("speed", self.base_pwm)
 
         if action == "stop":
-            self.robot.command = "stop"
+            self.robot.mailbox.post("stop", 0)
             print("🛑 Command received: stop")
             return
 
         elif action == "move":
             angle = command.get("angle", 0)
             print(f"🎮 Move command received - Angle: {angle}, Speed: {speed}")
-            self.robot.target_speed = speed
             if 260 <= angle <= 280:
-                self.robot.command = "forward"
+                direction = "forward"
             elif 80 <= angle <= 100:
-                self.robot.command = "backward"
+                direction = "backward"
             elif 170 <= angle <= 190:
-                self.robot.command = "left"
+                direction = "left"
             elif angle <= 10 or angle >= 350:
-                self.robot.command = "right"
+                direction = "right"
             else:
-                self.robot.command = "stop"
+                direction = "stop"
+            # Direction and speed go out as one record and wake the control loop
+            self.robot.mailbox.post(direction, speed)
 
         elif action == "horn":
             value = command.get("value", "")
@@ -187,16 +361,27 @@ class MQTTClient:
         feedback = {"status": "failure", "error": "unknown_quantity"}
 
         if quantity == "altitude":
-            pressure_sum = 0
+            # Read the BMP280 directly: the sensor cache is only refreshed every
+            # few seconds, and the chip itself only produces a new measurement
+            # every standby period (500 ms), so sample at that rate
+            pressures = []
             for _ in range(10):
-                env_data = self._read_environmental()
-                if env_data:
-                    pressure_sum += env_data["pressure"]
-                time.sleep(0.1)
-
-            feedback = {"status": "success", "referencePressure": pressure_sum / 10}
+                env_data = self.robot.sensors.bmp280.read_data()
+                pressure = env_data["pressure"]
+                if isinstance(pressure, (int, float)) and not env_data.get("stale"):
+                    pressures.append(pressure)
+                time.sleep(0.5)
+
+            if pressures:
+                feedback = {
+                    "status": "success",
+                    "referencePressure": sum(pressures) / len(pressures),
+                    "samples": len(pressures),
+                }
+            else:
+                feedback = {"status": "failure", "error": "no_pressure_data"}
 
-        self.mqtt_client.publish(
+        self._publish(
             self.mqtt_config["topics"]["calibration_feedback"],
             json.dumps(feedback),
             retain=True,
@@ -239,16 +424,22 @@ class MQTTClient:
                 angle = command.get("angle", 0)
                 self.robot.servos.set_tilt(angle)
                 print(f"📹 Camera tilt: {angle}°")
+
+            elif action == "record":
+                # Event recording runs in the camera server
+                trigger = {"reason": command.get("reason", "command"), "timestamp": time.time()}
+                if command.get("duration"):
+                    trigger["duration"] = command["duration"]
+                self.publish_recording_trigger(trigger)
+                print("📹 Recording requested")
                 
         except Exception as e:
             print(f"❌ Error handling camera control command: {e}")
 
-    def _publish_sensor_data(self, imu_data, env_data, battery_data,encoder_data):
+    def _publish_sensor_data(
+        self, imu_data, env_data, battery_data, encoder_data, health_data=None
+    ):
         """Publish sensor data to MQTT"""
-        if not self.mqtt_client.is_connected():  # Use direct check instead of is_online
-            print("MQTT not connected, skipping publish")
-            return
-
         try:
             payload = {
                 "imu": imu_data if imu_data else {"error": "No IMU data"},
@@ -264,15 +455,38 @@ class MQTTClient:
                 "movement": self.robot.command,
                 "timestamp": time.time(),
             }
+            if health_data:
+                payload["sensor_health"] = health_data
+
+            if not self.mqtt_client.is_connected():  # Use direct check instead of is_online
+                # Spool the full snapshot; deltas are meaningless without their keyframe
+                if self._spool(
+                    self.mqtt_config["topics"]["sensor_data"], payload, payload["timestamp"]
+                ):
+                    print("MQTT not connected, spooled sensor data")
+                else:
+                    print("MQTT not connected, skipping publish")
+                return
+
+            if self.telemetry_config["binary_enabled"]:
+                self._publish(
+                    self.mqtt_config["topics"]["sensor_data_binary"],
+                    encode_sensor_payload(payload),
+                )
+
+            message = self.deadband.apply(payload) if self.deadband else payload
+            if message is None:
+                return  # Nothing moved past its deadband since the last publish
 
-            result = self.mqtt_client.publish(
-                self.mqtt_config["topics"]["sensor_data"], json.dumps(payload)
+            result = self._publish(
+                self.mqtt_config["topics"]["sensor_data"], json.dumps(message)
             )
 
             # Optional: Wait for publish confirmation
             result.wait_for_publish(timeout=5)
 
-            print(f"✓ Published sensor data to MQTT (msg ID: {result.mid})")
+            kind = "keyframe" if message.get("keyframe", True) else "delta"
+            print(f"✓ Published sensor {kind} to MQTT (msg ID: {result.mid})")
 
         except Exception as e:
             print(f"✗ Failed to publish sensor data: {e}")
@@ -280,9 +494,13 @@ class MQTTClient:
     def disconnect(self):
         """Safely disconnect from MQTT broker"""
         try:
+            if getattr(self, "spool", None):
+                self.spool.stop()
+            if getattr(self, "dispatcher", None):
+                self.dispatcher.stop()
             if hasattr(self, 'mqtt_client') and self.mqtt_client:
                 # Stop the network loop first
-                self.mqtt_client.loop_stop()
+                self.supervisor.stop()
 
                 # Disconnect from broker
                 if self.mqtt_client.is_connected():
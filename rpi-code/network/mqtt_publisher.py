@@ -0,0 +1,115 @@
+import json
+import threading
+
+import paho.mqtt.client as mqtt
+
+
+class MQTTPublisher:
+    """
+    Lightweight MQTT connection for processes other than the master
+    controller (e.g. the camera server).
+
+    paho's network thread connects in the background and reconnects on its
+    own; publishes made while disconnected are dropped rather than queued,
+    since everything sent here (metrics snapshots, events) is superseded by
+    the next one. publish_periodically() publishes collect() every
+    `interval` seconds from a daemon thread. subscribe() registers a
+    callback for JSON messages on a topic; subscriptions are renewed on
+    every reconnect.
+    """
+
+    def __init__(self, broker, port, client_id):
+        self.broker = broker
+        self.port = port
+        self.stats = {"published": 0, "dropped": 0, "errors": 0}
+
+        self._connected = threading.Event()
+        self._stop_event = threading.Event()
+        self._threads = []
+        self._subscriptions = {}
+
+        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=client_id)
+        self.client.reconnect_delay_set(min_delay=1, max_delay=30)
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
+        self.client.on_message = self._on_message
+
+    @property
+    def connected(self):
+        return self._connected.is_set()
+
+    def start(self):
+        try:
+            self.client.connect_async(self.broker, self.port, 60)
+            self.client.loop_start()
+            print(f"✓ MQTT publisher connecting to {self.broker}:{self.port}")
+        except Exception as e:
+            print(f"✗ MQTT publisher connection setup failed: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout=2)
+        self.client.loop_stop()
+        self.client.disconnect()
+
+    def _on_connect(self, client, userdata, flags, reason_code, properties):
+        if reason_code == 0:
+            self._connected.set()
+            for topic in self._subscriptions:
+                client.subscribe(topic, qos=1)
+        else:
+            print(f"✗ MQTT publisher connection refused: {reason_code}")
+
+    def _on_disconnect(self, client, userdata, disconnect_flags, reason_code, properties):
+        self._connected.clear()
+
+    def subscribe(self, topic, callback):
+        """Call callback(payload) with every JSON message on `topic`"""
+        self._subscriptions[topic] = callback
+        if self.connected:
+            self.client.subscribe(topic, qos=1)
+
+    def _on_message(self, client, userdata, message):
+        callback = self._subscriptions.get(message.topic)
+        if not callback:
+            return
+        try:
+            payload = json.loads(message.payload.decode())
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            print(f"✗ Invalid JSON on {message.topic}: {e}")
+            return
+        try:
+            callback(payload)
+        except Exception as e:
+            print(f"✗ Handler for {message.topic} failed: {e}")
+
+    def publish_json(self, topic, data, qos=0):
+        """Publish `data` as JSON; returns False if it was dropped"""
+        if not self.connected:
+            self.stats["dropped"] += 1
+            return False
+        try:
+            self.client.publish(topic, json.dumps(data), qos=qos)
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"✗ Failed to publish to {topic}: {e}")
+            return False
+        self.stats["published"] += 1
+        return True
+
+    def publish_periodically(self, topic, interval, collect):
+        def loop():
+            while not self._stop_event.wait(interval):
+                if not self.connected:
+                    continue
+                try:
+                    data = collect()
+                except Exception as e:
+                    print(f"✗ Failed to collect data for {topic}: {e}")
+                    continue
+                self.publish_json(topic, data)
+
+        thread = threading.Thread(target=loop, name=f"publish-{topic}", daemon=True)
+        self._threads.append(thread)
+        thread.start()
@@ -0,0 +1,83 @@
+import threading
+
+from paho.mqtt.packettypes import PacketTypes
+from paho.mqtt.properties import Properties
+
+# Reason code a v5 broker (or paho, translating a 3.1.1 CONNACK) reports for an unknown protocol level
+UNSUPPORTED_PROTOCOL_VERSION = 132
+
+
+class PublishProperties:
+    """
+    MQTT v5 publish properties for the robot's outgoing topics.
+
+    Every topic gets a content type and, where configured, a schema-version
+    user property so consumers can tell payload formats apart without
+    sniffing. High-frequency topics are given topic aliases: the first
+    publish after a connect carries the full topic string plus the alias,
+    later publishes send an empty topic and only the 2-byte alias. Aliases
+    are per connection, so reset() must be called from on_connect with the
+    CONNACK properties (the broker's TopicAliasMaximum caps how many we use)
+    and from on_disconnect without them, so that publishes queued while
+    offline carry the full topic.
+    """
+
+    def __init__(self, content_types, schema_versions, alias_topics):
+        self.content_types = content_types
+        self.schema_versions = schema_versions
+        self.alias_topics = list(alias_topics)
+
+        self._lock = threading.Lock()
+        self._properties = {}
+        self._aliases = {}
+        self._announced = set()
+        self.stats = {"aliased": 0, "full_topic": 0}
+
+    def reset(self, connack_properties=None):
+        """Start a new connection: re-announce aliases, up to the broker's maximum
+
+        Without CONNACK properties (on disconnect) no aliases are used at all.
+        """
+        alias_maximum = getattr(connack_properties, "TopicAliasMaximum", 0) or 0
+        with self._lock:
+            self._properties.clear()
+            self._announced.clear()
+            self._aliases = {
+                topic: index + 1
+                for index, topic in enumerate(self.alias_topics[:alias_maximum])
+            }
+
+    def publish(self, client, topic, payload, qos=0, retain=False):
+        """Publish through `client` with this topic's properties (and alias)"""
+        with self._lock:
+            properties = self._properties.get(topic)
+            if properties is None:
+                properties = self._build(topic)
+                self._properties[topic] = properties
+
+            if topic in self._aliases and topic not in self._announced:
+                # The first publish binds the alias; it is sent under the lock so
+                # no alias-only publish can reach paho's queue ahead of it
+                result = client.publish(topic, payload, qos, retain, properties)
+                self._announced.add(topic)
+                self.stats["full_topic"] += 1
+                return result
+
+            aliased = topic in self._aliases
+            self.stats["aliased" if aliased else "full_topic"] += 1
+
+        return client.publish("" if aliased else topic, payload, qos, retain, properties)
+
+    def _build(self, topic):
+        properties = Properties(PacketTypes.PUBLISH)
+        properties.ContentType = self.content_types.get(topic, "application/json")
+        schema_version = self.schema_versions.get(topic)
+        if schema_version is not None:
+            properties.UserProperty = [("schema_version", str(schema_version))]
+        if topic in self._aliases:
+            properties.TopicAlias = self._aliases[topic]
+        return properties
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, aliases=dict(self._aliases))
@@ -1,52 +1,135 @@
 #!/usr/bin/env python3
-import subprocess
+import array
+import fcntl
 import json
-import re
+import os
+import socket
+import struct
+import threading
 from datetime import datetime
-import speedtest  # pip install speedtest-cli
+from network.interface_throughput import InterfaceThroughput
 
 
-def measure_internet_speed():
-    """Measure actual internet speed using speedtest.net"""
+# Wireless extension / socket ioctls (linux/wireless.h, linux/sockios.h)
+SIOCGIWESSID = 0x8B1B
+SIOCGIWRATE = 0x8B21
+SIOCGIFADDR = 0x8915
+IFNAMSIZ = 16
+IW_ESSID_MAX_SIZE = 32
+
+PROC_NET_WIRELESS = "/proc/net/wireless"
+SYS_CLASS_NET = "/sys/class/net"
+
+
+def find_wireless_interface(default="wlan0"):
+    """First interface listed in /proc/net/wireless, else `default`"""
     try:
-        print("🌐 Measuring internet speed...")
-        st = speedtest.Speedtest()
-
-        # Get best server
-        st.get_best_server()
-
-        # Measure download speed
-        print("📥 Testing download speed...")
-        download_speed = st.download() / 1_000_000  # Convert to Mbps
-
-        # Measure upload speed
-        print("📤 Testing upload speed...")
-        upload_speed = st.upload() / 1_000_000  # Convert to Mbps
-
-        # Get ping
-        ping = st.results.ping
-
-        return {
-            "download_mbps": round(download_speed, 2),
-            "upload_mbps": round(upload_speed, 2),
-            "ping_ms": round(ping, 2),
-            "server": st.results.server["name"],
-            "method": "speedtest",
-            "timestamp": datetime.now().isoformat(),
-        }
-    except Exception as e:
-        print(f"❌ Speedtest failed: {e}")
-        return {
-            "download_mbps": 0,
-            "upload_mbps": 0,
-            "ping_ms": 0,
-            "method": "failed",
-            "error": str(e),
-        }
-
-
-def get_wifi_metrics():
-    """Get comprehensive network metrics"""
+        with open(PROC_NET_WIRELESS) as f:
+            for line in f.readlines()[2:]:
+                name = line.split(":", 1)[0].strip()
+                if name:
+                    return name
+    except OSError:
+        pass
+    return default
+
+
+def read_signal_dbm(interface):
+    """Signal level in dBm from /proc/net/wireless, or None"""
+    try:
+        with open(PROC_NET_WIRELESS) as f:
+            for line in f.readlines()[2:]:
+                name, _, fields = line.partition(":")
+                if name.strip() != interface:
+                    continue
+                # status, link quality, signal level, noise, ...
+                level = float(fields.split()[2].rstrip("."))
+                # Drivers without dBm support report an unsigned 8-bit value
+                return int(level - 256 if level > 63 else level)
+    except (OSError, IndexError, ValueError):
+        pass
+    return None
+
+
+def _ifname(interface):
+    return interface.encode()[: IFNAMSIZ - 1]
+
+
+def read_bit_rate_mbps(sock, interface):
+    """Current TX bit rate via SIOCGIWRATE, or None"""
+    try:
+        request = struct.pack("16s16s", _ifname(interface), b"")
+        result = fcntl.ioctl(sock.fileno(), SIOCGIWRATE, request)
+        bits_per_second = struct.unpack_from("i", result, IFNAMSIZ)[0]
+        return round(bits_per_second / 1_000_000, 1)
+    except OSError:
+        return None
+
+
+def read_ssid(sock, interface):
+    """Associated ESSID via SIOCGIWESSID, or None"""
+    try:
+        essid = array.array("B", bytes(IW_ESSID_MAX_SIZE + 1))
+        address, length = essid.buffer_info()
+        # struct iwreq { char name[16]; struct iw_point { void *pointer; __u16 length; __u16 flags; } }
+        request = array.array(
+            "B", struct.pack(f"{IFNAMSIZ}sPHH", _ifname(interface), address, length, 0)
+        )
+        request.extend(bytes(IFNAMSIZ + 16 - len(request)))  # sizeof(union iwreq_data) == 16
+        fcntl.ioctl(sock.fileno(), SIOCGIWESSID, request, True)
+        size = struct.unpack_from("H", request, IFNAMSIZ + struct.calcsize("P"))[0]
+        ssid = essid.tobytes()[:size].rstrip(b"\0").decode(errors="replace")
+        return ssid or None
+    except OSError:
+        return None
+
+
+def read_ipv4_address(sock, interface):
+    """IPv4 address of an interface via SIOCGIFADDR, or None"""
+    try:
+        request = struct.pack("256s", _ifname(interface))
+        result = fcntl.ioctl(sock.fileno(), SIOCGIFADDR, request)
+        return socket.inet_ntoa(result[20:24])
+    except OSError:
+        return None
+
+
+def read_primary_ipv4(sock, preferred):
+    """Like `hostname -I | cut -d' ' -f1`: preferred interface first, then any non-loopback"""
+    address = read_ipv4_address(sock, preferred)
+    if address:
+        return address
+    try:
+        interfaces = sorted(os.listdir(SYS_CLASS_NET))
+    except OSError:
+        return None
+    for name in interfaces:
+        if name == "lo" or name == preferred:
+            continue
+        address = read_ipv4_address(sock, name)
+        if address:
+            return address
+    return None
+
+
+def read_operstate(interface):
+    try:
+        with open(os.path.join(SYS_CLASS_NET, interface, "operstate")) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def get_wifi_metrics(interface=None, throughput=None):
+    """
+    Get comprehensive network metrics.
+
+    Reads /proc/net/wireless, /sys/class/net and socket ioctls directly, so
+    no processes are spawned. NetworkMonitor runs this in the background and
+    serves cached results. With an InterfaceThroughput sampler the smoothed
+    per-interface (and per-socket) traffic rates are included as well.
+    """
+    interface = interface or find_wireless_interface()
     metrics = {
         "timestamp": datetime.now().isoformat(),
         "wifi_connection": {
@@ -57,46 +140,38 @@ def get_wifi_metrics():
         "network_info": {
             "ip_address": "Unknown",
             "ssid": "Unknown",
-            "interface": "wlan0",
+            "interface": interface,
         },
-        "internet_speed": {},  # Will be populated by speed test
+        "broker_link": {},  # Populated by NetworkMonitor's broker probe
     }
+    if throughput is not None:
+        metrics["throughput"] = throughput.get_rates()
 
     try:
-        # Get WiFi interface info
-        result = subprocess.run(["iwconfig"], capture_output=True, text=True)
-
-        # Parse signal strength and link speed
-        for line in result.stdout.split("\n"):
-            if "Signal level" in line:
-                match = re.search(r"Signal level=(-?\d+) dBm", line)
-                if match:
-                    dBm = int(match.group(1))
-                    percentage = max(0, min(100, 2 * (dBm + 100)))
-                    metrics["wifi_connection"]["signal_strength"] = {
-                        "dBm": dBm,
-                        "percentage": percentage,
-                        "bars": get_bars_from_dbm(dBm),
-                    }
-                    metrics["wifi_connection"]["local_quality"] = get_quality_from_dbm(
-                        dBm
-                    )
-
-            if "Bit Rate" in line:
-                match = re.search(r"Bit Rate=([\d.]+) Mb/s", line)
-                if match:
-                    metrics["wifi_connection"]["link_speed_mbps"] = float(
-                        match.group(1)
-                    )
-
-        # Get IP and SSID
-        result = subprocess.run(["hostname", "-I"], capture_output=True, text=True)
-        if result.stdout.strip():
-            metrics["network_info"]["ip_address"] = result.stdout.strip().split()[0]
-
-        result = subprocess.run(["iwgetid", "-r"], capture_output=True, text=True)
-        if result.stdout.strip():
-            metrics["network_info"]["ssid"] = result.stdout.strip()
+        dBm = read_signal_dbm(interface)
+        if dBm is not None:
+            percentage = max(0, min(100, 2 * (dBm + 100)))
+            metrics["wifi_connection"]["signal_strength"] = {
+                "dBm": dBm,
+                "percentage": percentage,
+                "bars": get_bars_from_dbm(dBm),
+            }
+            metrics["wifi_connection"]["local_quality"] = get_quality_from_dbm(dBm)
+
+        link_up = read_operstate(interface) != "down"
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            if link_up:
+                link_speed = read_bit_rate_mbps(sock, interface)
+                if link_speed is not None:
+                    metrics["wifi_connection"]["link_speed_mbps"] = link_speed
+
+                ssid = read_ssid(sock, interface)
+                if ssid:
+                    metrics["network_info"]["ssid"] = ssid
+
+            ip_address = read_primary_ipv4(sock, interface)
+            if ip_address:
+                metrics["network_info"]["ip_address"] = ip_address
 
     except Exception as e:
         print(f"Error getting WiFi metrics: {e}")
@@ -134,42 +209,63 @@ def get_quality_from_dbm(dBm):
 
 # Enhanced network monitor with caching
 class NetworkMonitor:
-    def __init__(self):
-        self.last_speed_test = None
-        self.speed_test_interval = 300  # 5 minutes
+    def __init__(self, interface=None, refresh_interval=5, throughput_interval=1.0, probe=None):
+        # Per-interface tx/rx rates from /proc/net/dev deltas
+        self.throughput = InterfaceThroughput(interval=throughput_interval)
+        self.throughput.start()
 
-    def get_complete_metrics(self):
-        """Get all metrics with cached speed test"""
-        metrics = get_wifi_metrics()
-
-        # Only run speed test if:
-        # - Never run before, OR
-        # - Last test was more than interval ago
-        should_test = (
-            self.last_speed_test is None
-            or (datetime.now() - self.last_speed_test).total_seconds()
-            > self.speed_test_interval
+        # Broker round-trip probe (replaces the speedtest.net run)
+        self.probe = probe
+        if self.probe:
+            self.probe.start()
+
+        # WiFi metrics are collected in the background; callers get the cached copy
+        self.interface = interface
+        self.refresh_interval = refresh_interval
+        self._wifi_metrics = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._collect_loop, name="network-monitor", daemon=True
         )
+        self._thread.start()
 
-        if should_test:
-            print("🔄 Running internet speed test...")
-            metrics["internet_speed"] = measure_internet_speed()
-            self.last_speed_test = datetime.now()
-        else:
-            # Use cached result with note
-            if hasattr(self, "cached_speed"):
-                metrics["internet_speed"] = self.cached_speed.copy()
-                metrics["internet_speed"]["cached"] = True
-                metrics["internet_speed"]["cache_age_minutes"] = round(
-                    (datetime.now() - self.last_speed_test).total_seconds() / 60, 1
-                )
-            else:
-                metrics["internet_speed"] = {"method": "pending"}
-
-        # Cache the result
-        if "internet_speed" in metrics and "cached" not in metrics["internet_speed"]:
-            self.cached_speed = metrics["internet_speed"].copy()
+    def _collect_loop(self):
+        while not self._stop_event.is_set():
+            self._refresh()
+            self._stop_event.wait(self.refresh_interval)
+
+    def _refresh(self):
+        metrics = get_wifi_metrics(self.interface, self.throughput)
+        with self._lock:
+            self._wifi_metrics = metrics
+        return metrics
 
+    def get_wifi_metrics(self):
+        """Latest background-collected WiFi metrics (same schema as get_wifi_metrics())"""
+        with self._lock:
+            metrics = self._wifi_metrics
+        if metrics is None:
+            metrics = self._refresh()
+        metrics = dict(metrics)
+        # Rates are sampled more often than the WiFi metrics; serve the latest
+        metrics["throughput"] = self.throughput.get_rates()
+        return metrics
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join(timeout=2)
+        self.throughput.stop()
+        if self.probe:
+            self.probe.stop()
+
+    def get_complete_metrics(self):
+        """WiFi metrics plus the latest broker round-trip results; never blocks"""
+        metrics = self.get_wifi_metrics()
+        if self.probe:
+            metrics["broker_link"] = self.probe.get_results()
+        else:
+            metrics["broker_link"] = {"method": "disabled"}
         return metrics
 
 
@@ -177,4 +273,5 @@ class NetworkMonitor:
 if __name__ == "__main__":
     monitor = NetworkMonitor()
     metrics = monitor.get_complete_metrics()
-    print(json.dumps(metrics, indent=4))
\ No newline at end of file
+    print(json.dumps(metrics, indent=4))
+    monitor.stop()
\ No newline at end of file
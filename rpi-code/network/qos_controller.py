@@ -0,0 +1,244 @@
+import json
+import threading
+import time
+import urllib.request
+from collections import deque
+
+
+class QoSController:
+    """
+    Closed-loop quality-of-service control of the camera stream and telemetry.
+
+    Every `interval` seconds the controller reads link quality (RSSI, link
+    rate, measured tx throughput, broker RTT and loss) and decides whether to
+    step through the configured ladder: level 0 is the best stream/telemetry
+    setting, each further level is cheaper. Stepping down needs the link to
+    look bad for `degrade_after` consecutive checks, stepping up needs it to
+    look good for `upgrade_after` checks and every change is followed by at
+    least `min_dwell` seconds at the new level, so the controller never
+    oscillates on a noisy RSSI. `command_headroom_kbps` is always kept free
+    in the bandwidth budget for the locomotion command path.
+
+    Telemetry rates follow a level change immediately. The camera server
+    may be down or not started yet, so `camera_level` records the level whose
+    stream settings it has actually accepted (bandwidth predictions scale from
+    that one); a failed update is retried no sooner than `min_dwell` seconds
+    later. Every level change is recorded as an event and handed to
+    `on_event`.
+    """
+
+    def __init__(self, config, get_network_metrics, apply_camera, apply_telemetry, on_event=None):
+        self.config = config
+        self.ladder = config["ladder"]
+        self.get_network_metrics = get_network_metrics
+        self.apply_camera = apply_camera
+        self.apply_telemetry = apply_telemetry
+        self.on_event = on_event
+
+        self.level = 0
+        self.camera_level = 0
+        self._camera_retry_at = 0.0
+        self._bad_streak = 0
+        self._good_streak = 0
+        self._last_change = 0.0
+        self.events = deque(maxlen=config["event_history"])
+        self.last_inputs = None
+
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._control_loop, name="qos-controller", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def _control_loop(self):
+        while not self._stop_event.wait(self.config["interval"]):
+            try:
+                self.evaluate(self.get_network_metrics())
+            except Exception as e:
+                print(f"QoS evaluation failed: {e}")
+
+    # ---------- inputs ----------
+    def _inputs(self, metrics):
+        wifi = metrics.get("wifi_connection", {})
+        interface = metrics.get("network_info", {}).get("interface")
+        rates = (metrics.get("throughput") or {}).get("interfaces", {}).get(interface) or {}
+        probe = metrics.get("broker_link") or {}
+        rtt = probe.get("rtt_ms") or {}
+        return {
+            "rssi_dbm": wifi.get("signal_strength", {}).get("dBm") or None,
+            "link_mbps": wifi.get("link_speed_mbps") or None,
+            "tx_kbps": rates.get("tx_bytes_per_s", 0) * 8 / 1000,
+            "rtt_p90_ms": rtt.get("p90"),
+            "loss_pct": probe.get("loss_pct"),
+        }
+
+    def _level_cost(self, level):
+        """Relative stream cost of a ladder level (pixels x fps x quality)"""
+        step = self.ladder[level]
+        return step["width"] * step["height"] * step["fps"] * step["quality"]
+
+    def _predicted_kbps(self, inputs, level):
+        """Scale the measured tx rate from the camera's current level to another one"""
+        return inputs["tx_kbps"] * self._level_cost(level) / self._level_cost(self.camera_level)
+
+    def _capacity_kbps(self, inputs):
+        if not inputs["link_mbps"]:
+            return None
+        # Nominal WiFi rates are PHY rates; only a fraction is usable goodput
+        return inputs["link_mbps"] * 1000 * self.config["link_efficiency"]
+
+    # ---------- decision ----------
+    def _degrade_reasons(self, inputs):
+        config = self.config
+        reasons = []
+        if inputs["rssi_dbm"] is not None and inputs["rssi_dbm"] < config["rssi_degrade_dbm"]:
+            reasons.append("weak_signal")
+        if inputs["rtt_p90_ms"] is not None and inputs["rtt_p90_ms"] > config["rtt_degrade_ms"]:
+            reasons.append("high_latency")
+        if inputs["loss_pct"] is not None and inputs["loss_pct"] > config["loss_degrade_pct"]:
+            reasons.append("packet_loss")
+        capacity = self._capacity_kbps(inputs)
+        if capacity and (
+            inputs["tx_kbps"] + config["command_headroom_kbps"]
+            > capacity * config["utilization_degrade"]
+        ):
+            reasons.append("link_saturated")
+        return reasons
+
+    def _can_upgrade(self, inputs):
+        config = self.config
+        if inputs["rssi_dbm"] is not None and inputs["rssi_dbm"] < config["rssi_upgrade_dbm"]:
+            return False
+        if inputs["rtt_p90_ms"] is not None and inputs["rtt_p90_ms"] > config["rtt_upgrade_ms"]:
+            return False
+        if inputs["loss_pct"] is not None and inputs["loss_pct"] > config["loss_upgrade_pct"]:
+            return False
+        capacity = self._capacity_kbps(inputs)
+        if capacity:
+            predicted = self._predicted_kbps(inputs, self.level - 1)
+            if predicted + config["command_headroom_kbps"] > capacity * config["utilization_upgrade"]:
+                return False
+        return True
+
+    def evaluate(self, metrics):
+        """One control step; returns the (possibly new) ladder level"""
+        inputs = self._inputs(metrics)
+        self.last_inputs = inputs
+
+        if self.camera_level != self.level and time.monotonic() >= self._camera_retry_at:
+            error = self._apply_camera()
+            if error:
+                print(f"✗ QoS camera update to level {self.level} failed again: {error}")
+            else:
+                print(f"📶 QoS camera now at level {self.level} ({self.ladder[self.level]['name']})")
+
+        reasons = self._degrade_reasons(inputs)
+        if reasons:
+            self._bad_streak += 1
+            self._good_streak = 0
+        elif self.level > 0 and self._can_upgrade(inputs):
+            self._good_streak += 1
+            self._bad_streak = 0
+        else:
+            self._bad_streak = self._good_streak = 0
+
+        if time.monotonic() - self._last_change < self.config["min_dwell"]:
+            return self.level
+
+        if reasons and self._bad_streak >= self.config["degrade_after"]:
+            if self.level < len(self.ladder) - 1:
+                self._change(self.level + 1, "degrade", reasons, inputs)
+        elif self._good_streak >= self.config["upgrade_after"]:
+            self._change(self.level - 1, "upgrade", ["link_recovered"], inputs)
+        return self.level
+
+    def _apply_camera(self):
+        """Push the current level to the camera; returns an error string on failure"""
+        try:
+            self.apply_camera(self.ladder[self.level])
+        except Exception as e:
+            # Back off: the server is likely down, don't hammer it every check
+            self._camera_retry_at = time.monotonic() + self.config["min_dwell"]
+            return str(e)
+        self.camera_level = self.level
+        return None
+
+    def _change(self, level, decision, reasons, inputs):
+        previous = self.level
+        step = self.ladder[level]
+        self.level = level
+        self._bad_streak = self._good_streak = 0
+        self._last_change = time.monotonic()
+
+        errors = []
+        try:
+            self.apply_telemetry(step)
+        except Exception as e:
+            errors.append(f"telemetry: {e}")
+        error = self._apply_camera()
+        if error:
+            errors.append(f"camera: {error}")
+
+        self._log_event(
+            {
+                "type": "qos_decision",
+                "timestamp": time.time(),
+                "decision": decision,
+                "from_level": previous,
+                "to_level": level,
+                "level_name": step["name"],
+                "reasons": reasons,
+                "inputs": inputs,
+                "settings": step,
+                "errors": errors,
+            }
+        )
+
+    def _log_event(self, event):
+        self.events.append(event)
+        print(
+            f"📶 QoS {event['decision']}: level {event['from_level']} -> {event['to_level']} "
+            f"({event['level_name']}, {', '.join(event['reasons'])})"
+        )
+        if self.on_event:
+            try:
+                self.on_event(event)
+            except Exception as e:
+                print(f"✗ Failed to publish QoS event: {e}")
+
+    def get_state(self):
+        return {
+            "level": self.level,
+            "level_name": self.ladder[self.level]["name"],
+            "camera_level": self.camera_level,
+            "inputs": self.last_inputs,
+            "recent_events": list(self.events)[-5:],
+        }
+
+
+def post_camera_settings(server_url, timeout=2.0):
+    """Build an apply_camera callback that updates the camera server's stream settings"""
+    url = f"{server_url}/api/camera/stream/update"
+
+    def apply(step):
+        body = json.dumps(
+            {
+                "fps": step["fps"],
+                "width": step["width"],
+                "height": step["height"],
+                "quality": step["quality"],
+            }
+        ).encode()
+        request = urllib.request.Request(
+            url, data=body, headers={"Content-Type": "application/json"}, method="POST"
+        )
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+
+    return apply
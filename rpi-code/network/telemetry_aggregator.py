@@ -0,0 +1,163 @@
+import math
+import threading
+import time
+
+# Accumulator slots for one field in one window
+MIN, MAX, SUM, COUNT, LAST = range(5)
+
+
+def _empty():
+    return [math.inf, -math.inf, 0.0, 0, None]
+
+
+class TelemetryAggregator:
+    """
+    Streaming min/max/mean/last/count of slow telemetry fields over tumbling,
+    wall-clock aligned windows (e.g. 1 s, 10 s, 60 s).
+
+    Samples only update the smallest window's accumulators. When a window
+    closes it is published and merged into the next level up, so every level
+    is exact and memory is one fixed accumulator per field per level, however
+    many samples arrive. Each level publishes at its own cadence:
+    {"type": "aggregate", "window_s": 10, "start": t0, "end": t1,
+     "fields": {"battery.battery_voltage.voltage": {"min": .., ...}}}.
+    """
+
+    def __init__(self, fields, publish, windows=(1, 10, 60), precision=4):
+        windows = sorted(windows)
+        for smaller, larger in zip(windows, windows[1:]):
+            if larger % smaller:
+                raise ValueError(f"Window {larger}s is not a multiple of {smaller}s")
+
+        self.fields = list(fields)
+        self.publish = publish
+        self.windows = windows
+        self.precision = precision
+
+        now = time.time()
+        self._levels = [
+            {
+                "length": length,
+                "start": self._align(now, length),
+                "fields": {name: _empty() for name in self.fields},
+            }
+            for length in windows
+        ]
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.stats = {"samples": 0, "stale": 0, "published": {length: 0 for length in windows}}
+
+    @staticmethod
+    def _align(timestamp, length):
+        return math.floor(timestamp / length) * length
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._tick_loop, name="telemetry-aggregator", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def record(self, prefix, data, timestamp=None):
+        """Add one sensor sample; `prefix` is its group (e.g. "battery")"""
+        if data.get("stale"):
+            # The last good reading served again while a breaker is open
+            self.stats["stale"] += 1
+            return
+        now = timestamp if timestamp is not None else time.time()
+        with self._lock:
+            closed = self._roll(now)
+            accumulators = self._levels[0]["fields"]
+            for name in self.fields:
+                group, _, path = name.partition(".")
+                if group != prefix:
+                    continue
+                value = data
+                for key in path.split("."):
+                    value = value.get(key) if isinstance(value, dict) else None
+                if value.__class__ not in (int, float):
+                    continue  # Missing field or "Sensor Error"
+                slot = accumulators[name]
+                if value < slot[MIN]:
+                    slot[MIN] = value
+                if value > slot[MAX]:
+                    slot[MAX] = value
+                slot[SUM] += value
+                slot[COUNT] += 1
+                slot[LAST] = value
+            self.stats["samples"] += 1
+        self._publish(closed)
+
+    def _tick_loop(self):
+        # Close windows on time even when no samples arrive
+        period = self.windows[0] / 4
+        while not self._stop_event.wait(period):
+            with self._lock:
+                closed = self._roll(time.time())
+            self._publish(closed)
+
+    def _roll(self, now):
+        """Close every window that ended before `now`; returns their summaries"""
+        closed = []
+        for index, level in enumerate(self._levels):
+            length = level["length"]
+            if now < level["start"] + length:
+                break  # Larger windows cannot have closed either
+            summary = self._summarize(level)
+            if summary:
+                closed.append(summary)
+            if index + 1 < len(self._levels):
+                self._merge(level["fields"], self._levels[index + 1]["fields"])
+            for slot in level["fields"].values():
+                slot[:] = _empty()
+            level["start"] = self._align(now, length)
+        return closed
+
+    @staticmethod
+    def _merge(source, target):
+        for name, slot in source.items():
+            if not slot[COUNT]:
+                continue
+            into = target[name]
+            into[MIN] = min(into[MIN], slot[MIN])
+            into[MAX] = max(into[MAX], slot[MAX])
+            into[SUM] += slot[SUM]
+            into[COUNT] += slot[COUNT]
+            into[LAST] = slot[LAST]
+
+    def _summarize(self, level):
+        digits = self.precision
+        fields = {
+            name: {
+                "min": round(slot[MIN], digits),
+                "max": round(slot[MAX], digits),
+                "mean": round(slot[SUM] / slot[COUNT], digits),
+                "last": round(slot[LAST], digits),
+                "count": slot[COUNT],
+            }
+            for name, slot in level["fields"].items()
+            if slot[COUNT]
+        }
+        if not fields:
+            return None
+        return {
+            "type": "aggregate",
+            "window_s": level["length"],
+            "start": level["start"],
+            "end": level["start"] + level["length"],
+            "fields": fields,
+        }
+
+    def _publish(self, closed):
+        for summary in closed:
+            self.stats["published"][summary["window_s"]] += 1
+            try:
+                self.publish(summary)
+            except Exception as e:
+                print(f"✗ Failed to publish telemetry aggregate: {e}")
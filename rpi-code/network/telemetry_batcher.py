@@ -0,0 +1,109 @@
+import threading
+import time
+from array import array
+
+
+class TelemetryBatcher:
+    """
+    Collects control-rate samples into preallocated column buffers and hands
+    one columnar batch per interval to `publish`.
+
+    record() is called from the control loop and only writes into the active
+    buffers (no allocation). A background thread swaps the active and standby
+    buffers once per interval and publishes the standby set as
+    {"base_timestamp": t0, "dt_ms": [...], "fields": {name: [...]}}.
+    """
+
+    def __init__(self, fields, publish, sample_rate=50, interval=1.0, precision=3):
+        self.fields = list(fields)
+        self.publish = publish
+        self.sample_interval = 1.0 / sample_rate
+        self.interval = interval
+        self.precision = precision
+
+        # Headroom for jitter in the control loop and a late flush
+        self.capacity = int(sample_rate * interval * 2) + 1
+        self._buffers = [self._allocate(), self._allocate()]
+        self._active = 0
+        self._count = 0
+        self._base_time = None
+        self._last_sample = 0.0
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.stats = {"batches": 0, "samples": 0, "overflows": 0}
+
+    def _allocate(self):
+        return {
+            "time": array("d", [0.0] * self.capacity),
+            "fields": {name: array("d", [0.0] * self.capacity) for name in self.fields},
+        }
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._flush_loop, name="telemetry-batcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def record(self, sample):
+        """Store one sample (dict of field -> number); rate-limited to sample_rate"""
+        now = time.time()
+        if now - self._last_sample < self.sample_interval:
+            return
+        self._last_sample = now
+
+        with self._lock:
+            if self._count >= self.capacity:
+                self.stats["overflows"] += 1
+                return
+            buffers = self._buffers[self._active]
+            index = self._count
+            if index == 0:
+                self._base_time = now
+            buffers["time"][index] = now
+            columns = buffers["fields"]
+            for name in self.fields:
+                value = sample.get(name, 0.0)
+                columns[name][index] = value if isinstance(value, (int, float)) else 0.0
+            self._count += 1
+
+    def _flush_loop(self):
+        while not self._stop_event.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        """Swap buffers and publish the completed batch"""
+        with self._lock:
+            count = self._count
+            if count == 0:
+                return
+            buffers = self._buffers[self._active]
+            base_time = self._base_time
+            self._active ^= 1
+            self._count = 0
+
+        digits = self.precision
+        times = buffers["time"]
+        batch = {
+            "base_timestamp": base_time,
+            "count": count,
+            "dt_ms": [round((times[i] - base_time) * 1000, 1) for i in range(count)],
+            "fields": {
+                name: [round(value, digits) for value in column[:count]]
+                for name, column in buffers["fields"].items()
+            },
+        }
+
+        self.stats["batches"] += 1
+        self.stats["samples"] += count
+        try:
+            self.publish(batch)
+        except Exception as e:
+            print(f"✗ Failed to publish telemetry batch: {e}")
@@ -0,0 +1,155 @@
+"""
+Compact binary encoding of the sensor telemetry payload.
+
+Layout (little-endian):
+    header  : version (u8), presence bitmap (u16), timestamp seconds (u32),
+              timestamp milliseconds (u16), movement code (u8)
+    groups  : one fixed-size block per present group, in bit order
+
+A group is marked absent (its bit cleared and no bytes sent) when the sensor
+is missing, its reading is stale (served while its circuit breaker is open)
+or any of its fields is not a number ("Sensor Not Found", "Read Error", ...). Values are sent as scaled integers and saturate at the limits
+of their type.
+"""
+
+import struct
+import time
+
+SCHEMA_VERSION = 1
+
+HEADER = struct.Struct("<BHIHB")
+
+MOVEMENT_CODES = {"stop": 0, "forward": 1, "backward": 2, "left": 3, "right": 4}
+MOVEMENT_NAMES = {code: name for name, code in MOVEMENT_CODES.items()}
+UNKNOWN_MOVEMENT = 255
+
+_LIMITS = {
+    "h": (-(2**15), 2**15 - 1),
+    "H": (0, 2**16 - 1),
+    "i": (-(2**31), 2**31 - 1),
+    "I": (0, 2**32 - 1),
+}
+
+
+class _Group:
+    """A fixed block of scaled integer fields taken from the nested payload"""
+
+    def __init__(self, bit, fields):
+        self.bit = bit
+        # fields: list of (path, struct type code, scale), all under one sensor
+        self.paths = [path for path, _, _ in fields]
+        self.source = self.paths[0][0]
+        self.scales = [scale for _, _, scale in fields]
+        self.limits = [_LIMITS[code] for _, code, _ in fields]
+        self.struct = struct.Struct("<" + "".join(code for _, code, _ in fields))
+
+    def extract(self, payload):
+        """Return packed bytes, or None if the reading is stale or a field is missing or non-numeric"""
+        source = payload.get(self.source)
+        if source.__class__ is dict and source.get("stale"):
+            return None
+        values = []
+        try:
+            for path, scale, (low, high) in zip(self.paths, self.scales, self.limits):
+                value = payload
+                for key in path:
+                    value = value[key]
+                if value.__class__ is not float and value.__class__ is not int:
+                    return None
+                values.append(max(low, min(high, round(value * scale))))
+        except (KeyError, TypeError, ValueError, OverflowError):
+            # Missing key, placeholder string in the path, NaN or infinity
+            return None
+        return self.struct.pack(*values)
+
+    def restore(self, data, offset, payload):
+        values = self.struct.unpack_from(data, offset)
+        for path, scale, value in zip(self.paths, self.scales, values):
+            target = payload
+            for key in path[:-1]:
+                target = target.setdefault(key, {})
+            target[path[-1]] = value / scale if scale != 1 else value
+        return offset + self.struct.size
+
+
+SCHEMAS = {
+    1: [
+        _Group(0, [
+            (("imu", "accel", "x"), "h", 100),
+            (("imu", "accel", "y"), "h", 100),
+            (("imu", "accel", "z"), "h", 100),
+        ]),
+        _Group(1, [
+            (("imu", "gyro", "x"), "h", 10),
+            (("imu", "gyro", "y"), "h", 10),
+            (("imu", "gyro", "z"), "h", 10),
+        ]),
+        _Group(2, [
+            (("imu", "tilt", "roll"), "h", 100),
+            (("imu", "tilt", "pitch"), "h", 100),
+        ]),
+        _Group(3, [
+            (("environment", "temperature"), "h", 100),
+            (("environment", "pressure"), "I", 100),
+            (("environment", "altitude"), "i", 100),
+        ]),
+        _Group(4, [
+            (("environment", "MQ2", "value"), "h", 1),
+            (("environment", "MQ2", "voltage"), "h", 1000),
+            (("environment", "MQ135", "value"), "h", 1),
+            (("environment", "MQ135", "voltage"), "h", 1000),
+        ]),
+        _Group(5, [
+            (("battery", "battery_current", "value"), "h", 1),
+            (("battery", "battery_current", "voltage"), "h", 1000),
+            (("battery", "battery_voltage", "value"), "h", 1),
+            (("battery", "battery_voltage", "voltage"), "h", 1000),
+        ]),
+        _Group(6, [
+            (("encoders", "left_encoder", "rpm"), "h", 10),
+            (("encoders", "left_encoder", "ticks"), "i", 1),
+            (("encoders", "right_encoder", "rpm"), "h", 10),
+            (("encoders", "right_encoder", "ticks"), "i", 1),
+        ]),
+    ],
+}
+
+
+def encode_sensor_payload(payload, version=SCHEMA_VERSION):
+    """Pack the sensor payload dict (as published on robot/sensor_data) to bytes"""
+    groups = SCHEMAS[version]
+    timestamp = payload.get("timestamp") or time.time()
+    seconds = int(timestamp)
+    millis = int((timestamp - seconds) * 1000)
+    movement = MOVEMENT_CODES.get(payload.get("movement"), UNKNOWN_MOVEMENT)
+
+    presence = 0
+    blocks = []
+    for group in groups:
+        block = group.extract(payload)
+        if block is not None:
+            presence |= 1 << group.bit
+            blocks.append(block)
+
+    return HEADER.pack(version, presence, seconds, millis, movement) + b"".join(blocks)
+
+
+def decode_sensor_payload(data):
+    """Reference decoder: unpack bytes back into the nested payload layout
+
+    Absent groups are left out of the result.
+    """
+    version, presence, seconds, millis, movement = HEADER.unpack_from(data, 0)
+    if version not in SCHEMAS:
+        raise ValueError(f"Unsupported telemetry schema version {version}")
+
+    payload = {
+        "version": version,
+        "timestamp": seconds + millis / 1000,
+        "movement": MOVEMENT_NAMES.get(movement, "unknown"),
+    }
+    offset = HEADER.size
+    for group in SCHEMAS[version]:
+        if presence & (1 << group.bit):
+            offset = group.restore(data, offset, payload)
+    return payload
@@ -0,0 +1,141 @@
+import time
+
+
+class DeadbandFilter:
+    """
+    Change detection for the sensor telemetry payload.
+
+    Every `keyframe_interval` seconds the full payload is sent with
+    "keyframe": true. In between only fields that moved past their deadband
+    since they were last sent are published, nested in the same layout with
+    "keyframe": false, and nothing is published at all when nothing changed.
+
+    Deadbands are looked up by the longest matching dotted field prefix, e.g.
+    "imu.tilt" or "battery.battery_voltage.voltage", and are either
+    {"abs": x} (absolute change) or {"rel": x} (fraction of the last sent value).
+    Non-numeric fields are sent whenever they differ. Fields that were sent
+    and have since disappeared from the payload (e.g. "stale" once a sensor
+    recovers) are sent as null, which tells the consumer to delete them.
+    """
+
+    # Per-reading metadata that changes on every call and is never a reason to publish
+    VOLATILE_FIELDS = {"timestamp", "read_at", "age"}
+
+    def __init__(self, deadbands=None, keyframe_interval=60):
+        self.deadbands = deadbands or {}
+        self.keyframe_interval = keyframe_interval
+        self.last_sent = {}
+        self.last_keyframe_time = None
+        self._rule_cache = {}
+
+        self.stats = {"keyframes": 0, "deltas": 0, "suppressed": 0}
+
+    def request_keyframe(self):
+        """Force the next payload to be sent as a full keyframe"""
+        self.last_keyframe_time = None
+
+    def apply(self, payload):
+        """Return the message to publish for this payload, or None to skip it"""
+        now = time.monotonic()
+        fields = {}
+        self._flatten(payload, "", fields)
+
+        if (
+            self.last_keyframe_time is None
+            or now - self.last_keyframe_time >= self.keyframe_interval
+        ):
+            self.last_keyframe_time = now
+            self.last_sent = fields
+            self.stats["keyframes"] += 1
+            return {**payload, "keyframe": True}
+
+        changed = {}
+        for path, value in fields.items():
+            if self._has_changed(path, value):
+                changed[path] = value
+        removed = self._removed_paths(fields)
+
+        if not changed and not removed:
+            self.stats["suppressed"] += 1
+            return None
+
+        for path in removed:
+            del self.last_sent[path]
+            changed[path] = None
+        self.last_sent.update((path, value) for path, value in changed.items() if value is not None)
+        self.stats["deltas"] += 1
+
+        message = {"keyframe": False, "timestamp": payload.get("timestamp", time.time())}
+        for path, value in changed.items():
+            target = message
+            keys = path.split(".")
+            for key in keys[:-1]:
+                target = target.setdefault(key, {})
+            target[keys[-1]] = value
+        return message
+
+    def _flatten(self, value, prefix, fields):
+        for key, item in value.items():
+            if key in self.VOLATILE_FIELDS:
+                continue
+            path = f"{prefix}{key}"
+            if isinstance(item, dict):
+                self._flatten(item, f"{path}.", fields)
+            else:
+                fields[path] = item
+
+    def _removed_paths(self, fields):
+        """Paths last sent that are gone from `fields`, as tombstones to send
+
+        A path is left out when the field was restructured instead (a leaf
+        became a dict or the other way round); sending the new value already
+        replaces it on the consumer side.
+        """
+        removed = [path for path in self.last_sent if path not in fields]
+        if not removed:
+            return removed
+        prefixes = set()
+        for path in fields:
+            parts = path.split(".")
+            prefixes.update(".".join(parts[:i]) for i in range(1, len(parts)))
+        tombstones = []
+        for path in removed:
+            parts = path.split(".")
+            if path in prefixes or any(".".join(parts[:i]) in fields for i in range(1, len(parts))):
+                del self.last_sent[path]
+                continue
+            tombstones.append(path)
+        return tombstones
+
+    def _deadband_for(self, path):
+        if path not in self._rule_cache:
+            rule = None
+            candidate = path
+            while candidate:
+                if candidate in self.deadbands:
+                    rule = self.deadbands[candidate]
+                    break
+                candidate = candidate.rpartition(".")[0]
+            self._rule_cache[path] = rule
+        return self._rule_cache[path]
+
+    def _has_changed(self, path, value):
+        if path not in self.last_sent:
+            return True
+        previous = self.last_sent[path]
+
+        numeric = (
+            isinstance(value, (int, float))
+            and isinstance(previous, (int, float))
+            and not isinstance(value, bool)
+            and not isinstance(previous, bool)
+        )
+        if not numeric:
+            return value != previous
+
+        rule = self._deadband_for(path)
+        if not rule:
+            return value != previous
+        if "abs" in rule:
+            return abs(value - previous) > rule["abs"]
+        return abs(value - previous) > abs(previous) * rule["rel"]
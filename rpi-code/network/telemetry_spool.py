@@ -0,0 +1,218 @@
+import json
+import os
+import struct
+import threading
+import time
+
+# Record header: payload length, original timestamp, topic length
+RECORD_HEADER = struct.Struct("<IdH")
+
+
+class TelemetrySpool:
+    """
+    Disk-backed, size-bounded store-and-forward buffer for telemetry.
+
+    While the broker is unreachable, messages are appended to segment files
+    (segment_<n>.log) in `directory`. When the total size exceeds `max_bytes`
+    the oldest segment is dropped; segment sizes are tracked in memory, so
+    the directory is only scanned at startup. After reconnecting, a
+    background thread replays the spooled messages oldest-first on the
+    backfill topic at no more than `backfill_rate` messages per second, so
+    live traffic keeps priority. The replay position is saved about once a
+    second, so a crash mid-backfill resends at most that much.
+    """
+
+    def __init__(self, directory, max_bytes=50_000_000, segment_bytes=1_000_000, backfill_rate=20):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.segment_bytes = segment_bytes
+        self.backfill_rate = backfill_rate
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._writer = None
+        self._writer_segment = None
+        self._backfill_thread = None
+        self._stop_event = threading.Event()
+
+        self.stats = {"spooled": 0, "backfilled": 0, "dropped_segments": 0}
+
+        segments = self._segments()
+        self._next_segment = segments[-1] + 1 if segments else 0
+        # Segment number -> bytes on disk, oldest first, and their total
+        self._sizes = {n: os.path.getsize(self._segment_path(n)) for n in segments}
+        self._total = sum(self._sizes.values())
+
+    # ---------- writing ----------
+
+    def append(self, topic, payload, timestamp=None):
+        """Store one message (payload is a JSON string) for later backfill"""
+        topic_bytes = topic.encode()
+        payload_bytes = payload.encode() if isinstance(payload, str) else payload
+        record = (
+            RECORD_HEADER.pack(len(payload_bytes), timestamp or time.time(), len(topic_bytes))
+            + topic_bytes
+            + payload_bytes
+        )
+
+        with self._lock:
+            if self._writer is None or self._writer.tell() >= self.segment_bytes:
+                self._roll_segment()
+            self._writer.write(record)
+            self._writer.flush()
+            self._sizes[self._writer_segment] += len(record)
+            self._total += len(record)
+            self.stats["spooled"] += 1
+            self._enforce_limit()
+
+    def _roll_segment(self):
+        if self._writer is not None:
+            os.fsync(self._writer.fileno())
+            self._writer.close()
+        self._writer_segment = self._next_segment
+        self._next_segment += 1
+        self._writer = open(self._segment_path(self._writer_segment), "ab")
+        self._sizes[self._writer_segment] = 0
+
+    def _close_writer(self):
+        if self._writer is not None:
+            os.fsync(self._writer.fileno())
+            self._writer.close()
+            self._writer = None
+            self._writer_segment = None
+
+    def _enforce_limit(self):
+        while self._total > self.max_bytes and len(self._sizes) > 1:
+            oldest = next(iter(self._sizes))
+            if oldest == self._writer_segment:
+                break
+            self._total -= self._sizes.pop(oldest)
+            try:
+                os.remove(self._segment_path(oldest))
+            except FileNotFoundError:
+                pass
+            self._remove_cursor(oldest)
+            self.stats["dropped_segments"] += 1
+            print(f"⚠️ Telemetry spool full, dropped oldest segment {oldest}")
+
+    # ---------- backfill ----------
+
+    def has_pending(self):
+        with self._lock:
+            return bool(self._sizes)
+
+    def start_backfill(self, publish, topic, is_connected):
+        """Replay spooled messages in the background via publish(topic, payload)"""
+        if self._backfill_thread and self._backfill_thread.is_alive():
+            return
+        if not self.has_pending():
+            return
+
+        self._backfill_thread = threading.Thread(
+            target=self._backfill,
+            args=(publish, topic, is_connected),
+            name="telemetry-backfill",
+            daemon=True,
+        )
+        self._backfill_thread.start()
+
+    def _backfill(self, publish, topic, is_connected):
+        # New messages go to a fresh segment so the ones being replayed are immutable
+        with self._lock:
+            self._close_writer()
+
+        interval = 1.0 / self.backfill_rate
+        # Persist the replay position after every second's worth of records
+        save_every = max(1, int(self.backfill_rate))
+        print("📼 Backfilling spooled telemetry...")
+
+        for segment in self._segments():
+            with self._lock:
+                if segment == self._writer_segment:
+                    break
+
+            offset = self._load_cursor(segment)
+            with open(self._segment_path(segment), "rb") as f:
+                f.seek(offset)
+                while not self._stop_event.is_set():
+                    if not is_connected():
+                        self._save_cursor(segment, offset)
+                        print("⚠️ Backfill paused, broker disconnected")
+                        return
+
+                    header = f.read(RECORD_HEADER.size)
+                    if len(header) < RECORD_HEADER.size:
+                        break
+                    length, timestamp, topic_length = RECORD_HEADER.unpack(header)
+                    original_topic = f.read(topic_length).decode()
+                    payload = f.read(length)
+                    if len(payload) < length:
+                        break  # Truncated record from an unclean shutdown
+
+                    message = {
+                        "topic": original_topic,
+                        "timestamp": timestamp,
+                        "payload": json.loads(payload),
+                    }
+                    publish(topic, json.dumps(message))
+                    offset = f.tell()
+                    self.stats["backfilled"] += 1
+                    if self.stats["backfilled"] % save_every == 0:
+                        self._save_cursor(segment, offset)
+                    time.sleep(interval)
+
+            if self._stop_event.is_set():
+                self._save_cursor(segment, offset)
+                return
+
+            with self._lock:
+                try:
+                    os.remove(self._segment_path(segment))
+                except OSError:
+                    pass  # Already dropped by the size limit
+                self._total -= self._sizes.pop(segment, 0)
+                self._remove_cursor(segment)
+
+        print("✓ Telemetry backfill complete")
+
+    def stop(self):
+        self._stop_event.set()
+        if self._backfill_thread:
+            self._backfill_thread.join(timeout=2)
+        with self._lock:
+            self._close_writer()
+
+    # ---------- files ----------
+
+    def _segments(self):
+        segments = []
+        for name in os.listdir(self.directory):
+            if name.startswith("segment_") and name.endswith(".log"):
+                segments.append(int(name[len("segment_") : -len(".log")]))
+        return sorted(segments)
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, f"segment_{segment}.log")
+
+    def _cursor_path(self, segment):
+        return os.path.join(self.directory, f"segment_{segment}.cursor")
+
+    def _load_cursor(self, segment):
+        try:
+            with open(self._cursor_path(segment)) as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _save_cursor(self, segment, offset):
+        # Write-and-rename so a crash never leaves a truncated cursor behind
+        path = self._cursor_path(segment)
+        with open(path + ".tmp", "w") as f:
+            f.write(str(offset))
+        os.replace(path + ".tmp", path)
+
+    def _remove_cursor(self, segment):
+        try:
+            os.remove(self._cursor_path(segment))
+        except OSError:
+            pass
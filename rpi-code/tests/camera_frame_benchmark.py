@@ -0,0 +1,165 @@
+"""
+Bytes copied and CPU spent per frame on the camera server's frame path.
+
+Replays the same MJPEG byte stream (1024x720 by default) through the old
+path (append pipe reads to a bytes buffer, slice the frame out, delete it
+from the buffer, concatenate boundary + headers + frame for every viewer)
+and the current one (JPEGFrameParser.read_from() into a preallocated
+buffer, one shared bytes object per frame, headers yielded separately), and
+prints the result as JSON:
+
+    python tests/camera_frame_benchmark.py --viewers 3 --frames 600
+
+No camera is needed; frames come from tests/fake_libcamera_vid.py's
+generators (real JPEGs if Pillow is installed).
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hardware.camera_pipeline import EOI, SOI, JPEGFrameParser, multipart_header
+from tests.fake_libcamera_vid import make_pillow_frames, make_synthetic_frames
+
+
+class ChunkedPipe(io.RawIOBase):
+    """Serves a byte string in pipe-sized reads of varying length"""
+
+    def __init__(self, data, chunk_size, seed=1):
+        self._data = memoryview(data)
+        self._position = 0
+        self._chunk_size = chunk_size
+        self._random = random.Random(seed)
+
+    def readable(self):
+        return True
+
+    def _next_size(self):
+        return self._random.randint(self._chunk_size // 2, self._chunk_size)
+
+    def readinto(self, buffer):
+        count = min(len(buffer), self._next_size(), len(self._data) - self._position)
+        buffer[:count] = self._data[self._position : self._position + count]
+        self._position += count
+        return count
+
+    def read(self, size=-1):
+        count = min(self._next_size(), len(self._data) - self._position)
+        chunk = bytes(self._data[self._position : self._position + count])
+        self._position += count
+        return chunk
+
+
+def legacy_path(pipe, viewers):
+    """The previous implementation: bytes buffer, slice + del, per-viewer concatenation"""
+    copied = 0
+    frames = 0
+    sent = 0
+    buffer = b""
+    while True:
+        chunk = pipe.read(65536)
+        if not chunk:
+            break
+        buffer += chunk
+        copied += len(buffer)  # bytes += rebuilds the whole buffer
+        while True:
+            start = buffer.find(SOI)
+            end = buffer.find(EOI, start + 2) if start >= 0 else -1
+            if end < 0:
+                break
+            frame = buffer[start : end + 2]
+            copied += len(frame)
+            buffer = buffer[end + 2 :]
+            copied += len(buffer)
+            frames += 1
+            for _ in range(viewers):
+                part = b"--frame\r\nContent-Type: image/jpeg\r\n\r\n" + frame + b"\r\n"
+                copied += len(part)
+                sent += len(part)
+    return frames, copied, sent
+
+
+def zero_copy_path(pipe, viewers):
+    """The current implementation: readinto a preallocated buffer, headers separate"""
+    parser = JPEGFrameParser()
+    frames = 0
+    sent = 0
+    while True:
+        count, completed = parser.read_from(pipe)
+        if not count:
+            break
+        for frame in completed:
+            frames += 1
+            for _ in range(viewers):
+                # What the WSGI server writes; the frame itself is never copied again
+                for part in (multipart_header(len(frame)), frame, b"\r\n"):
+                    sent += len(part)
+    return frames, parser.copied_bytes, sent
+
+
+def measure(path, data, viewers, chunk_size):
+    pipe = ChunkedPipe(data, chunk_size)
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    frames, copied, sent = path(pipe, viewers)
+    cpu = time.process_time() - cpu_started
+    elapsed = time.perf_counter() - started
+    return {
+        "frames": frames,
+        "bytes_copied_per_frame": round(copied / frames) if frames else 0,
+        "bytes_sent_per_frame": round(sent / frames) if frames else 0,
+        "cpu_ms_per_frame": round(cpu * 1000 / frames, 4) if frames else 0,
+        "wall_ms_per_frame": round(elapsed * 1000 / frames, 4) if frames else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Camera frame path copy/CPU benchmark")
+    parser.add_argument("--width", type=int, default=1024)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--quality", type=int, default=75)
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--viewers", type=int, default=3)
+    parser.add_argument("--chunk-size", type=int, default=65536, help="Largest pipe read")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    try:
+        source = make_pillow_frames(args.width, args.height, args.quality)
+        generator = "pillow"
+    except ImportError:
+        source = make_synthetic_frames(args.width, args.height, args.quality)
+        generator = "synthetic"
+    data = b"".join(source[i % len(source)] for i in range(args.frames))
+
+    report = {
+        "resolution": f"{args.width}x{args.height}",
+        "frame_source": generator,
+        "mean_frame_bytes": round(len(data) / args.frames),
+        "viewers": args.viewers,
+        "legacy": measure(legacy_path, data, args.viewers, args.chunk_size),
+        "zero_copy": measure(zero_copy_path, data, args.viewers, args.chunk_size),
+    }
+    legacy, current = report["legacy"], report["zero_copy"]
+    if current["bytes_copied_per_frame"]:
+        report["copy_reduction"] = round(
+            legacy["bytes_copied_per_frame"] / current["bytes_copied_per_frame"], 1
+        )
+    if current["cpu_ms_per_frame"]:
+        report["cpu_reduction"] = round(legacy["cpu_ms_per_frame"] / current["cpu_ms_per_frame"], 1)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
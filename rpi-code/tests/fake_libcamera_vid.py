@@ -0,0 +1,87 @@
+"""
+Stand-in for `libcamera-vid --codec mjpeg -o -` on machines without a camera.
+
+Writes a stream of JPEG frames to stdout at the requested frame rate, so the
+camera pipeline can be exercised anywhere:
+
+    CAMERA_PIPELINE_COMMAND="python tests/fake_libcamera_vid.py" python hardware/camera_server.py
+
+With Pillow installed the frames are real JPEGs of a moving square; without
+it they are minimal SOI ... EOI blobs of a realistic size. --fail-after N
+exits after N frames to exercise the pipeline's restart logic; --frames N
+exits cleanly after N frames, e.g. as a libcamera-jpeg stand-in:
+
+    CAMERA_STILL_COMMAND="python tests/fake_libcamera_vid.py --frames 1"
+"""
+
+import argparse
+import io
+import os
+import sys
+import time
+
+
+def make_pillow_frames(width, height, quality, count=30):
+    from PIL import Image, ImageDraw
+
+    frames = []
+    size = max(8, min(width, height) // 6)
+    for index in range(count):
+        image = Image.new("RGB", (width, height), (40, 40, 48))
+        draw = ImageDraw.Draw(image)
+        x = (width - size) * index // max(1, count - 1)
+        draw.rectangle([x, height // 2 - size // 2, x + size, height // 2 + size // 2], fill=(230, 200, 60))
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=quality)
+        frames.append(buffer.getvalue())
+    return frames
+
+
+def make_synthetic_frames(width, height, quality, count=30):
+    # Roughly the size of a real MJPEG frame; body bytes never contain 0xFF
+    size = max(1024, width * height * quality // 1000)
+    frames = []
+    for index in range(count):
+        body = bytes((index + i) % 255 for i in range(size))
+        frames.append(b"\xff\xd8\xff\xe0\x00\x10JFIF\x00" + body + b"\xff\xd9")
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=1024)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--framerate", type=float, default=15)
+    parser.add_argument("--quality", type=int, default=75)
+    parser.add_argument("--fail-after", type=int, default=0)
+    parser.add_argument("--frames", type=int, default=0)
+    args, _ = parser.parse_known_args()
+
+    try:
+        frames = make_pillow_frames(args.width, args.height, args.quality)
+    except ImportError:
+        frames = make_synthetic_frames(args.width, args.height, args.quality)
+
+    out = sys.stdout.buffer
+    interval = 1.0 / args.framerate
+    next_time = time.monotonic()
+    sent = 0
+    try:
+        while True:
+            out.write(frames[sent % len(frames)])
+            out.flush()
+            sent += 1
+            if args.fail_after and sent >= args.fail_after:
+                os._exit(1)
+            if args.frames and sent >= args.frames:
+                break
+            next_time += interval
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+    except (BrokenPipeError, KeyboardInterrupt):
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,532 @@
+"""
+MQTT load test and latency benchmark for MQTTClient.
+
+Drives a real MQTTClient with synthetic locomotion/camera command storms and
+telemetry publishing at configurable rates, then reports publish throughput,
+command handling latency percentiles (from the robot's acks on the command
+feedback topic), dropped commands and CPU use as JSON.
+
+By default everything runs against an in-process stand-in broker, so no
+network or mosquitto is needed. Pass --broker to run against a local broker
+instead (requires paho-mqtt):
+
+    python tests/mqtt_load_benchmark.py --duration 10 --command-rate 50
+    python tests/mqtt_load_benchmark.py --broker localhost:1883 --output results.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import types
+
+# Add the parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# ========== IN-PROCESS BROKER STAND-IN ==========
+def topic_matches(pattern, topic):
+    pattern_parts = pattern.split("/")
+    topic_parts = topic.split("/")
+    for index, part in enumerate(pattern_parts):
+        if part == "#":
+            return True
+        if index >= len(topic_parts):
+            return False
+        if part != "+" and part != topic_parts[index]:
+            return False
+    return len(pattern_parts) == len(topic_parts)
+
+
+class InProcessBroker:
+    """Routes published messages to subscribed stand-in clients"""
+
+    def __init__(self):
+        self.clients = []
+        self.lock = threading.Lock()
+        self.published = 0
+        self.bytes_published = 0
+
+    def route(self, topic, payload, size):
+        with self.lock:
+            self.published += 1
+            self.bytes_published += size
+            targets = [
+                client
+                for client in self.clients
+                if any(topic_matches(pattern, topic) for pattern in client.subscriptions)
+            ]
+        for client in targets:
+            client.inbox.put(types.SimpleNamespace(topic=topic, payload=payload, properties=None))
+
+
+class _PublishInfo:
+    def __init__(self, mid):
+        self.mid = mid
+        self.rc = 0
+
+    def wait_for_publish(self, timeout=None):
+        return True
+
+    def is_published(self):
+        return True
+
+
+class StandInClient:
+    """Subset of paho.mqtt.client.Client used by MQTTClient"""
+
+    broker = None
+    _mids = itertools.count(1)
+
+    def __init__(self, *args, **kwargs):
+        self.subscriptions = set()
+        self.inbox = queue.Queue()
+        self.connected = False
+        self.on_connect = None
+        self.on_disconnect = None
+        self.on_message = None
+        self.on_connect_fail = None
+        self._aliases = {}
+        self._thread = None
+        self._running = False
+
+    def username_pw_set(self, *args, **kwargs):
+        pass
+
+    def reconnect_delay_set(self, *args, **kwargs):
+        pass
+
+    def connect_async(self, *args, **kwargs):
+        pass
+
+    def connect(self, *args, **kwargs):
+        pass
+
+    def loop_start(self):
+        with self.broker.lock:
+            self.broker.clients.append(self)
+        self._running = True
+        self.connected = True
+        self._aliases = {}
+        self._thread = threading.Thread(target=self._network_loop, daemon=True)
+        self._thread.start()
+        if self.on_connect:
+            connack = types.SimpleNamespace(TopicAliasMaximum=10)
+            self.on_connect(self, None, {}, 0, connack)
+
+    def loop_stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1)
+
+    def disconnect(self, *args, **kwargs):
+        self.connected = False
+
+    def is_connected(self):
+        return self.connected
+
+    def subscribe(self, topic, *args, **kwargs):
+        self.subscriptions.add(topic)
+
+    def publish(self, topic, payload=None, qos=0, retain=False, properties=None):
+        if isinstance(payload, str):
+            payload = payload.encode()
+        # Approximate PUBLISH packet size: topic string plus payload (+2 for an alias)
+        size = len(topic) + len(payload or b"")
+        alias = getattr(properties, "TopicAlias", None)
+        if alias is not None:
+            size += 2
+            if topic:
+                self._aliases[alias] = topic
+            else:
+                topic = self._aliases[alias]
+        self.broker.route(topic, payload, size)
+        return _PublishInfo(next(self._mids))
+
+    def _network_loop(self):
+        # Single delivery thread per client, like paho's network thread
+        while self._running:
+            try:
+                message = self.inbox.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if self.on_message:
+                self.on_message(self, None, message)
+
+
+def install_stand_in():
+    """Make MQTTClient use the in-process stand-in instead of paho"""
+    stand_in = types.ModuleType("paho.mqtt.client")
+    stand_in.Client = StandInClient
+    stand_in.CallbackAPIVersion = types.SimpleNamespace(VERSION1=1, VERSION2=2)
+    stand_in.MQTTv311 = 4
+    stand_in.MQTTv5 = 5
+    StandInClient.broker = InProcessBroker()
+
+    try:
+        import paho.mqtt.client  # noqa: F401
+    except ImportError:
+        # Without paho the v5 publish properties are plain attribute holders
+        packettypes = types.ModuleType("paho.mqtt.packettypes")
+        packettypes.PacketTypes = types.SimpleNamespace(PUBLISH=3)
+        properties = types.ModuleType("paho.mqtt.properties")
+        properties.Properties = lambda packet_type: types.SimpleNamespace()
+        sys.modules["paho"] = types.ModuleType("paho")
+        sys.modules["paho.mqtt"] = types.ModuleType("paho.mqtt")
+        sys.modules["paho.mqtt.client"] = stand_in
+        sys.modules["paho.mqtt.packettypes"] = packettypes
+        sys.modules["paho.mqtt.properties"] = properties
+
+    import network.mqtt_client as mqtt_client_module
+
+    mqtt_client_module.mqtt = stand_in
+    return stand_in, StandInClient.broker
+
+
+# ========== ROBOT STAND-IN ==========
+class BenchmarkConfig:
+    """RobotConfig values needed by MQTTClient, with spooling disabled"""
+
+    def __init__(self, broker, port, protocol_version):
+        from config.robot_config import RobotConfig
+
+        self.GPIO_CONFIG = RobotConfig.GPIO_CONFIG
+        self.MQTT_CONFIG = dict(
+            RobotConfig.MQTT_CONFIG, broker=broker, port=port, protocol_version=protocol_version
+        )
+        self.TELEMETRY_CONFIG = dict(RobotConfig.TELEMETRY_CONFIG, spool_enabled=False)
+        self.DISPATCH_CONFIG = RobotConfig.DISPATCH_CONFIG
+        self.base_pwm = RobotConfig.base_pwm
+        for name in dir(RobotConfig):
+            if name.isupper() and not hasattr(self, name):
+                setattr(self, name, getattr(RobotConfig, name))
+
+
+class StandInPi:
+    def write(self, pin, value):
+        pass
+
+
+class StandInServos:
+    def set_pan(self, angle):
+        pass
+
+    def set_tilt(self, angle):
+        pass
+
+    def center(self):
+        pass
+
+
+class StandInSensors:
+    def read_environmental(self, fresh=False):
+        return {"temperature": 24.0, "pressure": 1008.0, "altitude": 40.0}
+
+
+class StandInRobot:
+    """Just enough of SurveillanceRobot for MQTTClient, plus a control loop"""
+
+    def __init__(self, control_frequency):
+        from utils.command_mailbox import CommandMailbox
+
+        self.mailbox = CommandMailbox()
+        self.servos = StandInServos()
+        self.sensors = StandInSensors()
+        self.tick_interval = 1.0 / control_frequency
+        self.running = True
+        self.mqtt = None
+
+    @property
+    def command(self):
+        return self.mailbox.current.direction
+
+    @property
+    def target_speed(self):
+        return self.mailbox.current.speed
+
+    def control_loop(self):
+        # Mirrors SurveillanceRobot.run(): apply, mark actuated, wait for next tick
+        while self.running:
+            tick_start = time.monotonic()
+            command = self.mailbox.current
+            self.mqtt.tracer.mark_actuated(command.version)
+            remaining = self.tick_interval - (time.monotonic() - tick_start)
+            if remaining > 0:
+                self.mailbox.wait(command.version, remaining)
+
+
+# ========== LOAD GENERATION ==========
+SAMPLE_TELEMETRY = {
+    "imu": {
+        "accel": {"x": 0.12, "y": -0.04, "z": 9.81},
+        "gyro": {"x": 0.5, "y": -1.2, "z": 0.03},
+        "tilt": {"roll": 1.2, "pitch": -0.6},
+    },
+    "environment": {
+        "temperature": 24.5,
+        "pressure": 1008.2,
+        "altitude": 42.1,
+        "MQ2": {"value": 6832, "voltage": 0.85},
+        "MQ135": {"value": 9120, "voltage": 1.14},
+    },
+    "battery": {
+        "battery_current": {"value": 4120, "voltage": 0.52},
+        "battery_voltage": {"value": 23410, "voltage": 2.93},
+    },
+}
+
+
+def run_at_rate(rate, duration, action):
+    if rate <= 0:
+        return
+    interval = 1.0 / rate
+    next_time = time.monotonic()
+    end_time = next_time + duration
+    while next_time < end_time:
+        action()
+        next_time += interval
+        delay = next_time - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def percentiles(values):
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def pick(fraction):
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 3)
+
+    return {
+        "count": len(ordered),
+        "p50": pick(0.50),
+        "p90": pick(0.90),
+        "p99": pick(0.99),
+        "max": round(ordered[-1], 3),
+    }
+
+
+def make_load_client(args, stand_in):
+    """Client used by the harness itself to send commands and collect acks"""
+    if stand_in:
+        client = stand_in.Client()
+        return client
+
+    import paho.mqtt.client as mqtt
+
+    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id="load_benchmark")
+    host, port = args.broker
+    client.connect(host, port, 60)
+    return client
+
+
+def run_benchmark(args):
+    stand_in = None
+    broker = None
+    if args.broker is None:
+        stand_in, broker = install_stand_in()
+        host, port = "in-process", 0
+    else:
+        host, port = args.broker
+
+    from network.mqtt_client import MQTTClient
+
+    config = BenchmarkConfig(host, port, args.protocol)
+    topics = config.MQTT_CONFIG["topics"]
+    robot = StandInRobot(config.PUBLISH_CONFIG["control_frequency"])
+    client = MQTTClient(StandInPi(), config, robot)
+    robot.mqtt = client
+
+    acks = []
+    telemetry_received = [0]
+    ack_lock = threading.Lock()
+
+    def on_load_message(mqtt_client, userdata, message, *rest):
+        if message.topic == topics["command_feedback"]:
+            data = json.loads(message.payload)
+            if "seq" in data:
+                with ack_lock:
+                    acks.append(data)
+        else:
+            telemetry_received[0] += 1
+
+    load_client = make_load_client(args, stand_in)
+    load_client.on_message = on_load_message
+    load_client.subscribe(topics["command_feedback"])
+    load_client.subscribe(topics["sensor_data"])
+    load_client.subscribe(topics["sensor_data_batch"])
+    load_client.loop_start()
+
+    if stand_in is None and not client.supervisor.wait_connected(timeout=10):
+        raise SystemExit("Robot client could not connect to the broker")
+
+    control_thread = threading.Thread(target=robot.control_loop, daemon=True)
+    control_thread.start()
+
+    seq_counter = itertools.count(1)
+    sent = {"locomotion": 0, "camera_control": 0}
+
+    def send_locomotion():
+        seq = next(seq_counter)
+        if random.random() < args.stop_fraction:
+            payload = {"action": "stop"}
+        else:
+            payload = {"action": "move", "angle": random.choice([0, 90, 180, 270]), "speed": 40}
+        payload.update(seq=seq, sent_at=time.time())
+        load_client.publish(topics["locomotion"], json.dumps(payload))
+        sent["locomotion"] += 1
+
+    def send_camera():
+        payload = {
+            "action": "move",
+            "x": random.randint(-100, 100),
+            "y": random.randint(-100, 100),
+            "seq": next(seq_counter),
+            "sent_at": time.time(),
+        }
+        load_client.publish(topics["camera_control"], json.dumps(payload))
+        sent["camera_control"] += 1
+
+    def publish_telemetry():
+        sample = json.loads(json.dumps(SAMPLE_TELEMETRY))
+        sample["imu"]["tilt"]["roll"] += random.uniform(-2, 2)
+        encoders = {
+            "left_encoder": {"rpm": random.uniform(40, 42), "ticks": random.randint(0, 5000)},
+            "right_encoder": {"rpm": random.uniform(40, 42), "ticks": random.randint(0, 5000)},
+        }
+        client._publish_sensor_data(
+            sample["imu"], sample["environment"], sample["battery"], encoders
+        )
+
+    # Silence the per-message prints of MQTTClient while under load
+    real_stdout = sys.stdout
+    if not args.verbose:
+        sys.stdout = open(os.devnull, "w")
+
+    cpu_start = time.process_time()
+    wall_start = time.monotonic()
+    published_start = broker.published if broker else 0
+    bytes_start = broker.bytes_published if broker else 0
+
+    workers = [
+        threading.Thread(target=run_at_rate, args=(args.command_rate, args.duration, send_locomotion)),
+        threading.Thread(target=run_at_rate, args=(args.camera_rate, args.duration, send_camera)),
+        threading.Thread(target=run_at_rate, args=(args.telemetry_rate, args.duration, publish_telemetry)),
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    # Let in-flight commands drain
+    time.sleep(args.drain)
+
+    wall_time = time.monotonic() - wall_start
+    cpu_time = time.process_time() - cpu_start
+
+    robot.running = False
+    client.disconnect()
+    load_client.loop_stop()
+    if not args.verbose:
+        sys.stdout.close()
+        sys.stdout = real_stdout
+
+    with ack_lock:
+        ack_list = list(acks)
+
+    def latencies(topic_name, interval):
+        return [
+            ack["latency_ms"][interval]
+            for ack in ack_list
+            if ack["topic"] == topic_name and interval in ack.get("latency_ms", {})
+        ]
+
+    dispatch_stats = client.dispatcher.get_stats()
+    acked = {name: sum(1 for ack in ack_list if ack["topic"] == name) for name in sent}
+    intentionally_skipped = {
+        name: dispatch_stats.get(name, {}).get("replaced", 0) + (client.tracer.superseded if name == "locomotion" else 0)
+        for name in sent
+    }
+
+    return {
+        "benchmark": "mqtt_load",
+        "timestamp": time.time(),
+        "broker": "in-process" if stand_in else f"{host}:{port}",
+        "parameters": {
+            "duration_s": args.duration,
+            "command_rate_hz": args.command_rate,
+            "camera_rate_hz": args.camera_rate,
+            "telemetry_rate_hz": args.telemetry_rate,
+            "stop_fraction": args.stop_fraction,
+            "protocol": args.protocol,
+        },
+        "throughput": {
+            "commands_sent": sent,
+            "telemetry_messages_received": telemetry_received[0],
+            "telemetry_publish_rate_hz": round(telemetry_received[0] / args.duration, 2),
+            "broker_messages_per_s": round((broker.published - published_start) / wall_time, 2)
+            if broker
+            else None,
+            "broker_bytes_per_s": round((broker.bytes_published - bytes_start) / wall_time, 1)
+            if broker
+            else None,
+        },
+        "latency_ms": {
+            "locomotion": {
+                interval: percentiles(latencies("locomotion", interval))
+                for interval in ("queue", "robot_total", "end_to_end")
+            },
+            "camera_control": {
+                interval: percentiles(latencies("camera_control", interval))
+                for interval in ("queue", "robot_total", "end_to_end")
+            },
+        },
+        "drops": {
+            "acked": acked,
+            "coalesced_or_superseded": intentionally_skipped,
+            "unaccounted": {
+                name: max(0, sent[name] - acked[name] - intentionally_skipped[name]) for name in sent
+            },
+            "dispatcher": dispatch_stats,
+        },
+        "cpu": {
+            "process_cpu_s": round(cpu_time, 3),
+            "wall_s": round(wall_time, 3),
+            "cpu_percent": round(cpu_time / wall_time * 100, 1),
+        },
+    }
+
+
+def parse_broker(value):
+    host, _, port = value.partition(":")
+    return host, int(port or 1883)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MQTT load test and latency benchmark")
+    parser.add_argument("--broker", type=parse_broker, default=None,
+                        help="host[:port] of a local broker (default: in-process stand-in)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--command-rate", type=float, default=50.0, help="locomotion commands/s")
+    parser.add_argument("--camera-rate", type=float, default=20.0, help="camera commands/s")
+    parser.add_argument("--telemetry-rate", type=float, default=10.0, help="sensor publishes/s")
+    parser.add_argument("--stop-fraction", type=float, default=0.1, help="share of stop commands")
+    parser.add_argument("--protocol", choices=["5", "3.1.1"], default="5",
+                        help="MQTT protocol version used by the robot client")
+    parser.add_argument("--drain", type=float, default=1.0, help="seconds to wait for acks")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--verbose", action="store_true", help="keep MQTTClient output")
+    args = parser.parse_args()
+
+    report = run_benchmark(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
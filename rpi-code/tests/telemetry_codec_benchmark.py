@@ -0,0 +1,86 @@
+import json
+import os
+import sys
+import timeit
+
+# Add the parent directory to Python path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from network.telemetry_codec import encode_sensor_payload, decode_sensor_payload
+
+ITERATIONS = 20000
+
+# Representative payload as built by MQTTClient._publish_sensor_data
+full_payload = {
+    "imu": {
+        "accel": {"x": 0.1234567891, "y": -0.0456789123, "z": 9.8123456789},
+        "gyro": {"x": 0.5123456789, "y": -1.2234567891, "z": 0.0345678912},
+        "tilt": {"roll": 1.2345678912, "pitch": -0.6789123456},
+        "read_at": 12345.678901234,
+        "age": 0.012,
+    },
+    "environment": {
+        "temperature": 24.56,
+        "pressure": 1008.23,
+        "altitude": 42.17,
+        "MQ2": {"value": 6832, "voltage": 0.85},
+        "MQ135": {"value": 9120, "voltage": 1.14},
+        "read_at": 12341.2345,
+        "age": 4.2,
+    },
+    "battery": {
+        "battery_current": {"value": 4120, "voltage": 0.52},
+        "battery_voltage": {"value": 23410, "voltage": 2.93},
+        "read_at": 12345.1234,
+        "age": 0.4,
+    },
+    "encoders": {
+        "left_encoder": {"rpm": -42.3456789, "ticks": -12345},
+        "right_encoder": {"rpm": 41.9876543, "ticks": 12299},
+    },
+    "movement": "forward",
+    "timestamp": 1760000000.123456,
+}
+
+# Same payload with the BMP280 and ADS1115 missing
+degraded_payload = json.loads(json.dumps(full_payload))
+degraded_payload["environment"] = {
+    "temperature": "Sensor Not Found",
+    "pressure": "Sensor Not Found",
+    "altitude": "Sensor Not Found",
+    "MQ2": {"value": "Sensor Not Found", "voltage": "Sensor Not Found"},
+    "MQ135": {"value": "Sensor Not Found", "voltage": "Sensor Not Found"},
+}
+degraded_payload["battery"] = {
+    "battery_current": {"value": "Sensor Not Found", "voltage": "Sensor Not Found"},
+    "battery_voltage": {"value": "Sensor Not Found", "voltage": "Sensor Not Found"},
+}
+
+
+def benchmark(name, payload):
+    json_bytes = json.dumps(payload).encode()
+    binary_bytes = encode_sensor_payload(payload)
+
+    json_time = timeit.timeit(lambda: json.dumps(payload).encode(), number=ITERATIONS)
+    binary_time = timeit.timeit(lambda: encode_sensor_payload(payload), number=ITERATIONS)
+    decode_time = timeit.timeit(lambda: decode_sensor_payload(binary_bytes), number=ITERATIONS)
+
+    print(f"\n📦 {name}")
+    print(f"  JSON size:    {len(json_bytes):5d} bytes")
+    print(
+        f"  Binary size:  {len(binary_bytes):5d} bytes "
+        f"({len(binary_bytes) / len(json_bytes) * 100:.1f}% of JSON)"
+    )
+    print(f"  JSON encode:   {json_time / ITERATIONS * 1e6:6.1f} µs")
+    print(f"  Binary encode: {binary_time / ITERATIONS * 1e6:6.1f} µs")
+    print(f"  Binary decode: {decode_time / ITERATIONS * 1e6:6.1f} µs")
+
+    return decode_sensor_payload(binary_bytes)
+
+
+if __name__ == "__main__":
+    print(f"Telemetry codec benchmark ({ITERATIONS} iterations)")
+    decoded = benchmark("Full payload", full_payload)
+    benchmark("Degraded payload (environment + battery missing)", degraded_payload)
+
+    print("\n🔍 Round trip (full payload):")
+    print(json.dumps(decoded, indent=2))
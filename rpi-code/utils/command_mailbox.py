@@ -0,0 +1,39 @@
+import threading
+import time
+from collections import namedtuple
+
+# Immutable motion command; a new record is published for every change
+MotionCommand = namedtuple("MotionCommand", ["direction", "speed", "timestamp", "version"])
+
+
+class CommandMailbox:
+    """
+    Versioned single-slot mailbox between the MQTT handlers and the control loop.
+
+    Direction and speed are published together as one immutable record, so the
+    loop can never see a new direction with an old speed. Posting wakes the
+    control loop immediately instead of letting it sleep out its tick.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._current = MotionCommand("stop", 0, time.monotonic(), 0)
+
+    @property
+    def current(self):
+        return self._current
+
+    def post(self, direction, speed):
+        """Publish a new command and wake the control loop"""
+        with self._condition:
+            self._current = MotionCommand(
+                direction, speed, time.monotonic(), self._current.version + 1
+            )
+            self._condition.notify_all()
+        return self._current
+
+    def wait(self, version, timeout):
+        """Sleep until a command newer than `version` arrives or `timeout` passes"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._current.version != version, timeout)
+            return self._current
@@ -38,6 +38,9 @@ export const config = {
 
     // MQTT
     mqttBroker: process.env.MQTT_BROKER || 'mqtt://127.0.0.1:1883',
+    mqttProtocolVersion: parseInt(process.env.MQTT_PROTOCOL_VERSION) || 5,
+    // Seconds before a queued locomotion/camera command is discarded (MQTT v5 only)
+    mqttCommandExpiry: parseInt(process.env.MQTT_COMMAND_EXPIRY) || 1,
 
     // Batch processing
     batchSize: parseInt(process.env.BATCH_SIZE) || 10,
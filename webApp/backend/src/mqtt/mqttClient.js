@@ -2,6 +2,7 @@ import mqtt from 'mqtt';
 import { config } from '../config/env.js';
 import { cacheSensorData, postgresBatchWrite } from '../services/index.js';
 import { pool } from '../config/db.js';
+import { mergeSensorUpdate } from '../utils/dataParser.js';
 
 const mqttTopics = {
     sensor: 'robot/sensor_data',
@@ -15,9 +16,12 @@ const mqttTopics = {
 
 let mqttClient = null;
 let robotStatus = 'offline';
+let sensorSnapshot = null;
 
 export function initializeMqtt() {
-    mqttClient = mqtt.connect(config.mqttBroker);
+    mqttClient = mqtt.connect(config.mqttBroker, {
+        protocolVersion: config.mqttProtocolVersion
+    });
 
     mqttClient.on('connect', () => {
         console.log('MQTT client connected');
@@ -43,7 +47,12 @@ export function initializeMqtt() {
 
         try {
             if (topic === mqttTopics.sensor) {
-                const data = JSON.parse(message.toString());
+                const data = mergeSensorUpdate(sensorSnapshot, JSON.parse(message.toString()));
+                if (!data) {
+                    console.log('Sensor delta received before first keyframe, skipping');
+                    return;
+                }
+                sensorSnapshot = data;
                 // 1. Store in Redis for real-time dashboard
                 await cacheSensorData(data);
                 // 2. Batch write to PostgreSQL
@@ -89,6 +98,21 @@ export function getMqttTopics() {
     return mqttTopics;
 }
 
+// Publish options for joystick-style commands: with MQTT v5 they expire
+// instead of being executed late after a Wi-Fi hiccup
+export function getCommandPublishOptions() {
+    if (config.mqttProtocolVersion !== 5) {
+        return {};
+    }
+    return {
+        properties: {
+            messageExpiryInterval: config.mqttCommandExpiry,
+            contentType: 'application/json',
+            userProperties: { schema_version: '1' }
+        }
+    };
+}
+
 export function getRobotStatus() {
     return robotStatus;
 }
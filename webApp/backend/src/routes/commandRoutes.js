@@ -1,8 +1,12 @@
 import express from 'express';
-import { getMqttClient, getMqttTopics } from '../mqtt/mqttClient.js';
+import { getCommandPublishOptions, getMqttClient, getMqttTopics } from '../mqtt/mqttClient.js';
 
 const router = express.Router();
 
+// Sequence number stamped on every command so the robot's acks on
+// robot/command/feedback can be matched to what was sent
+let commandSeq = 0;
+
 router.post('/', (req, res) => {
     const { action, speed, angle, mode, value, x, y } = req.body;
     if (!action) {
@@ -17,10 +21,12 @@ router.post('/', (req, res) => {
         const cameraPayload = JSON.stringify({
             action: action === 'camera_center' ? 'center' : 'move',
             x: x || 0,
-            y: y || 0
+            y: y || 0,
+            seq: ++commandSeq,
+            sent_at: Date.now() / 1000
         });
 
-        mqttClient.publish(topics.camera_control, cameraPayload, (err) => {
+        mqttClient.publish(topics.camera_control, cameraPayload, getCommandPublishOptions(), (err) => {
             if (err) {
                 console.error('Camera control publish error:', err);
                 return res.status(500).json({ error: 'Failed to send camera command' });
@@ -37,10 +43,12 @@ router.post('/', (req, res) => {
         speed: speed || 0,
         angle: angle || 0,
         mode: mode || "manual-precise",
-        value: value
+        value: value,
+        seq: ++commandSeq,
+        sent_at: Date.now() / 1000
     });
 
-    mqttClient.publish(topics.locomotion, payload, (err) => {
+    mqttClient.publish(topics.locomotion, payload, getCommandPublishOptions(), (err) => {
         if (err) {
             console.error('Publish error:', err);
             return res.status(500).json({ error: 'Failed to send command' });
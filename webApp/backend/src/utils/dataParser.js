@@ -9,6 +9,38 @@ export function parseSensorValue(value) {
     return value;
 }
 
+// Robot telemetry is sent as full keyframes ("keyframe": true, or no flag from
+// older firmware) followed by deltas carrying only the fields that changed;
+// a null field in a delta was removed from the reading.
+// Returns the full snapshot after applying `update`, or null until the first
+// keyframe has been seen.
+export function mergeSensorUpdate(previous, update) {
+    if (update.keyframe !== false) {
+        return update;
+    }
+    if (!previous) {
+        return null;
+    }
+
+    const merge = (base, changes) => {
+        const result = { ...base };
+        for (const [key, value] of Object.entries(changes)) {
+            if (value === null) {
+                // Tombstone: the field is no longer in the reading
+                delete result[key];
+            } else if (value && typeof value === 'object' && !Array.isArray(value)
+                && base[key] && typeof base[key] === 'object') {
+                result[key] = merge(base[key], value);
+            } else {
+                result[key] = value;
+            }
+        }
+        return result;
+    };
+
+    return merge(previous, update);
+}
+
 export function parseSensorData(data) {
     try {
         // Extract environmental data from the nested structure
@@ -89,7 +89,9 @@ const checkCameraStatus = async () => {
 
     const stopStream = async () => {
         try {
-            await fetch(`${CAMERA_SERVER}/api/camera/stream/stop`);
+            // Only end this viewer's stream; others keep watching
+            const streamId = streamUrl ? new URL(streamUrl).searchParams.get('t') : '';
+            await fetch(`${CAMERA_SERVER}/api/camera/stream/stop?t=${streamId}`);
             setIsStreaming(false);
             setStreamUrl('');
             setMode('single');